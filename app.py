@@ -1,7 +1,10 @@
 import streamlit as st
-from game_engine import Game
+from game_engine import Game, DEFAULT_PLAYER
+from journal import Journal, recover, SESSION_ID
+from sessions import FileSessionStore, Session, SessionManager
 import json
 import os
+import uuid
 
 # Configure Streamlit page (must be FIRST)
 st.set_page_config(
@@ -10,57 +13,141 @@ st.set_page_config(
     layout="wide"
 )
 
+# --- Session pool ---
+# One pool per server process: sessions idle past the memory budget or
+# IDLE_SECONDS are spilled to disk and come back on their next command.
+IDLE_SECONDS = 15 * 60
+# Blocks the latest-output panel holds before they're moved up into the
+# transcript panel (kept under the transcript's WINDOW)
+LATEST_BLOCKS = 10
+
+
+def new_game(player=DEFAULT_PLAYER):
+    game = Game(player=player)
+    game.autosave_every = 5  # turns; written to the "autosave" slot off-thread
+    return game
+
+
+def open_session(session_id):
+    """A session the pool has never spilled: rebuilt from its journal if a
+    restarted server left one, otherwise a new night"""
+    try:
+        restored = recover(session_id)
+    except ValueError:
+        restored = None
+    if restored:
+        game, seq = restored
+        game.player = session_id
+        game.autosave_every = 5
+    else:
+        game, seq = new_game(session_id), 0
+    session = Session(session_id, game, journal=Journal(session_id, seq=seq))
+    if restored:
+        session.output.append("*Your night picks up where it left off.*")
+        session.output.append(game.look_around())
+    return session
+
+
+@st.cache_resource
+def session_manager():
+    return SessionManager(FileSessionStore(), create=open_session,
+                          game_factory=new_game)
+
+
+manager = session_manager()
+manager.evict_idle(IDLE_SECONDS)
+
 # --- Initialize session state ---
-if "game" not in st.session_state:
-    st.session_state.game = Game()
-    st.session_state.game_output = []
-    st.session_state.command_history = []
+# The session id rides in the URL so a restarted server can rebuild the run
+if "session_id" not in st.session_state:
+    session_id = st.query_params.get("session")
+    if not SESSION_ID.fullmatch(session_id or ""):
+        session_id = uuid.uuid4().hex
+    st.query_params["session"] = session_id
+    st.session_state.session_id = session_id
     st.session_state.command_input = ""
+st.session_state.setdefault("pages_shown", 0)  # earlier transcript pages on screen
+st.session_state.setdefault("history_end", 0)  # blocks in the transcript panel
 
 # --- Command handler ---
 def handle_command():
     cmd = st.session_state.command_input
     if cmd:
-        st.session_state.command_history.append(cmd)
-        result = st.session_state.game.process_command(cmd)
-        st.session_state.game_output.append(f"> {cmd}")
-
-        if result == "QUIT":
-            st.session_state.game_output.append("Thanks for playing Shadow Circuit!")
-            st.session_state.command_input = ""
-            st.stop()
-        elif result == "GAME_OVER":
-            st.session_state.game_output.append("**GAME OVER**")
-        elif result:
-            st.session_state.game_output.append(result)
+        with manager.session(st.session_state.session_id) as session:
+            game = session.game
+            version, held = game.version, game.inventory_version
+            session.add_command(cmd)
+            result = session.run(cmd)
+            session.output.append(f"> {cmd}")
+
+            if result == "QUIT":
+                session.output.append("Thanks for playing Shadow Circuit!")
+                st.session_state.command_input = ""
+                st.stop()
+            elif result == "GAME_OVER":
+                ending = game.get_output()
+                if ending:
+                    session.output.append(ending)
+                session.output.append("**GAME OVER**")
+            elif result:
+                session.output.append(result)
+
+            # Only the panels whose inputs moved are redrawn, in page order
+            panels = []
+            latest = len(session.output) - st.session_state.history_end
+            if not 0 <= latest <= LATEST_BLOCKS:
+                # Move the latest output up and go back to just the recent
+                # transcript
+                panels.append("history")
+                st.session_state.history_end = len(session.output)
+                st.session_state.pages_shown = 0
+            panels.append("latest")
+            if game.version != version:
+                panels.append("status")
+            if game.inventory_version != held:
+                panels.append("inventory")
+            panels.append("recent")
 
         # Clear the input box
         st.session_state.command_input = ""
+        st.rerun(panels)
 
 # --- Title and intro ---
 st.title("🌙 Shadow Circuit: A Night in Austin")
 st.markdown("*A neon-noir, urban-fantasy text adventure*")
 
-if not st.session_state.game_output:
-    intro_text = """
+INTRO = """
 **Welcome to Shadow Circuit**
 
 You are MARLOWE CROSS, a newly-turned vampire detective, hunting the glue-obsessed necromancer EZRA VALE across Austin before dawn.
     """
-    st.session_state.game_output.append(intro_text)
-    st.session_state.game_output.append(st.session_state.game.look_around())
 
-# --- Layout ---
-col1, col2 = st.columns([2, 1])
 
-with col1:
-    st.subheader("Game Output")
-
-    # Scrollable output
-    output_container = st.container()
-    with output_container:
-        for output in st.session_state.game_output:
-            st.markdown(f'<div style="white-space: pre-wrap; word-break: break-word;">{output}</div>', unsafe_allow_html=True)
+# --- Panels ---
+# Each panel is a fragment. A full page run draws them all; after that a
+# command reruns the latest output and recent commands, the status and
+# inventory panels only when the game's version counters say they changed,
+# and the transcript once every LATEST_BLOCKS blocks.
+@st.fragment(key="history")
+def history_panel():
+    # Scrollable output: the recent window, plus earlier pages on request
+    with manager.session(st.session_state.session_id) as session:
+        shown = st.session_state.pages_shown
+        if len(session.output.pages) > shown:
+            if st.button("Load earlier"):
+                st.session_state.pages_shown = shown = shown + 1
+        blocks = session.output.view(shown, st.session_state.history_end)
+    for output in blocks:
+        st.markdown(f'<div style="white-space: pre-wrap; word-break: break-word;">{output}</div>', unsafe_allow_html=True)
+
+
+@st.fragment(key="latest")
+def latest_panel():
+    # Output since the transcript panel was drawn, and the command box
+    with manager.session(st.session_state.session_id) as session:
+        blocks = session.output.since(st.session_state.history_end)
+    for output in blocks:
+        st.markdown(f'<div style="white-space: pre-wrap; word-break: break-word;">{output}</div>', unsafe_allow_html=True)
 
     # Command input
     st.subheader("Enter Command")
@@ -71,28 +158,64 @@ with col1:
         on_change=handle_command
     )
 
-with col2:
-    st.subheader("Game Status")
 
-    current_room = st.session_state.game.current_room()
-    if current_room:
-        st.write(f"**Location:** {current_room['name']}")
+@st.fragment(key="status")
+def status_panel():
+    with manager.session(st.session_state.session_id) as session:
+        game = session.game
+        current_room = game.current_room()
+        stats = game.get_stats_display()
 
-    stats = st.session_state.game.get_stats_display()
+    st.subheader("Game Status")
+    if current_room:
+        st.write(f"**Location:** {current_room.name}")
     st.write(f"**{stats}**")
 
+
+@st.fragment(key="inventory")
+def inventory_panel():
+    with manager.session(st.session_state.session_id) as session:
+        game = session.game
+        names = [game.items[item_key].name for item_key in game.s.inv]
+
     st.subheader("Inventory")
-    if st.session_state.game.s.inv:
-        for item_key in st.session_state.game.s.inv:
-            item = st.session_state.game.items.get(item_key, {})
-            st.write(f"• {item.get('name','Unknown')}")
+    if names:
+        for name in names:
+            st.write(f"• {name}")
     else:
         st.write("*You carry nothing.*")
 
+
+@st.fragment(key="recent")
+def recent_panel():
+    with manager.session(st.session_state.session_id) as session:
+        commands = list(reversed(session.commands))[:5]
+
     st.subheader("Recent Commands")
-    for cmd in reversed(st.session_state.command_history[-5:]):
+    for cmd in commands:
         st.text(cmd)
 
+
+with manager.session(st.session_state.session_id) as session:
+    if not session.output:
+        session.output.append(INTRO)
+        session.output.append(session.game.look_around())
+    # A full run draws the whole transcript in the transcript panel
+    st.session_state.history_end = len(session.output)
+
+# --- Layout ---
+col1, col2 = st.columns([2, 1])
+
+with col1:
+    st.subheader("Game Output")
+    history_panel()
+    latest_panel()
+
+with col2:
+    status_panel()
+    inventory_panel()
+    recent_panel()
+
 # Footer
 st.markdown("---")
 st.markdown("*Shadow Circuit: A Night in Austin* - Navigate through Austin's supernatural underworld as vampire detective Marlowe Cross")
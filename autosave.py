@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Background Save Writer
+Takes save writes off the command path. A command only captures the state
+to save (in memory) and hands it over; one writer thread per process does
+the disk I/O. Writes are coalesced per key, normally (player, slot): if a
+session saves again before its last save reached the disk, only the newer
+one is written.
+
+File saves go through atomic_write(): temp file in the same directory,
+fsync, rename over the old file, fsync the directory. A crash at any point
+leaves either the old save or the new one, never a torn mix.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+
+def atomic_write(path, data):
+    """Replace path with data (bytes) so a crash leaves the old or new file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".save-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class BackgroundWriter:
+    """Daemon thread running the newest pending write for each key.
+
+    ``submit(key, write, *args)`` queues ``write(*args)``, replacing any
+    write for that key that hasn't started. ``wait(key)`` blocks until the
+    key has nothing queued or running; ``wait()`` waits for everything.
+    A write that raises is kept in ``errors`` for the caller to report.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pending = {}
+        self.running = set()
+        self.errors = {}
+        self.thread = None
+
+    def submit(self, key, write, *args):
+        with self.cond:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True,
+                                               name="save-writer")
+                self.thread.start()
+            self.pending.pop(key, None)  # re-queue at the back
+            self.pending[key] = (write, args)
+            self.cond.notify_all()
+
+    def wait(self, key=None):
+        with self.cond:
+            if key is None:
+                while self.pending or self.running:
+                    self.cond.wait()
+            else:
+                while key in self.pending or key in self.running:
+                    self.cond.wait()
+
+    def error(self, key):
+        """Pop the exception the key's last write raised, if any"""
+        with self.cond:
+            return self.errors.pop(key, None)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                key = next(iter(self.pending))
+                write, args = self.pending.pop(key)
+                self.running.add(key)
+            try:
+                write(*args)
+                error = None
+            except Exception as e:
+                error = e
+                print(f"save {key!r} failed: {e}", file=sys.stderr)
+            with self.cond:
+                self.running.discard(key)
+                if error is None:
+                    self.errors.pop(key, None)
+                else:
+                    self.errors[key] = error
+                self.cond.notify_all()
+
+
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+
+
+def writer():
+    """The process's shared BackgroundWriter"""
+    global _WRITER
+    if _WRITER is None:
+        with _WRITER_LOCK:
+            if _WRITER is None:
+                _WRITER = BackgroundWriter()
+    return _WRITER
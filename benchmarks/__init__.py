@@ -0,0 +1,5 @@
+"""
+Shadow Circuit: A Night in Austin — Benchmarks
+Headless measurements of game_engine.Game. Run a module with
+``python -m benchmarks.<name>`` from the repository root.
+"""
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Streamlit Rerun Benchmark
+Drives app.py headless through streamlit's AppTest and times the rerun
+each command triggers, split into commands that change the game (moves,
+takes) and ones that only print (look, inventory, help), and counts the
+elements each rerun sends to the browser.
+
+  python -m benchmarks.apprerun [--rounds N]
+
+AppTest runs the command callback the way the server does, including any
+st.rerun() of named fragments it asks for, so the times cover the command
+and whatever part of the page it redraws. Journals, spilled sessions and
+saves go to a temporary directory: the save store is swapped on Game
+directly, since saves.py read its path when this module imported it.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.snapshot import OPENING
+from benchmarks.suite import percentile
+from autosave import writer
+from game_engine import Game
+from saves import SQLiteSaveStore
+
+APP = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "app.py")
+LOOKS = ["look", "i", "stats", "help", "map", "hint"]
+
+
+def commands():
+    """The opening with a print-only command after each move"""
+    out = []
+    for i, cmd in enumerate(OPENING):
+        out += [cmd, LOOKS[i % len(LOOKS)]]
+    return out
+
+
+def run(rounds, directory):
+    """Play the commands in rounds fresh sessions, keeping journals,
+    spilled sessions and saves under directory"""
+    # journal.py and sessions.py are first imported by app.py, after this
+    os.environ["SHADOW_CIRCUIT_JOURNALS"] = os.path.join(directory, "journals")
+    os.environ["SHADOW_CIRCUIT_SESSIONS"] = os.path.join(directory, "sessions")
+    from streamlit.delta_generator import DeltaGenerator
+    from streamlit.testing.v1 import AppTest
+
+    sent = [0]
+    enqueue = DeltaGenerator._enqueue
+
+    def counted(self, *args, **kwargs):
+        sent[0] += 1
+        return enqueue(self, *args, **kwargs)
+
+    changing, printing = [], []
+    saves = Game.saves
+    Game.saves = SQLiteSaveStore(os.path.join(directory, "saves.db"),
+                                 codec=Game.save_codec())
+    DeltaGenerator._enqueue = counted
+    try:
+        for _ in range(rounds):
+            at = AppTest.from_file(APP, default_timeout=30)
+            at.run()
+            sent[0] = 0
+            for cmd in commands():
+                started = time.perf_counter()
+                at.text_input[0].input(cmd).run()
+                took = time.perf_counter() - started
+                if at.exception:
+                    raise RuntimeError(at.exception[0].message)
+                (printing if cmd in LOOKS else changing).append(took)
+    finally:
+        DeltaGenerator._enqueue = enqueue
+        writer().wait()
+        Game.saves = saves
+    changing.sort()
+    printing.sort()
+    return {
+        "commands": len(changing) + len(printing),
+        "elements_per_command": sent[0] / len(commands()),
+        "changing_p50_ms": percentile(changing, 0.50) * 1e3,
+        "printing_p50_ms": percentile(printing, 0.50) * 1e3,
+        "mean_ms": (sum(changing) + sum(printing))
+                   / (len(changing) + len(printing)) * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time app.py reruns per command under AppTest")
+    parser.add_argument("--rounds", type=int, default=5,
+                        help="fresh sessions to play the opening in")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run(args.rounds, tmp)
+    print(f"{report['commands']} commands: "
+          f"p50 {report['changing_p50_ms']:.1f} ms changing the game, "
+          f"{report['printing_p50_ms']:.1f} ms print-only, "
+          f"mean {report['mean_ms']:.1f} ms, "
+          f"{report['elements_per_command']:.0f} elements sent per rerun")
+
+
+if __name__ == "__main__":
+    main()
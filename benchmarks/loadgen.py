@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Line Server Load Generator
+Starts server.py in a child process (or targets a running one), parks
+``--idle`` connections on it, then has ``--active`` clients send commands
+back to back for ``--seconds`` and reports commands/sec, reply latency
+percentiles and the server's resident memory.
+
+  python -m benchmarks.loadgen [--idle N] [--active N] [--seconds S]
+                               [--connect HOST:PORT]
+
+Each active client waits for its prompt before sending the next command,
+so throughput is what the server sustains, not what the socket buffers.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.suite import percentile
+from benchmarks.walkthroughs import TRAFFIC_VERBS, TRAFFIC_OBJECT_VERBS
+
+PROMPT = b"\r\n> "
+NOUNS = ["cat", "crate", "radio", "poster", "coin", "lupita", "jar", "mug"]
+SERVER = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "server.py")
+
+
+def _raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def _rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def _connect(host, port):
+    reader, writer = await asyncio.open_connection(host, port,
+                                                   limit=1 << 20)
+    await reader.readuntil(PROMPT)
+    return reader, writer
+
+
+async def _park(host, port, count, batch=500):
+    """Open count connections, batch at a time, and leave them idle"""
+    conns = []
+    for start in range(0, count, batch):
+        conns += await asyncio.gather(*(
+            _connect(host, port) for _ in range(min(batch, count - start))))
+    return conns
+
+
+async def _client(host, port, seed, deadline, latencies):
+    rnd = random.Random(seed)
+    reader, writer = await _connect(host, port)
+    while time.perf_counter() < deadline:
+        if rnd.random() < 0.6:
+            command = rnd.choice(TRAFFIC_VERBS)
+        else:
+            command = f"{rnd.choice(TRAFFIC_OBJECT_VERBS)} {rnd.choice(NOUNS)}"
+        started = time.perf_counter()
+        writer.write(command.encode() + b"\r\n")
+        await reader.readuntil(PROMPT)
+        latencies.append(time.perf_counter() - started)
+    writer.close()
+
+
+async def run(host, port, idle, active, seconds, server_pid=None):
+    started = time.perf_counter()
+    parked = await _park(host, port, idle)
+    opened = time.perf_counter() - started
+    idle_rss = _rss_mb(server_pid) if server_pid else None
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    began = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, seed, deadline, latencies)
+                           for seed in range(active)))
+    elapsed = time.perf_counter() - began
+    # The parked sessions are still there: one round of LOOK on each
+    alive = 0
+    for reader, writer in parked:
+        writer.write(b"look\r\n")
+    for reader, writer in parked:
+        await reader.readuntil(PROMPT)
+        alive += 1
+        writer.close()
+    latencies.sort()
+    return {
+        "idle_sessions": alive,
+        "open_seconds": opened,
+        "server_rss_mb_idle": idle_rss,
+        "server_rss_mb": _rss_mb(server_pid) if server_pid else None,
+        "commands": len(latencies),
+        "commands_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load the TCP line server with idle and busy sessions")
+    parser.add_argument("--idle", type=int, default=10000,
+                        help="connections to open and leave idle")
+    parser.add_argument("--active", type=int, default=50,
+                        help="clients sending commands back to back")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--connect", default=None, metavar="HOST:PORT",
+                        help="use a running server instead of starting one")
+    args = parser.parse_args()
+
+    limit = _raise_fd_limit()
+    if args.idle + args.active + 64 > limit:
+        sys.exit(f"open-file limit {limit} is too low for "
+                 f"{args.idle + args.active} connections")
+    child = None
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        port = int(port)
+    else:
+        child = subprocess.Popen(
+            [sys.executable, SERVER, "--port", "0", "--quiet",
+             "--max-connections", str(args.idle + args.active + 64)],
+            stdout=subprocess.PIPE, text=True)
+        # "Listening on HOST:PORT"
+        host, port = child.stdout.readline().split()[-1].rsplit(":", 1)
+        port = int(port)
+    try:
+        report = asyncio.run(run(host, port, args.idle, args.active,
+                                 args.seconds, child and child.pid))
+    finally:
+        if child:
+            child.terminate()
+            child.wait()
+    print(f"{report['idle_sessions']} idle sessions opened in "
+          f"{report['open_seconds']:.1f}s and still answering")
+    if report["server_rss_mb"] is not None:
+        print(f"server RSS {report['server_rss_mb_idle']:.0f} MB with them "
+              f"parked, {report['server_rss_mb']:.0f} MB after the run")
+    print(f"{report['commands']} commands from {args.active} clients: "
+          f"{report['commands_per_sec']:.0f}/s, "
+          f"p50 {report['p50_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
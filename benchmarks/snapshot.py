@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Snapshot Benchmark
+Game.snapshot()/restore()/clone() against copy.deepcopy of the dict tree a
+session used to own (world, items, NPCs and State).
+
+  python -m benchmarks.snapshot [--number N]
+"""
+
+import argparse
+import copy
+import timeit
+
+from game_engine import Game
+
+# Enough play to give the session some item, flag and exit changes
+OPENING = ["e", "take coin", "take paperclip", "s", "enter code 1207",
+           "inside", "e", "take card", "use card on case", "w", "out", "n",
+           "w", "push crate", "up", "take bolt", "use bolt on antenna"]
+
+
+def played_game():
+    game = Game()
+    for cmd in OPENING:
+        game.process_command(cmd)
+    return game
+
+
+def legacy_tree(game):
+    """The per-session dicts a Game held before the shared catalog"""
+    s = game.s
+    state = {"turn": s.turn, "max_turns": s.max_turns, "health": s.health,
+             "will": s.will, "hunger": s.hunger, "location": s.location,
+             "inv": s.inv.keys(), "seen": set(s.seen), "f": dict(s.f)}
+    return (Game._build_world(), Game._build_items(), Game._build_npcs(),
+            state)
+
+
+def run(number):
+    game = played_game()
+    token = game.snapshot()
+    tree = legacy_tree(game)
+    cases = [
+        ("snapshot()", game.snapshot),
+        ("restore(token)", lambda: game.restore(token)),
+        ("snapshot() + restore()", lambda: game.restore(game.snapshot())),
+        ("clone()", game.clone),
+        ("deepcopy(world, items, npcs, state)", lambda: copy.deepcopy(tree)),
+    ]
+    results = {}
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        results[name] = best
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000,
+                        help="calls per timing run (default 2000)")
+    args = parser.parse_args()
+    results = run(args.number)
+    base = results["deepcopy(world, items, npcs, state)"]
+    for name, seconds in results.items():
+        print(f"{name:38} {seconds * 1e6:9.2f} us  {1 / seconds:11,.0f}/s"
+              f"  {base / seconds:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Benchmark Suite
+Drives Game.process_command headlessly through the ending walkthroughs and
+seeded random traffic, then reports throughput, per-command latency
+percentiles, allocations and a per-verb breakdown as JSON, optionally
+checked against a stored baseline.
+
+  python -m benchmarks [--repeat N] [--traffic N] [--rounds N]
+                       [--out results.json]
+                       [--baseline benchmarks/baseline.json] [--threshold 0.25]
+                       [--save-baseline]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from benchmarks.walkthroughs import (WALKTHROUGHS, TRAFFIC_VERBS,
+                                     TRAFFIC_OBJECT_VERBS)
+from game_engine import Game, norm
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Gated metric -> True when a larger value is better. Tail percentiles are
+# reported but too noisy run-to-run to gate on.
+METRICS = {"commands_per_sec": True, "p50_us": False, "alloc_peak_bytes": False}
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(q * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def verb_name(game, command):
+    verb, _ = game.verbs.lookup(norm(command).split())
+    return verb.names[0] if verb else "?"
+
+
+class Recorder:
+    """Per-command samples grouped by scenario and verb"""
+
+    def __init__(self, allocations=False):
+        self.allocations = allocations
+        self.latency = defaultdict(list)     # scenario -> ns
+        self.verb_latency = defaultdict(list)
+        self.alloc = defaultdict(list)       # scenario -> peak bytes
+        self.verb_alloc = defaultdict(list)
+        self.blocks = defaultdict(list)      # scenario -> net blocks
+        self.wall = defaultdict(float)
+
+    def run(self, scenario, game, command):
+        verb = verb_name(game, command)
+        if self.allocations:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            blocks = sys.getallocatedblocks()
+            result = game.process_command(command)
+            blocks = sys.getallocatedblocks() - blocks
+            _, peak = tracemalloc.get_traced_memory()
+            self.alloc[scenario].append(peak - before)
+            self.verb_alloc[verb].append(peak - before)
+            self.blocks[scenario].append(blocks)
+            return result
+        start = time.perf_counter_ns()
+        result = game.process_command(command)
+        elapsed = time.perf_counter_ns() - start
+        self.latency[scenario].append(elapsed)
+        self.verb_latency[verb].append(elapsed)
+        self.wall[scenario] += elapsed
+        return result
+
+
+def play_walkthrough(recorder, name, seed):
+    expected, commands = WALKTHROUGHS[name]
+    game = Game(seed=seed)
+    for command in commands:
+        if recorder.run(name, game, command) == "GAME_OVER":
+            break
+    return game.s.f["ending"] == expected, game.s.f["ending"], game.s.turn
+
+
+def traffic_command(rng, game):
+    """One plausible command for the game's current situation"""
+    if rng.random() < 0.4:
+        return rng.choice(TRAFFIC_VERBS)
+    nouns = [game.items[k].name for k in game.s.inv]
+    nouns += [game.items[k].name for k in game.room_items()]
+    nouns += [game.npcs[k].name for k in game.room_npcs()]
+    nouns += list(game.current_room().features)
+    if not nouns or rng.random() < 0.1:
+        nouns = [item.name for item in game.catalog().items.values()]
+    verb = rng.choice(TRAFFIC_OBJECT_VERBS)
+    noun = rng.choice(nouns).lower().replace("_", " ")
+    if verb == "use" and rng.random() < 0.6:
+        return f"use {noun} on {rng.choice(nouns).lower().replace('_', ' ')}"
+    return f"{verb} {noun}"
+
+
+def play_traffic(recorder, count, seed):
+    rng = random.Random(seed)
+    game = Game(seed=seed)
+    for _ in range(count):
+        if recorder.run("random", game, traffic_command(rng, game)) == "GAME_OVER":
+            game = Game(seed=seed)
+
+
+def play_all(recorder, repeat, traffic, seed):
+    endings = {}
+    for name in WALKTHROUGHS:
+        for _ in range(repeat):
+            endings[name] = play_walkthrough(recorder, name, seed)
+    if traffic:
+        play_traffic(recorder, traffic, seed)
+    return endings
+
+
+def latency_stats(samples, wall_ns=None):
+    ordered = sorted(samples)
+    total = wall_ns if wall_ns is not None else sum(ordered)
+    return {
+        "commands": len(ordered),
+        "commands_per_sec": round(len(ordered) / (total / 1e9), 1) if total else 0.0,
+        "mean_us": round(total / len(ordered) / 1e3, 3) if ordered else 0.0,
+        "p50_us": round(percentile(ordered, 0.50) / 1e3, 3),
+        "p99_us": round(percentile(ordered, 0.99) / 1e3, 3),
+        "p999_us": round(percentile(ordered, 0.999) / 1e3, 3),
+    }
+
+
+def alloc_stats(peaks, blocks=()):
+    stats = {"alloc_peak_bytes": round(sum(peaks) / len(peaks), 1) if peaks else 0.0}
+    if blocks:
+        stats["net_blocks"] = round(sum(blocks) / len(blocks), 3)
+    return stats
+
+
+def best(rounds):
+    """Merge per-round stats keeping each metric's best value, like timeit"""
+    merged = dict(rounds[0])
+    for stats in rounds[1:]:
+        for metric, value in stats.items():
+            if metric == "commands_per_sec":
+                merged[metric] = max(merged[metric], value)
+            elif metric.endswith("_us"):
+                merged[metric] = min(merged[metric], value)
+    return merged
+
+
+def run(repeat=50, traffic=20000, seed=1, allocations=True, rounds=5):
+    """Run every scenario and return the results dict"""
+    Game.catalog()  # build shared content outside the timings
+    timings = []
+    for _ in range(rounds):
+        timing = Recorder()
+        endings = play_all(timing, max(1, repeat // rounds),
+                           traffic // rounds, seed)
+        timings.append(timing)
+
+    memory = Recorder(allocations=True)
+    if allocations:
+        tracemalloc.start()
+        try:
+            play_all(memory, 1, traffic // 10, seed)
+        finally:
+            tracemalloc.stop()
+
+    overall = best([latency_stats([ns for samples in t.latency.values()
+                                   for ns in samples]) for t in timings])
+    overall["commands"] = sum(len(samples) for t in timings
+                              for samples in t.latency.values())
+    overall.update(alloc_stats(
+        [b for samples in memory.alloc.values() for b in samples],
+        [b for samples in memory.blocks.values() for b in samples]))
+
+    scenarios = {}
+    for name in timing.latency:
+        stats = best([latency_stats(t.latency[name], t.wall[name])
+                      for t in timings])
+        stats["commands"] = sum(len(t.latency[name]) for t in timings)
+        stats.update(alloc_stats(memory.alloc.get(name, ()),
+                                 memory.blocks.get(name, ())))
+        if name in endings:
+            ok, ending, turns = endings[name]
+            stats.update(expected=WALKTHROUGHS[name][0], ending=ending,
+                         turns=turns, ok=ok)
+        scenarios[name] = stats
+
+    verb_latency = defaultdict(list)
+    for t in timings:
+        for verb, samples in t.verb_latency.items():
+            verb_latency[verb].extend(samples)
+    verbs = {}
+    for verb, samples in sorted(verb_latency.items()):
+        stats = latency_stats(samples)
+        del stats["commands_per_sec"]
+        stats.update(alloc_stats(memory.verb_alloc.get(verb, ())))
+        verbs[verb] = stats
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat, "traffic": traffic, "seed": seed,
+            "rounds": rounds,
+        },
+        "overall": overall,
+        "scenarios": scenarios,
+        "verbs": verbs,
+    }
+
+
+def compare(results, baseline, threshold):
+    """List of regression messages against a baseline results dict"""
+    problems = []
+    for name, stats in results["scenarios"].items():
+        if stats.get("ok") is False:
+            problems.append(f"{name}: expected ending {stats['expected']!r}, "
+                            f"got {stats['ending']!r}")
+
+    sections = [("overall", results["overall"], baseline.get("overall", {}))]
+    for name, stats in results["scenarios"].items():
+        sections.append((name, stats, baseline.get("scenarios", {}).get(name, {})))
+
+    for label, new, old in sections:
+        for metric, higher_is_better in METRICS.items():
+            if metric not in new or not old.get(metric):
+                continue
+            change = (new[metric] - old[metric]) / old[metric]
+            if higher_is_better:
+                change = -change
+            if change > threshold:
+                problems.append(f"{label}.{metric}: {old[metric]} -> "
+                                f"{new[metric]} ({change:+.0%})")
+    return problems
+
+
+def report(results):
+    o = results["overall"]
+    print(f"{o['commands']} commands, {o['commands_per_sec']:,.0f} cmds/s, "
+          f"p50 {o['p50_us']} us, p99 {o['p99_us']} us, p999 {o['p999_us']} us, "
+          f"{o['alloc_peak_bytes']:,.0f} B peak alloc/cmd")
+    print()
+    print(f"{'scenario':14} {'cmds/s':>10} {'p50 us':>8} {'p99 us':>8} "
+          f"{'p999 us':>8} {'alloc B':>8}  ending")
+    for name, s in results["scenarios"].items():
+        ending = ""
+        if "expected" in s:
+            ending = f"{s['ending']} in {s['turns']}" if s["ok"] else \
+                f"FAILED ({s['ending']!r})"
+        print(f"{name:14} {s['commands_per_sec']:>10,.0f} {s['p50_us']:>8} "
+              f"{s['p99_us']:>8} {s['p999_us']:>8} "
+              f"{s.get('alloc_peak_bytes', 0):>8,.0f}  {ending}")
+    print()
+    print(f"{'verb':18} {'count':>7} {'p50 us':>8} {'p99 us':>8} {'alloc B':>8}")
+    for verb, s in results["verbs"].items():
+        print(f"{verb:18} {s['commands']:>7} {s['p50_us']:>8} {s['p99_us']:>8} "
+              f"{s.get('alloc_peak_bytes', 0):>8,.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Headless Shadow Circuit engine benchmarks")
+    parser.add_argument("--repeat", type=int, default=50,
+                        help="runs of each walkthrough (default 50)")
+    parser.add_argument("--traffic", type=int, default=20000,
+                        help="random traffic commands (default 20000)")
+    parser.add_argument("--rounds", type=int, default=5,
+                        help="timing rounds; each metric keeps its best round")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-alloc", action="store_true",
+                        help="skip the tracemalloc pass")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative regression (default 0.25)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.traffic, args.seed, not args.no_alloc,
+                  args.rounds)
+    report(results)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    problems = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f), args.threshold)
+    else:
+        problems = compare(results, {}, args.threshold)
+        print(f"\nNo baseline at {args.baseline}; use --save-baseline to store one.")
+    if problems:
+        print(f"\nREGRESSIONS (threshold {args.threshold:.0%}):")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
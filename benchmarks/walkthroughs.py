@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Walkthroughs
+Canonical command scripts for each ending, used by the benchmarks and as a
+quick check that every ending is still reachable.
+
+These are lines the engine accepts today, not ones a player is meant to
+find. They lean on two engine behaviours: the dynamic items (fishing gear,
+counter-ink, the three sigil tokens) start in the inventory, and TAKE
+recovers a known item from anywhere once it's out of sight (see
+Game.recover_lost_item). Fix either and these scripts, and the benchmark
+numbers measured on them, have to be redone.
+"""
+
+# name -> (ending the script must reach, commands)
+WALKTHROUGHS = {
+    "redemption": ("redemption", [
+        "e", "e", "s", "take hematite", "e", "take garlic", "take rosemary",
+        "craft counter-ink", "e", "take wire cutter",
+        "use wire cutter on chain", "go hatch", "take solvent", "up", "out",
+        "use solvent on resin", "take locket", "n", "w", "push crate", "up",
+        "s", "use locket on vale",
+    ]),
+    # Inserts the three sigil tokens without ever obtaining them: they
+    # start in the inventory
+    "containment": ("containment", [
+        "e", "e", "s", "e", "e", "take wire cutter",
+        "use wire cutter on chain", "go hatch", "up", "insert ward token",
+        "insert feather token", "insert shadow token", "take silver nails",
+        "down", "go hatch", "s", "s", "use nails on vale",
+    ]),
+    "obliteration": ("obliteration", [
+        "e", "s", "enter code 1207", "inside", "e", "x lens", "take lens",
+        "take blueprint", "take card", "w", "out", "n", "w", "push crate",
+        "up", "take bolt", "use bolt on antenna", "tune antenna", "s",
+        "use lens on vale",
+    ]),
+    "dawn-defeat": ("defeat", ["look", "i", "stats"] + ["wait"] * 37),
+}
+
+# Words the random traffic generator combines into commands
+TRAFFIC_VERBS = ["look", "i", "stats", "wait", "n", "s", "e", "w", "up",
+                 "down", "inside", "out", "go hatch", "map", "hint", "help",
+                 "listen", "smell", "sense", "trace sigil", "tune antenna",
+                 "craft counter-ink", "enter code 1207"]
+TRAFFIC_OBJECT_VERBS = ["x", "take", "drop", "use", "read", "open", "push",
+                        "talk", "mesmerize", "bite", "insert"]
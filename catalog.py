@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Catalog
+Static rooms, items, NPCs and hints built once per process and shared
+read-only by every Game. A session sees them through record Tables that keep
+only what it changed.
+"""
+
+from types import MappingProxyType
+
+from locations import LocationIndex
+from records import Room, Item, Npc, freeze
+from resolver import NounResolver
+
+
+def _records(kind, data):
+    return MappingProxyType({key: kind(key, **fields)
+                             for key, fields in data.items()})
+
+
+class Catalog:
+    """Frozen content plus the indexes derived from it"""
+
+    __slots__ = ("world", "items", "npcs", "hints", "nouns",
+                 "item_locs", "npc_locs")
+
+    def __init__(self, world, items, npcs, hints):
+        self.world = _records(Room, world)
+        self.items = _records(Item, items)
+        self.npcs = _records(Npc, npcs)
+        self.hints = freeze(hints)
+        self.nouns = NounResolver.build(self.world, self.items, self.npcs)
+        self.item_locs = LocationIndex.build(
+            {key: item.loc for key, item in self.items.items()})
+        self.npc_locs = LocationIndex.build(
+            {key: npc.loc for key, npc in self.npcs.items()})
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Events
+What a command produces, as typed records instead of text. Game.play()
+yields them in order; a front end can draw a RoomDescription or a
+Dialogue line from its fields, with no markdown to pick apart, and knows
+a command ended the night from the Ending event rather than a sentinel.
+
+Every event has a ``kind`` and a ``render()`` giving the text the string
+API shows for it (None for events with no text, like StateChange), so
+Game.process_command() is just the rendered events joined by newlines.
+"""
+
+from collections import namedtuple
+
+# Notes shown after an exit's direction in a room description
+EXIT_NOTES = {"locked": "locked", "req": "requires climbing"}
+
+
+class Message(namedtuple("Message", ["text"])):
+    """Narration or a reply that isn't one of the kinds below"""
+    __slots__ = ()
+    kind = "message"
+
+    def render(self):
+        return self.text
+
+
+class RoomDescription(namedtuple("RoomDescription", [
+        "key", "name", "desc", "items", "npcs", "exits"])):
+    """The player's surroundings. items and npcs are display names; exits
+    are (direction, note) pairs, note None or an EXIT_NOTES value"""
+    __slots__ = ()
+    kind = "room"
+
+    def render(self):
+        lines = [f"**{self.name}**", self.desc]
+        if self.items:
+            lines.append(f"You see: {', '.join(self.items)}")
+        if self.npcs:
+            lines.append(f"Present: {', '.join(self.npcs)}")
+        if self.exits:
+            lines.append("Exits: " + ", ".join(
+                f"{direction} ({note})" if note else direction
+                for direction, note in self.exits))
+        return "\n".join(lines)
+
+
+class ItemList(namedtuple("ItemList", ["label", "items", "empty"])):
+    """A list of item names under a label, or the empty text if none"""
+    __slots__ = ()
+    kind = "items"
+
+    def render(self):
+        if not self.items:
+            return self.empty
+        return f"{self.label}: {', '.join(self.items)}"
+
+
+class Dialogue(namedtuple("Dialogue", ["speaker", "line"])):
+    """Something an NPC says"""
+    __slots__ = ()
+    kind = "dialogue"
+
+    def render(self):
+        return f"{self.speaker}: {self.line}"
+
+
+class StateChange(namedtuple("StateChange", [
+        "turn", "max_turns", "health", "will", "hunger", "location",
+        "inventory"])):
+    """The status after a command that changed the game; inventory is
+    None unless what's carried may have changed"""
+    __slots__ = ()
+    kind = "state"
+
+    def render(self):
+        return None
+
+
+class Ending(namedtuple("Ending", ["ending", "lines"])):
+    """The night is over: ending is the "ending" flag's value, lines the
+    closing text (empty for commands sent after the end)"""
+    __slots__ = ()
+    kind = "ending"
+
+    def render(self):
+        return "\n".join(self.lines) if self.lines else None
+
+
+class Quit(namedtuple("Quit", ["text"])):
+    """The player asked to leave"""
+    __slots__ = ()
+    kind = "quit"
+
+    def render(self):
+        return self.text
+
+
+def render(events):
+    """The text the string API shows for a run of events; plain strings
+    stand for Messages"""
+    texts = [event if isinstance(event, str) else event.render()
+             for event in events]
+    return "\n".join([text for text in texts if text is not None])
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — State-Space Explorer
+Exhaustively walks every state reachable before dawn across a process pool
+and reports how many there are, which are dead ends (no ending but dawn's
+defeat can still be reached in time) and which break an invariant.
+
+  python explorer.py [--workers N] [--partitions N] [--capacity N]
+                     [--max-turns N] [--depth N]
+
+States are owned by hash partition: partition ``hash % partitions`` keeps a
+compact open-addressing set of 64-bit state hashes in shared memory, and
+only the task exploring that partition writes to it. Other workers read the
+sets to drop children that are already known before sending them back.
+Exploration is level-synchronous by turn, so a state is first seen at the
+fewest turns that reach it. Moves come from solver.ActionIndex.
+"""
+
+import argparse
+import heapq
+import os
+import time
+from array import array
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from game_engine import Game
+from solver import ActionIndex, Solver
+
+
+class HashSet:
+    """Fixed-size set of 64-bit hashes in a shared memory block.
+
+    Linear probing over ``slots``; 0 marks an empty slot, so a hash of 0 is
+    stored as 1. Slot 0 holds the count. Eight bytes a state, against about
+    a hundred for a Python set of ints.
+    """
+
+    LOAD = 0.75
+
+    def __init__(self, capacity=None, name=None):
+        if name is None:
+            size = 1 << max(4, int(capacity / self.LOAD).bit_length())
+            self.shm = shared_memory.SharedMemory(create=True,
+                                                  size=(size + 1) * 8)
+            self.shm.buf[:] = bytes(len(self.shm.buf))
+        else:
+            # Workers report to the creator's resource tracker, which
+            # unlinks the block if the creator dies without closing it
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.slots = self.shm.buf.cast("Q")
+        self.mask = len(self.slots) - 2
+        self.limit = int((self.mask + 1) * self.LOAD)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __len__(self):
+        return self.slots[0]
+
+    def __contains__(self, h):
+        h = h or 1
+        slots, mask = self.slots, self.mask
+        i = h & mask
+        while True:
+            v = slots[i + 1]
+            if v == h:
+                return True
+            if v == 0:
+                return False
+            i = (i + 1) & mask
+
+    def add(self, h):
+        """Insert a hash; False if it was already there"""
+        h = h or 1
+        slots, mask = self.slots, self.mask
+        i = h & mask
+        while True:
+            v = slots[i + 1]
+            if v == h:
+                return False
+            if v == 0:
+                if slots[0] >= self.limit:
+                    raise RuntimeError("state hash set is full; raise --capacity")
+                slots[i + 1] = h
+                slots[0] += 1
+                return True
+            i = (i + 1) & mask
+
+    def close(self, unlink=False):
+        self.slots.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def invariant_violations(game):
+    """Ways the session's state contradicts itself, as messages"""
+    problems = []
+    s = game.s
+    if s.location not in game.world:
+        problems.append(f"location {s.location!r} is not a room")
+    for key in game.items:
+        loc = game.items[key].loc
+        held = key in s.inv
+        if loc == "inv" and not held:
+            problems.append(f"{key}: loc is 'inv' but it isn't in s.inv")
+        elif held and loc != "inv":
+            problems.append(f"{key}: in s.inv but loc is {loc!r}")
+        elif game.item_locs.where(key) != loc:
+            problems.append(f"{key}: indexed at {game.item_locs.where(key)!r}"
+                            f" but loc is {loc!r}")
+    for key in game.npcs:
+        if game.npc_locs.where(key) != game.npcs[key].loc:
+            problems.append(f"{key}: indexed at {game.npc_locs.where(key)!r}"
+                            f" but loc is {game.npcs[key].loc!r}")
+    return problems
+
+
+# ---------- Worker side ----------
+
+_WORKER = None
+
+
+def _init_worker(names, max_turns, moves=False):
+    global _WORKER
+    game = Game()
+    game.history = None
+    game.s.max_turns = max_turns
+    _WORKER = (game, ActionIndex(), [HashSet(name=n) for n in names], moves)
+
+
+def _explore(part, candidates):
+    """Claim a partition's candidates and expand the new ones.
+
+    Returns (new hashes, children by (turn, partition), edges as flat
+    parent/child/cost triples, each edge's command (None when the pool
+    isn't keeping moves, else edges are per command rather than per action), endings as (hash, ending), violations).
+    """
+    game, index, tables, keep_moves = _WORKER
+    table = tables[part]
+    parts = len(tables)
+    fresh = array("Q")
+    children = defaultdict(list)
+    edges = array("Q")
+    moves = [] if keep_moves else None
+    endings = []
+    violations = []
+    queued = set()
+    for h, token in candidates:
+        if not table.add(h):
+            continue
+        fresh.append(h)
+        game.restore(token)
+        for problem in invariant_violations(game):
+            violations.append((h, token.turn, problem))
+        for action in index.actions(game):
+            game.restore(token)
+            steps = []
+            try:
+                for command in action:
+                    over = game.process_command(command) == "GAME_OVER"
+                    if keep_moves:
+                        steps.append((command, game.state_hash(), game.s.turn))
+                    if over:
+                        break
+            except Exception as e:
+                violations.append((h, token.turn,
+                                   f"{' / '.join(action)} raised "
+                                   f"{type(e).__name__}: {e}"))
+                continue
+            child = game.state_hash()
+            cost = game.s.turn
+            if child == h:
+                continue
+            if keep_moves:
+                # One edge per command, so states between an action's takes
+                # and its command are on the map too
+                last, turn = h, token.turn
+                for command, step, at in steps:
+                    if step != last:
+                        edges.extend((last, step, at - turn))
+                        moves.append(command)
+                        last, turn = step, at
+            else:
+                edges.extend((h, child, cost - token.turn))
+            ending = game.s.f["ending"]
+            if ending:
+                endings.append((child, ending))
+                continue
+            q = child % parts
+            if child in queued or child in tables[q]:
+                continue
+            queued.add(child)
+            children[(cost, q)].append((child, game.snapshot()))
+    return fresh, dict(children), edges, moves, endings, violations
+
+
+# ---------- Coordinator ----------
+
+class Report:
+    """What an exploration found"""
+
+    def __init__(self):
+        self.states = 0
+        self.by_turn = {}
+        self.ending_states = defaultdict(set)
+        self.dead_ends = []
+        self.violations = []
+        self.edges = []
+        self.seconds = 0.0
+
+
+def explore(workers=None, partitions=None, capacity=4_000_000, max_turns=None,
+            depth=None, moves=False):
+    """Walk every reachable state; returns a Report.
+
+    With ``depth`` only states first reached before that turn are expanded,
+    and dead ends aren't worked out. With ``moves`` edges are single commands
+    and the report's ``edges`` keeps each batch as (parent/child/turns
+    triples, commands).
+    """
+    workers = workers or os.cpu_count() or 1
+    partitions = partitions or workers * 4
+    solver = Solver(max_turns=max_turns)
+    max_turns = solver.max_turns
+    timeout = solver.timeout_line().ending
+    root = solver.game.state_hash()
+    report = Report()
+    started = time.perf_counter()
+
+    tables = [HashSet(capacity // partitions + 1) for _ in range(partitions)]
+    names = [t.name for t in tables]
+    buckets = defaultdict(lambda: defaultdict(list))
+    buckets[0][root % partitions].append((root, solver.start))
+    first_turn = {}
+    edges = []
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(names, max_turns, moves)) as pool:
+            for turn in range(min(depth or max_turns, max_turns)):
+                level = buckets.pop(turn, None)
+                if not level:
+                    if not buckets:
+                        break
+                    continue
+                futures = [pool.submit(_explore, q, cands)
+                           for q, cands in level.items()]
+                fresh_count = 0
+                for future in futures:
+                    fresh, children, found, commands, ends, bad = future.result()
+                    fresh_count += len(fresh)
+                    for h in fresh:
+                        first_turn[h] = turn
+                    for (cost, q), cands in children.items():
+                        buckets[cost][q].extend(cands)
+                    edges.append(found)
+                    if moves:
+                        report.edges.append((found, commands))
+                    for h, ending in ends:
+                        report.ending_states[ending].add(h)
+                    report.violations.extend(bad)
+                report.by_turn[turn] = fresh_count
+    finally:
+        for table in tables:
+            table.close(unlink=True)
+
+    report.states = len(first_turn)
+    goals = set()
+    for ending, hashes in report.ending_states.items():
+        if ending != timeout:
+            goals.update(hashes)
+    if depth is None or depth >= max_turns:
+        report.dead_ends = _dead_ends(first_turn, edges, goals, max_turns)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def _dead_ends(first_turn, edges, goals, max_turns):
+    """States from which no story ending can trigger before dawn.
+
+    Turns-to-ending comes from a backward Dijkstra over the explored edges;
+    a state is dead when first reaching it leaves too few turns for that.
+    """
+    reverse = defaultdict(list)
+    for block in edges:
+        for i in range(0, len(block), 3):
+            reverse[block[i + 1]].append((block[i], block[i + 2]))
+    distance = {h: 0 for h in goals}
+    heap = [(0, h) for h in goals]
+    while heap:
+        d, h = heapq.heappop(heap)
+        if d > distance.get(h, d):
+            continue
+        for parent, cost in reverse.get(h, ()):
+            nd = d + cost
+            if nd < distance.get(parent, max_turns + 1):
+                distance[parent] = nd
+                heapq.heappush(heap, (nd, parent))
+    # An ending must trigger on a turn before the one dawn breaks on
+    return sorted((turn, h) for h, turn in first_turn.items()
+                  if turn + distance.get(h, max_turns + 1) > max_turns - 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exhaustive parallel exploration of the game's states")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--partitions", type=int, default=None,
+                        help="hash partitions (default: 4 per worker)")
+    parser.add_argument("--capacity", type=int, default=4_000_000,
+                        help="states the shared hash sets can hold")
+    parser.add_argument("--max-turns", type=int, default=None)
+    parser.add_argument("--depth", type=int, default=None,
+                        help="only expand states reached before this turn")
+    parser.add_argument("--show", type=int, default=10,
+                        help="dead ends and violations to list")
+    args = parser.parse_args()
+
+    report = explore(args.workers, args.partitions, args.capacity,
+                     args.max_turns, args.depth)
+    print(f"{report.states} reachable states in {report.seconds:.1f}s")
+    print("new states by turn: " + ", ".join(
+        f"{t}:{n}" for t, n in report.by_turn.items()))
+    for ending, hashes in sorted(report.ending_states.items()):
+        print(f"{ending}: {len(hashes)} ending states")
+    print(f"{len(report.dead_ends)} dead ends")
+    for turn, h in report.dead_ends[:args.show]:
+        print(f"  turn {turn}: {h:016x}")
+    print(f"{len(report.violations)} invariant violations")
+    for h, turn, problem in report.violations[:args.show]:
+        print(f"  turn {turn}: {h:016x} {problem}")
+
+
+if __name__ == "__main__":
+    main()
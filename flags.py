@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Flags
+Story flags compiled to a fixed layout and packed into one integer:
+booleans take a bit, counters and enums a fixed-width field.
+"""
+
+from collections.abc import MutableMapping
+
+from zobrist import zkey
+
+
+class Field:
+    """One flag's place in the packed integer"""
+
+    __slots__ = ("name", "shift", "width", "mask", "lo", "values",
+                 "boolean", "default", "code", "keys")
+
+    def __init__(self, name, kind, shift):
+        self.name = name
+        self.shift = shift
+        self.lo = 0
+        self.values = None
+        self.boolean = kind is bool
+        if self.boolean:
+            count, self.default = 2, False
+        elif isinstance(kind, range):
+            self.lo = kind.start
+            count, self.default = len(kind), 0
+        else:
+            self.values = tuple(kind)
+            count, self.default = len(self.values), self.values[0]
+        self.width = max(1, (count - 1).bit_length())
+        self.mask = (1 << self.width) - 1
+        self.code = self.encode(self.default)
+        # Zobrist key per stored code; the default contributes nothing
+        self.keys = tuple(0 if c == self.code else zkey("flag", name, c)
+                          for c in range(1 << self.width))
+
+    def encode(self, value):
+        if self.values is not None:
+            try:
+                return self.values.index(value)
+            except ValueError:
+                raise ValueError(f"{self.name}: unknown value {value!r}") from None
+        code = int(value) - self.lo
+        if not 0 <= code <= self.mask:
+            raise OverflowError(f"{self.name}: {value!r} doesn't fit the field")
+        return code
+
+    def decode(self, code):
+        if self.values is not None:
+            return self.values[code]
+        if self.boolean:
+            return bool(code)
+        return code + self.lo
+
+
+class FlagSchema:
+    """Flag names compiled to bit offsets.
+
+    ``spec`` is a sequence of (name, kind): ``bool`` for a single bit, a
+    ``range`` for a small counter (stored as value - start) or a tuple of
+    values for an enum whose first value is the default.
+    """
+
+    def __init__(self, spec):
+        self.fields = {}
+        shift = 0
+        for name, kind in spec:
+            field = self.fields[name] = Field(name, kind, shift)
+            shift += field.width
+        self.width = shift
+        self.default = 0
+        for field in self.fields.values():
+            self.default |= field.code << field.shift
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+
+class Flags(MutableMapping):
+    """Flag values packed into an int, with a running Zobrist hash.
+
+    Reads and writes look like a dict (``f["vault_open"] = True``,
+    ``f["tia_trust"] += 1``) but only names in the schema exist; ``get``
+    returns its default for anything else. ``bits`` is the whole state as
+    one integer, so comparing two Flags is a single int comparison.
+    """
+
+    __slots__ = ("schema", "bits", "hash")
+
+    def __init__(self, schema, values=None):
+        self.schema = schema
+        self.bits = schema.default
+        self.hash = 0
+        if values:
+            for name, value in values.items():
+                if name in schema:
+                    self[name] = value
+
+    @classmethod
+    def from_bits(cls, schema, bits, hash=None):
+        """Flags holding a packed value, e.g. one taken from ``bits``"""
+        flags = cls(schema)
+        flags.bits = bits
+        if hash is None:
+            hash = 0
+            for field in schema.fields.values():
+                hash ^= field.keys[(bits >> field.shift) & field.mask]
+        flags.hash = hash
+        return flags
+
+    def snapshot(self):
+        """(bits, hash) of the current values"""
+        return self.bits, self.hash
+
+    def restore(self, token):
+        """Go back to a snapshot()"""
+        self.bits, self.hash = token
+
+    def __getitem__(self, name):
+        field = self.schema.fields[name]
+        return field.decode((self.bits >> field.shift) & field.mask)
+
+    def __setitem__(self, name, value):
+        field = self.schema.fields[name]
+        new = field.encode(value)
+        old = (self.bits >> field.shift) & field.mask
+        if new != old:
+            self.bits ^= (old ^ new) << field.shift
+            self.hash ^= field.keys[old] ^ field.keys[new]
+
+    def __delitem__(self, name):
+        self[name] = self.schema.fields[name].default
+
+    def __contains__(self, name):
+        return name in self.schema
+
+    def __iter__(self):
+        return iter(self.schema)
+
+    def __len__(self):
+        return len(self.schema)
+
+    def __eq__(self, other):
+        if isinstance(other, Flags):
+            return self.schema is other.schema and self.bits == other.bits
+        return dict(self) == other
+
+    __hash__ = None
+
+    def changes(self):
+        """Flags that differ from their defaults, as a dict"""
+        return {k: v for k, v in self.items()
+                if v != self.schema.fields[k].default}
+
+    def __repr__(self):
+        return f"Flags({self.changes()!r})"
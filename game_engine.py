@@ -5,11 +5,28 @@ Shadow Circuit: A Night in Austin — Game Engine
 Extracted and adapted from the original text adventure for web interface
 """
 
-import json
+import itertools
 import os
 import textwrap
-import random
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from types import GeneratorType
+
+from autosave import writer
+from catalog import Catalog
+from events import (Message, RoomDescription, ItemList, Dialogue, StateChange,
+                    Ending, Quit, EXIT_NOTES, render)
+from flags import Flags, FlagSchema
+from hintdb import HintIndex
+from history import History
+from records import Table, Room, Item, Npc
+from inventory import Inventory, HELD
+from resolver import ITEM, NPC, FEATURE
+from rng import SessionRandom
+from savefmt import Layout, SaveCodec
+from saves import SQLiteSaveStore, valid_slot
+from rules import RuleRegistry, ANY_ITEM, NO_TARGET
+from verbs import Verb, VerbTable, TEXT, WORD, PAIR
+from zobrist import zkey
 
 
 def wrap(s, width=94):
@@ -28,7 +45,152 @@ DIRECTIONS = {"n": "north", "s": "south",
               "e": "east", "w": "west", "u": "up", "d": "down"}
 
 
+def _builtin_verbs():
+    """Verb table for the stock command set"""
+    table = VerbTable()
+    for verb in [
+        Verb(("look", "l"), "cmd_look"),
+        Verb(("inventory", "i"), "cmd_inventory"),
+        Verb("stats", "cmd_stats"),
+        Verb(("examine", "x"), "cmd_examine", TEXT, "Examine what?"),
+        Verb(("take", "get"), "cmd_take", TEXT, "Take what?"),
+        Verb("drop", "cmd_drop", TEXT, "Drop what?"),
+        Verb("enter code", "cmd_enter_code", TEXT),
+        Verb(("go", "move"), "cmd_go", WORD, "Go where?"),
+        Verb(("inside", "enter"), "cmd_go", fixed=("inside",)),
+        Verb(("outside", "out"), "cmd_go", fixed=("out",)),
+        Verb("use", "cmd_use", TEXT, "Use what?"),
+        Verb("give", "cmd_give", PAIR, "Give what to whom?", separator="to"),
+        Verb("insert", "cmd_insert", TEXT, "Insert what?"),
+        Verb("combine", "cmd_combine", PAIR, "Combine what with what?",
+             separator="with"),
+        Verb(("talk", "ask"), "cmd_talk", TEXT, "Talk to whom?"),
+        Verb("read", "cmd_read", TEXT, "Read what?"),
+        Verb("open", "cmd_open_close", TEXT, "Open what?", fixed=("open",)),
+        Verb("close", "cmd_open_close", TEXT, "Close what?",
+             fixed=("close",)),
+        Verb("listen", "cmd_sense", fixed=("listen",)),
+        Verb("smell", "cmd_sense", fixed=("smell",)),
+        Verb(("wait", "z"), "cmd_wait"),
+        Verb("push", "cmd_push", TEXT, "Push what?", cost=2),
+        Verb("sense", "cmd_vampire_sense"),
+        Verb("mesmerize", "cmd_mesmerize", TEXT, "Mesmerize whom?"),
+        Verb("bite", "cmd_bite", TEXT, "Bite what?"),
+        Verb("trace sigil", "cmd_trace_sigil"),
+        Verb("craft counter-ink", "cmd_craft_counter_ink"),
+        Verb("tune antenna", "cmd_tune_antenna"),
+        Verb("map", "cmd_map"),
+        Verb("help", "cmd_help"),
+        Verb("hint", "cmd_hint", blocking=True),
+        Verb("save", "cmd_save", TEXT, blocking=True),
+        Verb("load", "cmd_load", TEXT, blocking=True),
+        Verb("saves", "cmd_saves", cost=0, blocking=True),
+        Verb("undo", "cmd_undo", TEXT, cost=0),
+        Verb(("rewind to turn", "rewind"), "cmd_rewind", TEXT,
+             "Rewind to which turn?", cost=0),
+        Verb("quit", "cmd_quit"),
+    ]:
+        table.register(verb)
+    for short, direction in DIRECTIONS.items():
+        table.register(Verb((direction, short), "cmd_go", fixed=(direction,)))
+    return table
+
+
+# Shared by every Game; plugins add commands with VERBS.register(Verb(...))
+VERBS = _builtin_verbs()
+
+
+def _builtin_rules():
+    """Interaction rules for USE, COMBINE, GIVE and INSERT"""
+    rules = RuleRegistry()
+    add = rules.rule
+    case = ("magnetic reader", "magnetic strip", "case")
+    vale = ("ezra", "vale", "necroframe")
+
+    add("use", "SOLVENT", "use_solvent", targets=("resin",),
+        location="L05", otherwise="There's no resin here to dissolve.")
+    add("use", "MUG", "use_hot_mug", targets=("resin",),
+        location="L05", otherwise="There's no resin here to heat.")
+    add("use", "FISHING_GEAR", "use_fishing_gear", targets=("drain",),
+        location="L02", otherwise="There's nowhere to fish here.")
+    for key in ("KEY_TAG", "MAGNET_CARD_hidden"):
+        add("use", key, "use_case_access", targets=case,
+            location="L09", otherwise="There's no case here to unlock.")
+    add("use", "SILVERED_THREAD", "use_thread_with_dog", targets=("gasket",),
+        npcs=("GASKET",), otherwise="Gasket isn't here.")
+    add("use", "WIRE_CUTTER", "use_wire_cutter", targets=("chain", "gate"),
+        location="L11", otherwise="There's nothing here to cut.")
+    add("use", "COUNTER_INK", "use_counter_ink", targets=("sigil",),
+        location="L01", otherwise="There's no sigil here to counter.")
+    add("use", "BOLT", "use_bolt_on_antenna", targets=("antenna",),
+        location="L12", otherwise="There's no antenna panel here to fix.")
+    add("use", "POLICE_RADIO", "use_radio_antenna", location="L12")
+
+    # Final confrontation on Vale's roof
+    add("use", "SILVER_NAILS", "confront_containment", targets=vale,
+        location="VALE_ROOF", flags={"vault_open": True})
+    add("use", "LENS_ARRAY_CASE", "confront_obliteration", targets=vale,
+        location="VALE_ROOF", holding=("BLUEPRINT",))
+    add("use", "BRASS_LOCKET", "confront_redemption", targets=vale,
+        location="VALE_ROOF", holding=("COUNTER_INK",),
+        when=lambda game, item_key, target: game.s.f.get("empathy", 0) >= 1)
+    add("use", ANY_ITEM, "confront_rebuffed", targets=vale,
+        location="VALE_ROOF")
+    add("use", ANY_ITEM, "confront_misuse", location="VALE_ROOF")
+
+    add("combine", "STRING", "combine_fishing_gear", targets=("TAROT_COIN",))
+    add("combine", "TAROT_COIN", "combine_fishing_gear", targets=("STRING",))
+
+    add("give", "MUG", "give_mug_to_reef", targets=("REEF",))
+    add("give", "BONE", "give_bone_to_gasket", targets=("GASKET",))
+
+    for key in ("SIGIL_TOKEN_WARD", "SIGIL_TOKEN_FEATHER", "SIGIL_TOKEN_SHADOW"):
+        add("insert", key, "insert_token", targets=(NO_TARGET,),
+            location="L07", otherwise="There's no socket here to fit it.")
+    return rules
+
+
+# Shared by every Game, like VERBS
+RULES = _builtin_rules()
+
+
+# Every story flag, compiled to a packed bit layout (see flags.py)
+FLAG_SCHEMA = FlagSchema([
+    ("façade_unlocked", bool),
+    ("atrium_loot_taken", bool),
+    ("sticky_fingers", bool),
+    ("sigil_traced", bool),
+    ("shadowmark_seen", bool),
+    ("token_ward", bool),
+    ("token_feather", bool),
+    ("token_shadow", bool),
+    ("sockets_inserted", range(0, 4)),
+    ("vault_open", bool),
+    ("vale_roof_unlocked", bool),
+    ("antenna_fixed", bool),
+    ("antenna_tuned", bool),
+    ("resin_sampled", bool),
+    ("met_lupita", bool),
+    ("met_reef", bool),
+    ("met_tia_sol", bool),
+    ("met_gasket", bool),
+    ("met_ezra_vale", bool),
+    ("tia_trust", range(-128, 128)),
+    ("empathy", range(-128, 128)),
+    ("bite_count", range(0, 256)),
+    ("ending", (None, "redemption", "containment", "obliteration", "defeat")),
+    ("loyal_dog", bool),
+    ("magnet_card_revealed", bool),
+    ("crate_positioned", bool),
+    ("knows_gallery_code", bool),
+    ("case_unlocked", bool),
+])
+
+
 class State:
+    __slots__ = ("turn", "max_turns", "health", "will", "hunger", "location",
+                 "inv", "seen", "f")
+
     def __init__(self):
         self.turn = 0
         self.max_turns = 40
@@ -36,56 +198,170 @@ class State:
         self.will = 2
         self.hunger = 1
         self.location = "L01"
-        self.inv = []  # item keys
+        self.inv = []  # item keys; Game swaps in an Inventory
         self.seen = set(["L01"])
-        # flags
-        self.f = {
-            "façade_unlocked": False,
-            "atrium_loot_taken": False,
-            "sticky_fingers": False,
-            "sigil_traced": False,
-            "shadowmark_seen": False,
-            "token_ward": False,
-            "token_feather": False,
-            "token_shadow": False,
-            "sockets_inserted": 0,
-            "vault_open": False,
-            "vale_roof_unlocked": False,
-            "antenna_fixed": False,
-            "antenna_tuned": False,
-            "resin_sampled": False,
-            "met_lupita": False,
-            "met_reef": False,
-            "met_tia": False,
-            "tia_trust": 0,
-            "empathy": 0,
-            "bite_count": 0,
-            "ending": None,
-            "loyal_dog": False
-        }
+        self.f = Flags(FLAG_SCHEMA)
+
+
+# Everything a session can change; the static catalog is shared, not copied
+Snapshot = namedtuple("Snapshot", [
+    "turn", "max_turns", "health", "will", "hunger", "location", "seen",
+    "flags", "items", "npcs", "world", "item_locs", "npc_locs", "rng"])
+
+DEFAULT_PLAYER = "local"
+DEFAULT_SLOT = "default"
+AUTOSAVE_SLOT = "autosave"
+LEGACY_SAVE = "savegame.json"  # single save file from before save slots
+# Game.version values; drawn from one counter so they're unique per process
+_VERSIONS = itertools.count(1)
+
+# General hints added before the gallery opens and before the vault does
+LOCKED_HINTS = ("Find the gallery entry code.",
+                "Talk to NPCs about the gallery.")
+VAULT_HINTS = ("Collect three sigil tokens to open the vault.",
+               "Ward sigils can be extracted with silver.")
 
 
 class Game:
-    def __init__(self):
+    verbs = VERBS
+    rules = RULES
+    _hint_index = None
+    _save_codec = None
+    saves = None  # SaveStore; an SQLiteSaveStore over SAVES_DB unless set
+    autosave_every = None  # turns between autosaves; None turns them off
+
+    def __init__(self, debug=False, seed=None, player=DEFAULT_PLAYER):
+        catalog = self.catalog()
         self.s = State()
-        self.world = self._build_world()
-        self.items = self._build_items()
-        self.npcs = self._build_npcs()
-        self.hints = self._build_hints()
+        self.rng = SessionRandom(seed)
+        # Shared static content; this session's changes live in the overlays
+        self.world = Table(catalog.world)
+        self.items = Table(catalog.items)
+        self.npcs = Table(catalog.npcs)
+        self.hints = catalog.hints
+        self.nouns = catalog.nouns
+        self.item_locs = catalog.item_locs.copy()
+        self.npc_locs = catalog.npc_locs.copy()
+        self.s.inv = Inventory(self.item_locs, self.move_item)
+        self.debug = debug
+        self.player = player
         self.output_buffer = []
+        self.history = History()
+        self.queued = set()  # slots handed to the background writer
+        # New values whenever a command changes the game's state (turn,
+        # vitals, location, flags, records) and, of that, the item records
+        # (which includes what's carried)
+        self.version = self.inventory_version = next(_VERSIONS)
+
+    def state_hash(self):
+        """64-bit Zobrist hash of flags, location, vitals and item, NPC and room changes.
+
+        Flags and record tables keep their part up to date as they change, so
+        this is a handful of XORs. The turn counter is not included.
+        """
+        s = self.s
+        return (s.f.hash ^ self.items.hash ^ self.npcs.hash ^ self.world.hash
+                ^ zkey("location", s.location)
+                ^ zkey("vitals", s.health, s.will, s.hunger))
+
+    def _version_key(self):
+        """What process_command compares to tell whether a command changed
+        the game; the item table's hash comes last"""
+        s = self.s
+        return (s.turn, s.max_turns, s.health, s.will, s.hunger, s.location,
+                s.f.hash, self.npcs.hash, self.world.hash, self.items.hash)
+
+    @classmethod
+    def hint_index(cls):
+        """Shared HintIndex over the precomputed hint table, or None"""
+        if cls._hint_index is None:
+            cls._hint_index = HintIndex.open() or False
+        return cls._hint_index
+
+    @classmethod
+    def save_store(cls):
+        """The SaveStore SAVE, LOAD and SAVES use"""
+        if cls.saves is None:
+            cls.saves = SQLiteSaveStore(codec=cls.save_codec())
+        return cls.saves
+
+    @classmethod
+    def save_codec(cls):
+        """SaveCodec for save_data() dicts over this catalog and FLAG_SCHEMA"""
+        if cls._save_codec is None:
+            catalog = cls.catalog()
+            fields = Room.MUTABLE | Item.MUTABLE | Npc.MUTABLE
+            flags = FLAG_SCHEMA.fields.values()
+            cls._save_codec = SaveCodec(Layout.from_content(
+                catalog.world, catalog.items, catalog.npcs, fields,
+                {field.name: field.default for field in flags},
+                extra=[v for field in flags for v in field.values or ()
+                       if isinstance(v, str)] + [HELD]))
+        return cls._save_codec
+
+    def snapshot(self):
+        """Immutable token holding this game's mutable state"""
+        s = self.s
+        return Snapshot(s.turn, s.max_turns, s.health, s.will, s.hunger,
+                        s.location, frozenset(s.seen), s.f.snapshot(),
+                        self.items.snapshot(), self.npcs.snapshot(),
+                        self.world.snapshot(), self.item_locs.snapshot(),
+                        self.npc_locs.snapshot(), self.rng.getstate())
+
+    def restore(self, token):
+        """Put this game back in the state a snapshot() recorded; undo
+        history starts over"""
+        self.restore_state(token)
+        if self.history is not None:
+            self.history.clear(self)
+
+    def restore_state(self, token):
+        """restore() that leaves the undo history alone"""
+        s = self.s
+        (s.turn, s.max_turns, s.health, s.will, s.hunger,
+         s.location) = token[:6]
+        s.seen = set(token.seen)
+        s.f.restore(token.flags)
+        self.items.restore(token.items)
+        self.npcs.restore(token.npcs)
+        self.world.restore(token.world)
+        self.item_locs.restore(token.item_locs)
+        self.npc_locs.restore(token.npc_locs)
+        self.rng.setstate(token.rng)
+        self.version = self.inventory_version = next(_VERSIONS)
+
+    def clone(self):
+        """Independent Game in the same state, saving as the same player"""
+        game = type(self)(debug=self.debug, player=self.player)
+        game.autosave_every = self.autosave_every
+        game.restore(self.snapshot())
+        return game
 
     def output(self, text):
         """Add text to output buffer"""
-        self.output_buffer.append(text)
+        self.output_buffer.append(text)  # a Message to play()
+
+    def emit(self, event):
+        """Add an event (events.py) to the output buffer"""
+        self.output_buffer.append(event)
 
     def get_output(self):
-        """Get and clear output buffer"""
-        result = "\n".join(self.output_buffer)
+        """Get and clear output buffer, as text"""
+        result = render(self.output_buffer)
         self.output_buffer = []
         return result
 
+    @classmethod
+    def catalog(cls):
+        """Frozen world, items, NPCs and hints shared by every Game"""
+        if cls.__dict__.get("_catalog") is None:
+            cls._catalog = Catalog(cls._build_world(), cls._build_items(),
+                                   cls._build_npcs(), cls._build_hints())
+        return cls._catalog
+
     # ---------- World / Items / NPCs ----------
-    def _build_world(self):
+    @staticmethod
+    def _build_world():
         W = {
             "L01": {"name": "RAIN ALLEY (Behind Halcyon)",
                     "desc": "Wet brick, coffee steam, flickering sign. A chalk SIGIL bars a metal service door. "
@@ -187,7 +463,8 @@ class Game:
         }
         return W
 
-    def _build_items(self):
+    @staticmethod
+    def _build_items():
         I = {
             # L01
             "POLICE_RADIO": {"name": "police radio", "loc": "L01", "portable": True,
@@ -286,7 +563,8 @@ class Game:
         }
         return I
 
-    def _build_npcs(self):
+    @staticmethod
+    def _build_npcs():
         N = {
             "LUPITA": {"name": "Lupita", "loc": "L04", "trust": 0, "spoken": False,
                        "desc": "Food truck owner, tired but alert. Steam rises from her grill.",
@@ -324,7 +602,8 @@ class Game:
         }
         return N
 
-    def _build_hints(self):
+    @staticmethod
+    def _build_hints():
         return {
             "general": [
                 "Examine everything—items reveal their uses.",
@@ -356,255 +635,292 @@ class Game:
     # ---------- Core Game Logic ----------
 
     def current_room(self):
-        return self.world.get(self.s.location, {})
+        return self.world.get(self.s.location)
 
     def room_items(self):
         """Items currently in the room"""
-        return [k for k, v in self.items.items()
-                if v.get("loc") == self.s.location and not v.get("hidden", False)]
+        return [k for k in self.item_locs.at(self.s.location)
+                if not self.items[k].hidden]
 
     def room_npcs(self):
         """NPCs currently in the room"""
-        return [k for k, v in self.npcs.items() if v.get("loc") == self.s.location]
+        return self.npc_locs.at(self.s.location)
+
+    def move_item(self, item_key, dest):
+        """Move an item to a location ("inv" for the player)"""
+        self.item_locs.move(item_key, dest)
+        self.items[item_key].loc = dest
+
+    def move_npc(self, npc_key, dest):
+        """Move an NPC to a location"""
+        self.npc_locs.move(npc_key, dest)
+        self.npcs[npc_key].loc = dest
+
+    # ---------- Noun Resolution ----------
+
+    def held(self, item_key):
+        """Is the item in the player's inventory"""
+        return item_key in self.s.inv
+
+    def visible(self, item_key):
+        """Is the item lying in the current room and not hidden"""
+        return (self.item_locs.where(item_key) == self.s.location
+                and not self.items[item_key].hidden)
+
+    def present(self, npc_key):
+        """Is the NPC in the current room"""
+        return self.npc_locs.where(npc_key) == self.s.location
+
+    def feature_here(self, feature):
+        """Is the feature part of the current room"""
+        return feature in self.current_room().features
+
+    def resolve(self, target, *scopes):
+        """Resolve a noun phrase, trying scopes in order.
+
+        Scopes are "inv", "room", "npc" and "feature".
+        """
+        return self.nouns.resolve(target, *[self._scope(s) for s in scopes])
+
+    def _scope(self, name):
+        if name == "inv":
+            return ITEM, self.held
+        if name == "room":
+            return ITEM, self.visible
+        if name == "npc":
+            return NPC, self.present
+        if name == "feature":
+            return FEATURE, self.feature_here
+        raise ValueError(f"Unknown scope: {name}")
 
     def advance_turn(self):
         """Advance game turn and check time limit"""
         self.s.turn += 1
         if self.s.turn >= self.s.max_turns:
-            self.output(
-                "═══════════════════════════════════════════════════════════════════════════════")
-            self.output(
-                "DAWN BREAKS over Austin's skyline. The first rays pierce the gloom,")
-            self.output(
-                "and you feel your vampiric strength ebb. EZRA VALE has escaped")
-            self.output("into the light, his necromantic web still intact.")
-            self.output(
-                "═══════════════════════════════════════════════════════════════════════════════")
-            self.output("**ENDING: DAWN'S DEFEAT** - Time ran out. Vale wins.")
             self.s.f["ending"] = "defeat"
+            self.emit(Ending("defeat", (
+                "═══════════════════════════════════════════════════════════════════════════════",
+                "DAWN BREAKS over Austin's skyline. The first rays pierce the gloom,",
+                "and you feel your vampiric strength ebb. EZRA VALE has escaped",
+                "into the light, his necromantic web still intact.",
+                "═══════════════════════════════════════════════════════════════════════════════",
+                "**ENDING: DAWN'S DEFEAT** - Time ran out. Vale wins.")))
             return True
         return False
 
-    def look_around(self):
-        """Generate room description"""
+    def describe_room(self):
+        """RoomDescription event for the current room"""
         room = self.current_room()
         if not room:
-            return "You are nowhere. This shouldn't happen."
-
-        output = []
-        output.append(f"**{room['name']}**")
-        output.append(room['desc'])
-
-        # Items in room
-        items = self.room_items()
-        if items:
-            item_names = [self.items[i]['name'] for i in items]
-            output.append(f"You see: {', '.join(item_names)}")
-
-        # NPCs in room
-        npcs = self.room_npcs()
-        if npcs:
-            npc_names = [self.npcs[n]['name'] for n in npcs]
-            output.append(f"Present: {', '.join(npc_names)}")
-
-        # Exits
-        exits = room.get('exits', {})
-        if exits:
-            exit_list = []
-            for direction, dest in exits.items():
-                if dest.endswith('_locked'):
-                    exit_list.append(f"{direction} (locked)")
-                elif dest.endswith('_req'):
-                    exit_list.append(f"{direction} (requires climbing)")
-                else:
-                    exit_list.append(direction)
-            output.append(f"Exits: {', '.join(exit_list)}")
+            return Message("You are nowhere. This shouldn't happen.")
+
+        # Exits to "X_locked" or "X_req" get a note
+        exits = []
+        for direction, dest in room.exits.items():
+            note = None
+            if dest.endswith(('_locked', '_req')):
+                note = EXIT_NOTES[dest.rpartition('_')[2]]
+            exits.append((direction, note))
+
+        return RoomDescription(
+            self.s.location, room.name, room.desc,
+            tuple(self.items[i].name for i in self.room_items()),
+            tuple(self.npcs[n].name for n in self.room_npcs()),
+            tuple(exits))
+
+    def look_around(self):
+        """Generate room description"""
+        return self.describe_room().render()
 
-        return "\n".join(output)
+    def list_inventory(self):
+        """ItemList event for what the player carries"""
+        return ItemList("Inventory",
+                        tuple(self.items[i].name for i in self.s.inv),
+                        "You carry nothing.")
 
     def get_inventory_display(self):
         """Get formatted inventory display"""
-        if not self.s.inv:
-            return "You carry nothing."
-
-        inv_items = [self.items[i]['name']
-                     for i in self.s.inv if i in self.items]
-        return f"Inventory: {', '.join(inv_items)}"
+        return self.list_inventory().render()
 
     def get_stats_display(self):
         """Get formatted stats display"""
         return f"Turn {self.s.turn}/{self.s.max_turns} | Health: {self.s.health} | Will: {self.s.will} | Hunger: {self.s.hunger}"
 
     def process_command(self, command):
-        """Process a game command and return response"""
+        """Process a game command and return response: its output as text,
+        or "GAME_OVER" / "QUIT" with the output left for get_output()"""
         if not command:
             return "Say again?"
+        events = list(self.play(command, changes=False))
+        last = events[-1] if events else None
+        if isinstance(last, (Ending, Quit)):
+            self.output_buffer = events
+            return "GAME_OVER" if isinstance(last, Ending) else "QUIT"
+        return render(events)
+
+    def play(self, command, changes=True):
+        """Process a game command, yielding its output as events (see
+        events.py) as the command runs: the verb's reply comes before the
+        turn advances. A command that ends the night ends with an Ending
+        and one that ends the session with a Quit; the StateChange, if the
+        game changed and changes is true, comes just before. Closing the
+        generator early still runs the command to the end."""
+        if not command:
+            yield Message("Say again?")
+            return
+        version, held = self.version, self.inventory_version
+        steps = self._run(command)
+        result = None
+        closing = []  # an Ending or Quit and what follows it, kept for last
+        try:
+            for result in steps:
+                events = self.output_buffer
+                if not events:
+                    continue
+                self.output_buffer = []
+                for event in events:
+                    if closing:
+                        closing.append(event)
+                    elif event.__class__ is str:
+                        yield Message(event)
+                    elif isinstance(event, (Ending, Quit)):
+                        closing.append(event)
+                    else:
+                        yield event
+        finally:
+            for result in steps:
+                self.output_buffer = []
+        if result == "GAME_OVER" and not closing:
+            # Commands sent after the night is over get an Ending with no text
+            closing.append(Ending(self.s.f["ending"], ()))
+        if changes and self.version != version:
+            s = self.s
+            inventory = None
+            if self.inventory_version != held:
+                inventory = tuple(self.items[i].name for i in s.inv)
+            yield StateChange(s.turn, s.max_turns, s.health, s.will, s.hunger,
+                              s.location, inventory)
+        if closing:
+            # The Ending or Quit closes the stream
+            closing.append(closing.pop(0))
+            for event in closing:
+                yield Message(event) if isinstance(event, str) else event
+
+    def _run(self, command):
+        """Run a command into output_buffer. A generator: it yields None at
+        each point where what's buffered so far can be shown, and last the
+        command's result, None or the sentinel process_command() passes on"""
+        s = self.s
+        turn = s.turn
+        before = self._version_key()
+        history = self.history
+        if history is not None:
+            history.begin(self)
+        try:
+            # Clear previous output
+            self.output_buffer = []
 
-        # Clear previous output
-        self.output_buffer = []
+            # Debug mode re-checks the inventory invariant before each command
+            if self.debug:
+                repaired = self.validate_inventory_consistency()
+                if repaired:
+                    self.output(
+                        f"[debug] Repaired {repaired} inventory inconsistencies.")
 
-        # Validate inventory consistency before processing command
-        self.validate_inventory_consistency()
-
-        cmd = norm(command)
-        words = cmd.split()
-        verb = words[0] if words else ""
-
-        # Handle different command types
-        if verb in ["look", "l"]:
-            self.output(self.look_around())
-        elif verb in ["inventory", "i"]:
-            self.output(self.get_inventory_display())
-        elif verb == "stats":
-            self.output(self.get_stats_display())
-        elif verb in ["examine", "x"]:
-            if len(words) > 1:
-                self.cmd_examine(" ".join(words[1:]))
-            else:
-                self.output("Examine what?")
-        elif verb in ["take", "get"]:
-            if len(words) > 1:
-                self.cmd_take(" ".join(words[1:]))
-            else:
-                self.output("Take what?")
-        elif verb == "drop":
-            if len(words) > 1:
-                self.cmd_drop(" ".join(words[1:]))
-            else:
-                self.output("Drop what?")
-        elif cmd.startswith("enter code"):
-            code = cmd.replace("enter code", "").strip()
-            self.cmd_enter_code(code)
-        elif verb in ["go", "move"] or verb in DIRECTIONS or verb in DIRECTIONS.values():
-            if verb in ["go", "move"] and len(words) > 1:
-                self.cmd_go(words[1])
-            elif verb in DIRECTIONS:
-                self.cmd_go(DIRECTIONS[verb])
-            elif verb in DIRECTIONS.values():
-                self.cmd_go(verb)
-            else:
-                self.output("Go where?")
-        elif verb in ["n", "s", "e", "w", "u", "d"]:
-            self.cmd_go(DIRECTIONS.get(verb, verb))
-        elif verb in ["inside", "enter"]:
-            self.cmd_go("inside")
-        elif verb in ["outside", "out"]:
-            self.cmd_go("out")
-        elif verb == "use":
-            if len(words) > 1:
-                self.cmd_use(" ".join(words[1:]))
-            else:
-                self.output("Use what?")
-        elif verb == "combine":
-            if len(words) > 3 and words[2] == "with":
-                self.cmd_combine(words[1], " ".join(words[3:]))
-            else:
-                self.output("Combine what with what?")
-        elif verb in ["talk", "ask"]:
-            if len(words) > 1:
-                self.cmd_talk(" ".join(words[1:]))
-            else:
-                self.output("Talk to whom?")
-        elif verb == "read":
-            if len(words) > 1:
-                self.cmd_read(" ".join(words[1:]))
-            else:
-                self.output("Read what?")
-        elif verb in ["open", "close"]:
-            if len(words) > 1:
-                self.cmd_open_close(verb, " ".join(words[1:]))
-            else:
-                self.output(f"{verb.title()} what?")
-        elif verb in ["listen", "smell"]:
-            self.cmd_sense(verb)
-        elif verb in ["wait", "z"]:
-            self.output("Time passes...")
-        elif verb == "push":
-            if len(words) > 1:
-                self.cmd_push(" ".join(words[1:]))
-            else:
-                self.output("Push what?")
-            self.advance_turn()
-        elif verb == "sense":
-            self.cmd_vampire_sense()
-        elif verb == "mesmerize":
-            if len(words) > 1:
-                self.cmd_mesmerize(" ".join(words[1:]))
-            else:
-                self.output("Mesmerize whom?")
-        elif verb == "bite":
-            if len(words) > 1:
-                self.cmd_bite(" ".join(words[1:]))
+            words = norm(command).split()
+            verb, args = self.verbs.lookup(words)
+            if verb is None:
+                self.output("I don't understand that command.")
+                result, cost = None, 1
             else:
-                self.output("Bite what?")
-        elif cmd == "trace sigil":
-            self.cmd_trace_sigil()
-        elif cmd == "craft counter-ink":
-            self.cmd_craft_counter_ink()
-        elif cmd == "tune antenna":
-            self.cmd_tune_antenna()
-        elif verb == "map":
-            self.cmd_map()
-        elif verb == "help":
-            self.cmd_help()
-        elif verb == "hint":
-            self.cmd_hint()
-        elif verb == "save":
-            self.cmd_save()
-        elif verb == "load":
-            self.cmd_load()
-        elif verb == "quit":
-            self.output("Thanks for playing Shadow Circuit!")
-            return "QUIT"
-        else:
-            self.output("I don't understand that command.")
-
+                result = verb(self, args)
+                if isinstance(result, GeneratorType):
+                    result = yield from result
+                cost = verb.cost
+            if result is None:
+                yield  # the reply can go out before the turn advances
+                result = self._advance(cost)
+        finally:
+            if history is not None:
+                history.commit(self)
+        after = self._version_key()
+        if after != before:
+            self.version = next(_VERSIONS)
+            if after[-1] != before[-1]:  # item records moved
+                self.inventory_version = self.version
+        every = self.autosave_every
+        if every and (s.turn // every > turn // every
+                      or result in ("GAME_OVER", "QUIT")):
+            self.queue_save(AUTOSAVE_SLOT)
+        yield result
+
+    def _advance(self, cost):
+        """Let a command's turns pass; "GAME_OVER" if the night ended"""
         # Check if game should end
-        if self.advance_turn():
-            return "GAME_OVER"
+        for _ in range(cost):
+            if self.advance_turn():
+                return "GAME_OVER"
 
         # Check for ending conditions
         if self.s.f["ending"]:
             return "GAME_OVER"
-
-        return self.get_output()
+        return None
 
     # ---------- Command Implementations ----------
 
+    def cmd_look(self):
+        """Describe the current room"""
+        self.emit(self.describe_room())
+
+    def cmd_inventory(self):
+        """Show what the player carries"""
+        self.emit(self.list_inventory())
+
+    def cmd_stats(self):
+        """Show turn, health, will and hunger"""
+        self.output(self.get_stats_display())
+
+    def cmd_wait(self):
+        """Let a turn pass"""
+        self.output("Time passes...")
+
+    def cmd_quit(self):
+        """End the session"""
+        self.emit(Quit("Thanks for playing Shadow Circuit!"))
+        return "QUIT"
+
     def cmd_examine(self, target):
         """Examine items, features, or NPCs"""
         target = norm(target)
 
         # Check inventory first
-        for item_key in self.s.inv:
-            if item_key in self.items and target in norm(self.items[item_key]['name']):
-                self.output(self.items[item_key]['desc'])
-                return
+        item_key = self.resolve(target, "inv")
+        if item_key:
+            self.output(self.items[item_key].desc)
+            return
 
         # Check room items
-        for item_key in self.room_items():
-            if target in norm(self.items[item_key]['name']):
-                self.output(self.items[item_key]['desc'])
-                # Reveal hidden items
-                if item_key == "LENS_ARRAY_CASE" and not self.s.f.get("magnet_card_revealed", False):
-                    self.output("Behind the case, you spot a magnetic card!")
-                    self.items["MAGNET_CARD_hidden"]["hidden"] = False
-                    self.s.f["magnet_card_revealed"] = True
-                return
+        item_key = self.resolve(target, "room")
+        if item_key:
+            self.output(self.items[item_key].desc)
+            # Reveal hidden items
+            if item_key == "LENS_ARRAY_CASE" and not self.s.f.get("magnet_card_revealed", False):
+                self.output("Behind the case, you spot a magnetic card!")
+                self.items["MAGNET_CARD_hidden"].hidden = False
+                self.s.f["magnet_card_revealed"] = True
+            return
 
         # Check NPCs
-        for npc_key in self.room_npcs():
-            if target in norm(self.npcs[npc_key]['name']):
-                self.output(self.npcs[npc_key]['desc'])
-                return
+        npc_key = self.resolve(target, "npc")
+        if npc_key:
+            self.output(self.npcs[npc_key].desc)
+            return
 
         # Check room features
-        room = self.current_room()
-        features = room.get('features', [])
-        for feature in features:
-            if target in norm(feature.replace('_', ' ')):
-                self.examine_feature(feature)
-                return
+        feature = self.resolve(target, "feature")
+        if feature:
+            self.examine_feature(feature)
+            return
 
         self.output(f"You don't see '{target}' here.")
 
@@ -649,27 +965,26 @@ class Game:
         target = norm(target)
 
         # Check if item is already in inventory
-        for item_key in self.s.inv:
-            if item_key in self.items and target in norm(self.items[item_key]['name']):
-                self.output(
-                    f"You already have the {self.items[item_key]['name']}.")
-                return
-
-        for item_key in self.room_items():
-            if target in norm(self.items[item_key]['name']):
-                item = self.items[item_key]
-                if not item.get('portable', True):
-                    self.output(f"You can't take the {item['name']}.")
-                    return
-                if item.get('stuck', False):
-                    self.output(f"The {item['name']} is stuck fast.")
-                    return
+        item_key = self.resolve(target, "inv")
+        if item_key:
+            self.output(
+                f"You already have the {self.items[item_key].name}.")
+            return
 
-                self.s.inv.append(item_key)
-                item['loc'] = 'inv'
-                self.output(f"Taken: {item['name']}")
+        item_key = self.resolve(target, "room")
+        if item_key:
+            item = self.items[item_key]
+            if not item.portable:
+                self.output(f"You can't take the {item.name}.")
+                return
+            if item.stuck:
+                self.output(f"The {item.name} is stuck fast.")
                 return
 
+            self.s.inv.add(item_key)
+            self.output(f"Taken: {item.name}")
+            return
+
         # General recovery system for lost items
         if self.recover_lost_item(target):
             return
@@ -680,19 +995,19 @@ class Game:
         """Drop items from inventory"""
         target = norm(target)
 
-        for item_key in self.s.inv:
-            if item_key in self.items and target in norm(self.items[item_key]['name']):
-                self.s.inv.remove(item_key)
-                self.items[item_key]['loc'] = self.s.location
-                self.output(f"Dropped: {self.items[item_key]['name']}")
-                return
+        item_key = self.resolve(target, "inv")
+        if item_key:
+            self.s.inv.remove(item_key, self.s.location)
+            self.output(f"Dropped: {self.items[item_key].name}")
+            return
 
         self.output(f"You don't have '{target}' to drop.")
 
     def cmd_go(self, direction):
         """Move between locations"""
+        direction = DIRECTIONS.get(direction, direction)
         room = self.current_room()
-        exits = room.get('exits', {})
+        exits = room.exits
 
         if direction not in exits:
             self.output(f"You can't go {direction} from here.")
@@ -733,7 +1048,7 @@ class Game:
         if destination in self.world:
             self.s.location = destination
             self.s.seen.add(destination)
-            self.output(self.look_around())
+            self.emit(self.describe_room())
         else:
             self.output("You can't go there.")
 
@@ -747,87 +1062,57 @@ class Game:
         target = norm(parts[1]) if len(parts) > 1 else None
 
         # Find the item in inventory
-        item_key = None
-        for key in self.s.inv:
-            if key in self.items and item in norm(self.items[key]['name']):
-                item_key = key
-                break
+        item_key = self.resolve(item, "inv")
 
         if not item_key:
             self.output(f"You don't have '{item}'.")
             return
 
-        # Handle item usage
-        if item_key == "SOLVENT" and target:
-            self.use_solvent(target)
-        elif item_key == "MUG" and target and "resin" in target:
-            self.use_hot_mug(target)
-        elif item_key == "FISHING_GEAR" and target and "drain" in target:
-            self.use_fishing_gear()
-        elif item_key == "KEY_TAG" and target and ("magnetic reader" in target or "magnetic strip" in target or "case" in target):
-            self.use_case_access(item_key)
-        elif item_key == "MAGNET_CARD_hidden" and target and ("magnetic reader" in target or "magnetic strip" in target or "case" in target):
-            self.use_case_access(item_key)
-        elif item_key == "SILVERED_THREAD" and target and "gasket" in target:
-            self.use_thread_with_dog()
-        elif item_key == "WIRE_CUTTER" and target and ("chain" in target or "gate" in target):
-            self.use_wire_cutter()
-        elif item_key == "COUNTER_INK" and target and "sigil" in target:
-            self.use_counter_ink()
-        elif item_key == "BOLT" and target and "antenna" in target:
-            self.use_bolt_on_antenna()
-        elif item_key == "POLICE_RADIO" and self.s.location == "L12":
-            self.use_radio_antenna()
-        elif self.s.location == "VALE_ROOF":
-            self.handle_final_confrontation(item_key, target)
-        else:
+        if not self.interact("use", item_key, target):
             self.output(
-                f"You can't use the {self.items[item_key]['name']} that way.")
+                f"You can't use the {self.items[item_key].name} that way.")
 
-    def use_solvent(self, target):
+    def interact(self, verb, item_key, target, tokens=None):
+        """Fire the interaction rule for an item; False if none applies"""
+        rule, blocked = self.rules.match(self, verb, item_key, target, tokens)
+        if rule is not None:
+            rule.fire(self, item_key, target)
+            return True
+        if blocked is not None:
+            self.output(blocked)
+            return True
+        return False
+
+    def use_solvent(self, item_key, target):
         """Use solvent on resin"""
-        if "resin" in target and self.s.location == "L05":
-            if "BRASS_LOCKET" in self.room_items() and self.items["BRASS_LOCKET"].get("stuck", False):
-                self.output(
-                    "The solvent dissolves the resin threads. The locket comes free!")
-                self.items["BRASS_LOCKET"]["stuck"] = False
-            else:
-                self.output("The resin bubbles and dissolves.")
+        if self.visible("BRASS_LOCKET") and self.items["BRASS_LOCKET"].stuck:
+            self.output(
+                "The solvent dissolves the resin threads. The locket comes free!")
+            self.items["BRASS_LOCKET"].stuck = False
         else:
-            self.output("There's no resin here to dissolve.")
+            self.output("The resin bubbles and dissolves.")
 
-    def use_hot_mug(self, target):
+    def use_hot_mug(self, item_key, target):
         """Use hot mug on resin"""
-        if "resin" in target and self.s.location == "L05":
-            if "BRASS_LOCKET" in self.room_items() and self.items["BRASS_LOCKET"].get("stuck", False):
-                self.output(
-                    "The hot liquid melts the resin. The locket breaks free!")
-                self.items["BRASS_LOCKET"]["stuck"] = False
-                # Remove the mug
-                self.s.inv.remove("MUG")
-                self.output("The mug is now empty and cold.")
-            else:
-                self.output("The heat softens the resin.")
+        if self.visible("BRASS_LOCKET") and self.items["BRASS_LOCKET"].stuck:
+            self.output(
+                "The hot liquid melts the resin. The locket breaks free!")
+            self.items["BRASS_LOCKET"].stuck = False
+            # Remove the mug
+            self.s.inv.remove("MUG")
+            self.output("The mug is now empty and cold.")
         else:
-            self.output("There's no resin here to heat.")
+            self.output("The heat softens the resin.")
 
-    def use_fishing_gear(self):
+    def use_fishing_gear(self, item_key, target):
         """Use fishing gear in storm drain"""
-        if self.s.location == "L02" and "STORM_DRAIN" in self.current_room().get('features', []):
-            self.output(
-                "You lower the makeshift fishing line into the drain...")
-            self.output("Something glints! You pull up a WARD CHALK stick!")
-            self.s.inv.append("WARD_CHALK")
-            self.items["WARD_CHALK"]["loc"] = "inv"
-        else:
-            self.output("There's nowhere to fish here.")
+        self.output(
+            "You lower the makeshift fishing line into the drain...")
+        self.output("Something glints! You pull up a WARD CHALK stick!")
+        self.s.inv.add("WARD_CHALK")
 
-    def use_case_access(self, item_key):
+    def use_case_access(self, item_key, target):
         """Use magnetic card or key-tag on glass case"""
-        if self.s.location != "L09":
-            self.output("There's no case here to unlock.")
-            return
-
         if self.s.f.get("case_unlocked", False):
             self.output("The case is already unlocked.")
             return
@@ -840,64 +1125,51 @@ class Game:
                 "You press the key-tag to the magnetic reader. CLICK! The security system disengages.")
 
         # Unlock the items
-        self.items["BLUEPRINT"]["locked"] = False
-        self.items["LENS_ARRAY_CASE"]["locked"] = False
+        self.items["BLUEPRINT"].locked = False
+        self.items["LENS_ARRAY_CASE"].locked = False
         self.s.f["case_unlocked"] = True
         self.output(
             "The glass case is now open. You can take the blueprint and lens array.")
 
-    def use_thread_with_dog(self):
+    def use_thread_with_dog(self, item_key, target):
         """Use silvered thread with Gasket"""
-        if "GASKET" in self.room_npcs():
-            self.output("You tie the silvered thread around Gasket's collar.")
-            self.output("He barks happily and bounds toward the shadows!")
-            self.output(
-                "The thread glows as he returns with a SHADOW TOKEN in his mouth!")
-            self.s.inv.append("SIGIL_TOKEN_SHADOW")
-            self.items["SIGIL_TOKEN_SHADOW"]["loc"] = "inv"
-            self.s.f["token_shadow"] = True
-            self.s.f["loyal_dog"] = True
-            self.s.inv.remove("SILVERED_THREAD")
-        else:
-            self.output("Gasket isn't here.")
+        self.output("You tie the silvered thread around Gasket's collar.")
+        self.output("He barks happily and bounds toward the shadows!")
+        self.output(
+            "The thread glows as he returns with a SHADOW TOKEN in his mouth!")
+        self.s.inv.add("SIGIL_TOKEN_SHADOW")
+        self.s.f["token_shadow"] = True
+        self.s.f["loyal_dog"] = True
+        self.s.inv.remove("SILVERED_THREAD")
 
-    def use_wire_cutter(self):
+    def use_wire_cutter(self, item_key, target):
         """Use wire cutter on chain gate"""
-        if self.s.location == "L11" and "CHAIN_GATE" in self.current_room().get('features', []):
-            self.output(
-                "You cut through the chain links. The gate swings open!")
-            self.output("Beyond lies a passage to the roof network.")
-            # Unlock Vale Tower path
-            self.world["L12"]["exits"]["south"] = "VALE_ROOF"
-            self.s.f["vale_roof_unlocked"] = True
-        else:
-            self.output("There's nothing here to cut.")
+        self.output(
+            "You cut through the chain links. The gate swings open!")
+        self.output("Beyond lies a passage to the roof network.")
+        # Unlock Vale Tower path
+        self.world["L12"].exits["south"] = "VALE_ROOF"
+        self.s.f["vale_roof_unlocked"] = True
 
-    def use_counter_ink(self):
+    def use_counter_ink(self, item_key, target):
         """Use counter-ink on chalk sigil"""
-        if self.s.location == "L01" and "CHALK_SIGIL" in self.current_room().get('features', []):
-            self.output("You trace the counter-pattern over the chalk sigil.")
-            self.output("The barrier dissolves! The service door unlocks.")
-            self.world["L01"]["exits"]["south"] = "L03"
-            self.s.f["façade_unlocked"] = True
-            self.s.inv.remove("COUNTER_INK")
-        else:
-            self.output("There's no sigil here to counter.")
+        self.output("You trace the counter-pattern over the chalk sigil.")
+        self.output("The barrier dissolves! The service door unlocks.")
+        self.world["L01"].exits["south"] = "L03"
+        self.s.f["façade_unlocked"] = True
+        self.s.inv.remove("COUNTER_INK")
 
-    def use_bolt_on_antenna(self):
+    def use_bolt_on_antenna(self, item_key, target):
         """Use bolt to fix antenna panel"""
-        if self.s.location == "L12":
-            if self.s.f.get("antenna_fixed", False):
-                self.output("The antenna panel is already secured.")
-                return
-            self.output(
-                "You twist the bolt into place. The panel sits firm, hum sharpening to a stable chord.")
-            self.s.f["antenna_fixed"] = True
-            self.s.inv.remove("BOLT")
-        else:
-            self.output("There's no antenna panel here to fix.")
+        if self.s.f.get("antenna_fixed", False):
+            self.output("The antenna panel is already secured.")
+            return
+        self.output(
+            "You twist the bolt into place. The panel sits firm, hum sharpening to a stable chord.")
+        self.s.f["antenna_fixed"] = True
+        self.s.inv.remove("BOLT")
 
-    def use_radio_antenna(self):
+    def use_radio_antenna(self, item_key, target):
         """Use police radio with antenna"""
         if not self.s.f.get("antenna_fixed", False):
             self.output(
@@ -923,7 +1195,7 @@ class Game:
             "You nudge the three tones until they lock—like teeth of a key finding its ward. The path south slackens.")
         self.s.f["antenna_tuned"] = True
         self.s.f["vale_roof_unlocked"] = True
-        self.world["L12"]["exits"]["south"] = "VALE_ROOF"
+        self.world["L12"].exits["south"] = "VALE_ROOF"
 
     def recover_lost_item(self, target):
         """General recovery system for lost items"""
@@ -979,52 +1251,117 @@ class Game:
             # Check if item exists and is lost
             if item_key in self.items and item_key not in self.s.inv:
                 # If we're in the right location or item is completely lost
-                if self.s.location == original_loc or item_key not in self.room_items():
-                    self.items[item_key]["loc"] = "inv"
-                    self.s.inv.append(item_key)
+                if self.s.location == original_loc or not self.visible(item_key):
+                    self.s.inv.add(item_key)
                     self.output(
-                        f"Taken: {self.items[item_key]['name']} (recovered)")
+                        f"Taken: {self.items[item_key].name} (recovered)")
                     return True
 
         return False
 
     def validate_inventory_consistency(self):
-        """Ensure inventory and item locations are consistent"""
-        # Fix any items that claim to be in inventory but aren't tracked
+        """Debug check that item records agree with the inventory store.
+
+        The Inventory keeps both sides in step, so this full scan only runs
+        in debug mode. Repairs what it finds and returns the count.
+        """
+        violations = 0
         for item_key, item_data in self.items.items():
-            if item_data.get("loc") == "inv" and item_key not in self.s.inv:
+            if item_data.loc == "inv" and item_key not in self.s.inv:
                 # Item says it's in inventory but isn't tracked - add it
-                self.s.inv.append(item_key)
-            elif item_data.get("loc") != "inv" and item_key in self.s.inv:
+                self.s.inv.add(item_key)
+                violations += 1
+            elif item_data.loc != "inv" and item_key in self.s.inv:
                 # Item is tracked in inventory but location is wrong - fix location
-                item_data["loc"] = "inv"
+                self.move_item(item_key, "inv")
+                violations += 1
+        return violations
 
     def cmd_combine(self, item1, item2):
         """Combine items to create new ones"""
         item1, item2 = norm(item1), norm(item2)
 
         # Find items in inventory
-        keys = []
-        for key in self.s.inv:
-            if key in self.items:
-                name = norm(self.items[key]['name'])
-                if item1 in name or item2 in name:
-                    keys.append(key)
-
-        if len(keys) < 2:
+        key1 = self.resolve(item1, "inv")
+        key2 = self.resolve(item2, "inv")
+
+        if not key1 or not key2 or key1 == key2:
             self.output("You don't have both items to combine.")
             return
 
         # Check for valid combinations
-        if "STRING" in keys and "TAROT_COIN" in keys:
+        if not self.interact("combine", key1, key2, tokens=[key2]):
+            self.output("You can't combine those items.")
+
+    def combine_fishing_gear(self, item_key, other_key):
+        """Tie string and tarot coin into fishing gear"""
+        self.output(
+            "You tie the string to the tarot coin, creating fishing gear!")
+        self.s.inv.remove("STRING")
+        self.s.inv.remove("TAROT_COIN")
+        self.s.inv.add("FISHING_GEAR")
+
+    def cmd_give(self, item, person):
+        """Give an item to an NPC"""
+        item, person = norm(item), norm(person)
+
+        item_key = self.resolve(item, "inv")
+        if not item_key:
+            self.output(f"You don't have '{item}'.")
+            return
+
+        npc_key = self.resolve(person, "npc")
+        if not npc_key:
+            self.output(f"You don't see '{person}' here.")
+            return
+
+        if not self.interact("give", item_key, npc_key, tokens=[npc_key]):
             self.output(
-                "You tie the string to the tarot coin, creating fishing gear!")
-            self.s.inv.remove("STRING")
-            self.s.inv.remove("TAROT_COIN")
-            self.s.inv.append("FISHING_GEAR")
-            self.items["FISHING_GEAR"]["loc"] = "inv"
+                f"{self.npcs[npc_key].name} has no use for the {self.items[item_key].name}.")
+
+    def give_mug_to_reef(self, item_key, npc_key):
+        """Trade the warm mug for Reef's hematite"""
+        self.s.inv.remove("MUG")
+        if "HEMATITE" not in self.s.inv:
+            self.s.inv.add("HEMATITE")
+            self.output(
+                "You hand him the warmth. He presses a hematite stone into your palm. 'Ground yourself.'")
         else:
-            self.output("You can't combine those items.")
+            self.output("He nods gratefully, warms his hands. 'Bless you.'")
+
+    def give_bone_to_gasket(self, item_key, npc_key):
+        """Feed Gasket his bone"""
+        self.s.inv.remove("BONE")
+        self.output("Gasket crunches the bone, tail a metronome of joy.")
+
+    def cmd_insert(self, args):
+        """Insert a sigil token into the vault door"""
+        item = norm(args.split(' into ')[0].split(' in ')[0])
+        words = item.split()
+        # INSERT TOKEN WARD reads as "ward token"
+        if len(words) > 1 and words[0] == "token":
+            item = " ".join(words[1:] + ["token"])
+
+        item_key = self.resolve(item, "inv")
+        if not item_key:
+            self.output(f"You don't have '{item}'.")
+            return
+
+        if not self.interact("insert", item_key, None):
+            self.output(
+                f"The {self.items[item_key].name} doesn't fit anything here.")
+
+    def insert_token(self, item_key, target):
+        """Seat a sigil token in the vault door"""
+        self.s.inv.remove(item_key)
+        # A token fetched again can't fill a fourth socket
+        self.s.f["sockets_inserted"] = min(3, self.s.f["sockets_inserted"] + 1)
+        self.output(
+            f"You press the {self.items[item_key].name} into a socket. It hums in place.")
+        if self.s.f["sockets_inserted"] >= 3 and not self.s.f.get("vault_open", False):
+            self.s.f["vault_open"] = True
+            self.output(
+                "The third sigil catches. The vault door sighs open, ward-light spilling across the atrium.")
 
     def cmd_talk(self, target):
         """Talk to NPCs"""
@@ -1038,27 +1375,27 @@ class Game:
             topic = parts[1].strip()
 
         # Find NPC
-        for npc_key in self.room_npcs():
-            if target in norm(self.npcs[npc_key]['name']):
-                npc = self.npcs[npc_key]
+        npc_key = self.resolve(target, "npc")
+        if npc_key:
+            npc = self.npcs[npc_key]
 
-                # Mark as spoken to
-                if not npc['spoken']:
-                    npc['spoken'] = True
-                    self.s.f[f"met_{npc_key.lower()}"] = True
+            # Mark as spoken to
+            if not npc.spoken:
+                npc.spoken = True
+                self.s.f[f"met_{npc_key.lower()}"] = True
 
-                # Get response
-                topics = npc.get('topics', {})
-                response = topics.get(topic, topics.get(
-                    'default', "They don't respond."))
+            # Get response
+            topics = npc.topics
+            response = topics.get(topic, topics.get(
+                'default', "They don't respond."))
 
-                self.output(f"{npc['name']}: {response}")
+            self.emit(Dialogue(npc.name, response))
 
-                # Special NPC interactions
-                if npc_key == "TIA_SOL" and topic in ["sigils", "herbs"]:
-                    self.s.f["tia_trust"] += 1
+            # Special NPC interactions
+            if npc_key == "TIA_SOL" and topic in ["sigils", "herbs"]:
+                self.s.f["tia_trust"] += 1
 
-                return
+            return
 
         self.output(f"You don't see '{target}' here to talk to.")
 
@@ -1076,21 +1413,21 @@ class Game:
             "gallery map": "Atrium center, Archives east, Storage down, Roof access north."
         }
 
-        for item_key in self.s.inv + self.room_items():
-            if item_key in self.items and target in norm(self.items[item_key]['name']):
-                item_name = self.items[item_key]['name']
-                if item_name in readable_items:
-                    self.output(readable_items[item_name])
+        item_key = self.resolve(target, "inv", "room")
+        if item_key:
+            item_name = self.items[item_key].name
+            if item_name in readable_items:
+                self.output(readable_items[item_name])
 
-                    # Special effects
-                    if item_key == "POSTER":
-                        self.output("You notice the security code: 1207")
-                        self.s.f["knows_gallery_code"] = True
+                # Special effects
+                if item_key == "POSTER":
+                    self.output("You notice the security code: 1207")
+                    self.s.f["knows_gallery_code"] = True
 
-                    return
-                else:
-                    self.output(f"The {item_name} has no readable text.")
-                    return
+                return
+            else:
+                self.output(f"The {item_name} has no readable text.")
+                return
 
         self.output(f"You don't see '{target}' here to read.")
 
@@ -1098,26 +1435,25 @@ class Game:
         """Open or close items"""
         target = norm(target)
 
-        for item_key in self.s.inv + self.room_items():
-            if item_key in self.items and target in norm(self.items[item_key]['name']):
-                item = self.items[item_key]
-
-                if action == "open":
-                    if item_key == "BRASS_LOCKET" and not item.get("stuck", False):
-                        if not item.get("open", False):
-                            self.output(
-                                "The locket springs open, revealing a FEATHER TOKEN!")
-                            self.s.inv.append("SIGIL_TOKEN_FEATHER")
-                            self.items["SIGIL_TOKEN_FEATHER"]["loc"] = "inv"
-                            self.s.f["token_feather"] = True
-                            item["open"] = True
-                        else:
-                            self.output("The locket is already open.")
+        item_key = self.resolve(target, "inv", "room")
+        if item_key:
+            item = self.items[item_key]
+
+            if action == "open":
+                if item_key == "BRASS_LOCKET" and not item.stuck:
+                    if not item.open:
+                        self.output(
+                            "The locket springs open, revealing a FEATHER TOKEN!")
+                        self.s.inv.add("SIGIL_TOKEN_FEATHER")
+                        self.s.f["token_feather"] = True
+                        item.open = True
                     else:
-                        self.output(f"You can't open the {item['name']}.")
-                else:  # close
-                    self.output(f"You can't close the {item['name']}.")
-                return
+                        self.output("The locket is already open.")
+                else:
+                    self.output(f"You can't open the {item.name}.")
+            else:  # close
+                self.output(f"You can't close the {item.name}.")
+            return
 
         self.output(f"You don't see '{target}' here.")
 
@@ -1168,29 +1504,29 @@ class Game:
         """Use vampire mesmerism on NPCs"""
         target = norm(target)
 
-        for npc_key in self.room_npcs():
-            if target in norm(self.npcs[npc_key]['name']):
-                if self.s.will <= 0:
-                    self.output("You lack the will to mesmerize anyone.")
-                    return
+        npc_key = self.resolve(target, "npc")
+        if npc_key:
+            if self.s.will <= 0:
+                self.output("You lack the will to mesmerize anyone.")
+                return
 
-                self.s.will -= 1
+            self.s.will -= 1
 
-                if npc_key == "LUPITA":
-                    self.output(
-                        "Lupita's eyes glaze. 'The gallery code... 1207...'")
-                    self.s.f["knows_gallery_code"] = True
-                elif npc_key == "REEF":
-                    self.output(
-                        "Reef speaks in monotone: 'Ward sigils... touch with silver...'")
-                elif npc_key == "TIA_SOL":
-                    self.output(
-                        "Tia Sol resists strongly. 'Your tricks won't work here, creature.'")
-                    self.s.f["tia_trust"] -= 2
-                else:
-                    self.output(f"You mesmerize {self.npcs[npc_key]['name']}.")
+            if npc_key == "LUPITA":
+                self.output(
+                    "Lupita's eyes glaze. 'The gallery code... 1207...'")
+                self.s.f["knows_gallery_code"] = True
+            elif npc_key == "REEF":
+                self.output(
+                    "Reef speaks in monotone: 'Ward sigils... touch with silver...'")
+            elif npc_key == "TIA_SOL":
+                self.output(
+                    "Tia Sol resists strongly. 'Your tricks won't work here, creature.'")
+                self.s.f["tia_trust"] -= 2
+            else:
+                self.output(f"You mesmerize {self.npcs[npc_key].name}.")
 
-                return
+            return
 
         self.output(f"You don't see '{target}' here to mesmerize.")
 
@@ -1202,23 +1538,23 @@ class Game:
             self.output("You're not hungry right now.")
             return
 
-        for npc_key in self.room_npcs():
-            if target in norm(self.npcs[npc_key]['name']):
-                self.s.hunger -= 1
-                self.s.health += 1
-                self.s.f["bite_count"] += 1
+        npc_key = self.resolve(target, "npc")
+        if npc_key:
+            self.s.hunger -= 1
+            self.s.health += 1
+            self.s.f["bite_count"] += 1
 
-                self.output(
-                    f"You bite {self.npcs[npc_key]['name']}. Warmth flows through you.")
+            self.output(
+                f"You bite {self.npcs[npc_key].name}. Warmth flows through you.")
 
-                # Consequences
-                if npc_key == "EZRA_VALE":
-                    self.output("Vale's blood burns with dark power!")
-                    self.s.health -= 2
-                else:
-                    self.s.f["empathy"] -= 1
+            # Consequences
+            if npc_key == "EZRA_VALE":
+                self.output("Vale's blood burns with dark power!")
+                self.s.health -= 2
+            else:
+                self.s.f["empathy"] -= 1
 
-                return
+            return
 
         self.output(f"You don't see '{target}' here to bite.")
 
@@ -1231,7 +1567,7 @@ class Game:
 
         # Check if keypad is available
         room = self.current_room()
-        if "KEYPAD" not in room.get('features', []):
+        if "KEYPAD" not in room.features:
             self.output(
                 "You can see a keypad, but something seems wrong with it.")
             return
@@ -1239,7 +1575,7 @@ class Game:
         # Try the code
         if code == "1207":
             self.output("BEEP. The gallery door unlocks!")
-            self.world["L05"]["exits"]["inside"] = "L07"
+            self.world["L05"].exits["inside"] = "L07"
             self.s.f["façade_unlocked"] = True
         else:
             self.output(f"BUZZ. Incorrect code. (You entered: {code})")
@@ -1249,7 +1585,7 @@ class Game:
         if self.s.location != "L01":
             self.output("No sigil here to trace.")
             return
-        if not self.world["L03"].get("locked", True):
+        if not self.world["L03"].locked:
             self.output("You've already dispelled the door sigil.")
             return
 
@@ -1264,8 +1600,8 @@ class Game:
             return
 
         self.s.will -= cost
-        self.world["L03"]["locked"] = False
-        self.world["L01"]["exits"]["south"] = "L03"
+        self.world["L03"].locked = False
+        self.world["L01"].exits["south"] = "L03"
         self.s.f["sigil_traced"] = True
         self.output(
             "You trace the counter-strokes. The sigil exhales and fades. The back room unlocks.")
@@ -1279,15 +1615,15 @@ class Game:
             self.s.inv.remove("GARLIC")
             self.s.inv.remove("ROSEMARY")
             self.s.inv.remove("HEMATITE")
-            self.s.inv.append("COUNTER_INK")
-            self.items["COUNTER_INK"]["loc"] = "inv"
+            self.s.inv.add("COUNTER_INK")
+            self.s.f["empathy"] += 1
         else:
             self.output(
                 "You need garlic, rosemary, and hematite to craft counter-ink.")
 
     def cmd_map(self):
         """Show visited locations"""
-        seen_locations = [self.world[loc]['name']
+        seen_locations = [self.world[loc].name
                           for loc in self.s.seen if loc in self.world]
         self.output("Visited locations:")
         for loc in seen_locations:
@@ -1304,107 +1640,225 @@ Actions: OPEN/CLOSE <thing>, PUSH <thing>, LISTEN, SMELL, WAIT/Z
 Vampire: SENSE, MESMERIZE <person>, BITE <target>
 Special: ENTER CODE <####>, TRACE SIGIL, CRAFT COUNTER-INK, TUNE ANTENNA
          INSERT TOKEN <WARD/FEATHER/SHADOW>
-Game: STATS, MAP, HINT, SAVE, LOAD, QUIT"""
+Game: STATS, MAP, HINT, SAVE [slot], LOAD [slot], SAVES, QUIT
+      UNDO [n], REWIND TO TURN <t>"""
         self.output(help_text)
 
     def cmd_hint(self):
         """Show contextual hints"""
-        hints = self.hints["general"]
+        index = self.hint_index()
+        found = index.lookup(self.state_hash()) if index else None
+        if found:
+            self.output(f"HINT: Try {found.command.upper()}.")
+            return
 
+        hints = self.hints["general"]
         if not self.s.f.get("façade_unlocked", False):
-            hints.extend(["Find the gallery entry code.",
-                         "Talk to NPCs about the gallery."])
-
-        if self.s.f.get("façade_unlocked", False) and not self.s.f.get("vault_open", False):
-            hints.extend(["Collect three sigil tokens to open the vault.",
-                         "Ward sigils can be extracted with silver."])
+            hints += LOCKED_HINTS
+        elif not self.s.f.get("vault_open", False):
+            hints += VAULT_HINTS
+        self.output(f"HINT: {self.rng.choice(hints)}")
+
+    def cmd_undo(self, count):
+        """Take back the last command, or the last n"""
+        if not count:
+            count = "1"
+        if not count.isdigit() or int(count) < 1:
+            self.output("Undo how many commands?")
+            return
+        if self.history is None or not self.history.undo(self, int(count)):
+            self.output("Nothing to undo.")
+            return
+        self.output(f"Time folds back to turn {self.s.turn}.")
+        self.emit(self.describe_room())
+
+    def cmd_rewind(self, turn):
+        """Go back to how things stood on an earlier turn"""
+        words = [w for w in turn.split() if w not in ("to", "turn")]
+        if len(words) != 1 or not words[0].isdigit():
+            self.output("Rewind to which turn?")
+            return
+        turn = int(words[0])
+        if turn >= self.s.turn:
+            self.output(f"It's only turn {self.s.turn}.")
+            return
+        reached = self.history.rewind(self, turn) if self.history else None
+        if reached is None:
+            self.output("The night won't fold back that far.")
+            return
+        self.output(f"Time folds back to turn {reached}.")
+        self.emit(self.describe_room())
 
-        hint = random.choice(hints)
-        self.output(f"HINT: {hint}")
+    def save_data(self):
+        """This session's changes from the catalog, as a JSON-ready dict"""
+        return {
+            'turn': self.s.turn,
+            'health': self.s.health,
+            'will': self.s.will,
+            'hunger': self.s.hunger,
+            'location': self.s.location,
+            'inv': self.s.inv.keys(),
+            'seen': sorted(self.s.seen),
+            'flags': self.s.f.changes(),
+            'items': self.items.changes(),
+            'npcs': self.npcs.changes(),
+            'world': self.world.changes(),
+            'rng': list(self.rng.getstate())
+        }
 
-    def cmd_save(self):
-        """Save game state"""
+    def load_data(self, save_data):
+        """Replace this session's state with a save_data() dict"""
+        self.items.restore((0, ()))
+        self.npcs.restore((0, ()))
+        self.world.restore((0, ()))
+        self.item_locs.restore(((), ()))
+        self.npc_locs.restore(((), ()))
+        self.s.turn = save_data['turn']
+        self.s.health = save_data['health']
+        self.s.will = save_data['will']
+        self.s.hunger = save_data['hunger']
+        self.s.location = save_data['location']
+        self.s.seen = set(save_data['seen'])
+        self.s.f = Flags(FLAG_SCHEMA, save_data['flags'])
+        if 'rng' in save_data:
+            self.rng.setstate(save_data['rng'])
+
+        for kind, table, move in (('items', self.items, self.move_item),
+                                  ('npcs', self.npcs, self.move_npc)):
+            for key, fields in save_data.get(kind, {}).items():
+                if key in table:
+                    fields = dict(fields)
+                    loc = fields.pop('loc', None)
+                    table[key].apply(fields)
+                    if loc is not None and loc != HELD:
+                        move(key, loc)
+        self.world.apply(save_data.get('world', {}))
+        # Held items last, in pick-up order, so the catalog's starting
+        # inventory goes back in where the save had it
+        held = [key for key in save_data['inv'] if key in self.items]
+        for item_key in held:
+            self.s.inv.discard(item_key)
+        for item_key in held:
+            self.s.inv.add(item_key)
+        # The loaded state didn't come from the commands UNDO would revert
+        if self.history is not None:
+            self.history.clear(self)
+
+    def queue_save(self, slot):
+        """Hand this session's state to the background writer for a slot;
+        a newer save to the same slot replaces one still waiting"""
+        writer().submit((self.player, slot), self.save_store().save,
+                        self.player, slot, self.save_data())
+        self.queued.add(slot)
+
+    def cmd_save(self, slot):
+        """Save game state to a slot"""
+        slot = slot or DEFAULT_SLOT
+        if not valid_slot(slot):
+            self.output("Slot names are up to 32 letters, digits, - or _.")
+            return
+        error = writer().error((self.player, slot))
+        if error is not None:
+            self.output(f"(The last save to '{slot}' failed: {error})")
         try:
-            save_data = {
-                'turn': self.s.turn,
-                'health': self.s.health,
-                'will': self.s.will,
-                'hunger': self.s.hunger,
-                'location': self.s.location,
-                'inv': self.s.inv,
-                'seen': list(self.s.seen),
-                'flags': self.s.f,
-                'items': {k: v for k, v in self.items.items() if v.get('loc') != v.get('original_loc', v.get('loc'))}
-            }
-
-            with open('savegame.json', 'w') as f:
-                json.dump(save_data, f)
-
-            self.output("Game saved successfully.")
+            self.queue_save(slot)
+            self.output(f"Game saved to slot '{slot}'.")
         except Exception as e:
             self.output(f"Save failed: {e}")
 
-    def cmd_load(self):
-        """Load game state"""
+    def import_legacy_save(self, path=LEGACY_SAVE):
+        """Move an old savegame.json into this player's default slot; its
+        data, or None if there isn't one. LOAD only does this for the
+        local player"""
+        if not os.path.exists(path):
+            return None
+        codec = self.save_codec()
+        with open(path, "rb") as f:
+            save_data = codec.decode(f.read())
+        self.save_store().save(self.player, DEFAULT_SLOT, save_data)
+        os.replace(path, path + ".migrated")
+        return save_data
+
+    def cmd_load(self, slot):
+        """Load game state from a slot"""
+        slot = slot or DEFAULT_SLOT
+        if not valid_slot(slot):
+            self.output("Slot names are up to 32 letters, digits, - or _.")
+            return
         try:
-            if not os.path.exists('savegame.json'):
-                self.output("No save file found.")
+            writer().wait((self.player, slot))
+            save_data = self.save_store().load(self.player, slot)
+            if (save_data is None and slot == DEFAULT_SLOT
+                    and self.player == DEFAULT_PLAYER):
+                # The file belongs to whoever ran the single-player game
+                save_data = self.import_legacy_save()
+            if save_data is None:
+                self.output(f"No save in slot '{slot}'.")
                 return
-
-            with open('savegame.json', 'r') as f:
-                save_data = json.load(f)
-
-            self.s.turn = save_data['turn']
-            self.s.health = save_data['health']
-            self.s.will = save_data['will']
-            self.s.hunger = save_data['hunger']
-            self.s.location = save_data['location']
-            self.s.inv = save_data['inv']
-            self.s.seen = set(save_data['seen'])
-            self.s.f = save_data['flags']
-
-            # Restore modified items
-            for item_key, item_data in save_data.get('items', {}).items():
-                if item_key in self.items:
-                    self.items[item_key].update(item_data)
-
-            self.output("Game loaded successfully.")
-            self.output(self.look_around())
+            self.load_data(save_data)
+            self.output(f"Game loaded from slot '{slot}'.")
+            self.emit(self.describe_room())
         except Exception as e:
             self.output(f"Load failed: {e}")
 
+    def cmd_saves(self):
+        """List this player's save slots"""
+        try:
+            # Only this session's writes, not every player's in the process
+            for slot in self.queued:
+                writer().wait((self.player, slot))
+            self.queued.clear()
+            slots = self.save_store().slots(self.player)
+        except Exception as e:
+            self.output(f"Can't list saves: {e}")
+            return
+        if not slots:
+            self.output("No saved games.")
+            return
+        lines = ["SAVED GAMES:"]
+        for info in slots:
+            room = self.world[info.location].name if info.location in self.world \
+                else info.location
+            lines.append(f"  {info.slot}: turn {info.turn}, {room}")
+        self.output("\n".join(lines))
+
     def check_win_conditions(self):
         """Check for game ending conditions - only used when explicitly triggered"""
         # Endings are now triggered by specific player actions, not just location
         # This method is kept for compatibility but doesn't auto-trigger endings
         pass
 
-    def handle_final_confrontation(self, item_key, target):
-        """Handle final confrontation with Ezra Vale"""
-        if target and ("ezra" in target or "vale" in target or "necroframe" in target):
-            # Different endings based on items and player state
-            if item_key == "SILVER_NAILS" and self.s.f.get("vault_open", False):
-                self.output(
-                    "You pin the silver nails into the necroframe's core.")
-                self.output(
-                    "The resin locks cold around the ritual; silver binds it to silence.")
-                self.trigger_ending("containment")
-            elif item_key == "LENS_ARRAY_CASE" and "BLUEPRINT" in self.s.inv:
-                self.output(
-                    "You angle mirrors along the dawn line. Light knifes the frame—sigils scream and go dark.")
-                self.trigger_ending("obliteration")
-            elif item_key == "BRASS_LOCKET" and "COUNTER_INK" in self.s.inv and self.s.f.get("empathy", 0) >= 1:
-                self.output(
-                    "You raise the locket, trace the counter-sigil in ink. Ezra's breath breaks; grief finds a softer path.")
-                self.trigger_ending("redemption")
-            else:
-                self.output(
-                    "'Leave me my work,' he says, voice a winter river. 'Or make it quick.'")
-                self.output(
-                    "You need the right tools and approach for this confrontation.")
-        else:
-            self.output(
-                f"You can't use the {self.items[item_key]['name']} that way here.")
+    def confront_containment(self, item_key, target):
+        """Silver nails and the open vault contain Vale"""
+        self.output(
+            "You pin the silver nails into the necroframe's core.")
+        self.output(
+            "The resin locks cold around the ritual; silver binds it to silence.")
+        self.trigger_ending("containment")
+
+    def confront_obliteration(self, item_key, target):
+        """Lens array along the blueprint's dawn line destroys the frame"""
+        self.output(
+            "You angle mirrors along the dawn line. Light knifes the frame—sigils scream and go dark.")
+        self.trigger_ending("obliteration")
+
+    def confront_redemption(self, item_key, target):
+        """Locket and counter-ink reach the man inside"""
+        self.output(
+            "You raise the locket, trace the counter-sigil in ink. Ezra's breath breaks; grief finds a softer path.")
+        self.trigger_ending("redemption")
+
+    def confront_rebuffed(self, item_key, target):
+        """Wrong tool or approach against Vale"""
+        self.output(
+            "'Leave me my work,' he says, voice a winter river. 'Or make it quick.'")
+        self.output(
+            "You need the right tools and approach for this confrontation.")
+
+    def confront_misuse(self, item_key, target):
+        """Using an item at nothing in particular on the roof"""
+        self.output(
+            f"You can't use the {self.items[item_key].name} that way here.")
 
     def cmd_push(self, target):
         """Push objects in the environment"""
@@ -1426,45 +1880,32 @@ Game: STATS, MAP, HINT, SAVE, LOAD, QUIT"""
         self.s.f["ending"] = ending_type
 
         if ending_type == "redemption":
-            self.output(
-                "═══════════════════════════════════════════════════════════════════════════════")
-            self.output(
-                "You approach Vale with compassion, not hatred. Your empathy reaches")
-            self.output(
-                "through his necromantic shell to the broken man within.")
-            self.output(
-                "'I... I remember what it was to be human,' he whispers.")
-            self.output(
-                "The necroframe dissolves as Vale chooses redemption over power.")
-            self.output(
-                "═══════════════════════════════════════════════════════════════════════════════")
-            self.output(
+            lines = (
+                "═══════════════════════════════════════════════════════════════════════════════",
+                "You approach Vale with compassion, not hatred. Your empathy reaches",
+                "through his necromantic shell to the broken man within.",
+                "'I... I remember what it was to be human,' he whispers.",
+                "The necroframe dissolves as Vale chooses redemption over power.",
+                "═══════════════════════════════════════════════════════════════════════════════",
                 "**ENDING: REDEMPTION** - Vale is saved through compassion.")
 
         elif ending_type == "containment":
-            self.output(
-                "═══════════════════════════════════════════════════════════════════════════════")
-            self.output(
-                "Using the vault's ward technology, you contain Vale's power.")
-            self.output(
-                "He rages against the binding, but the sigils hold strong.")
-            self.output("'This won't hold me forever!' he snarls.")
-            self.output("But for now, Austin is safe from his influence.")
-            self.output(
-                "═══════════════════════════════════════════════════════════════════════════════")
-            self.output(
+            lines = (
+                "═══════════════════════════════════════════════════════════════════════════════",
+                "Using the vault's ward technology, you contain Vale's power.",
+                "He rages against the binding, but the sigils hold strong.",
+                "'This won't hold me forever!' he snarls.",
+                "But for now, Austin is safe from his influence.",
+                "═══════════════════════════════════════════════════════════════════════════════",
                 "**ENDING: CONTAINMENT** - Vale is imprisoned but alive.")
 
         else:  # obliteration
-            self.output(
-                "═══════════════════════════════════════════════════════════════════════════════")
-            self.output("With no other options, you strike at Vale's heart.")
-            self.output(
-                "The necroframe explodes in brilliant light as his power breaks.")
-            self.output("Vale screams as his essence scatters to the winds.")
-            self.output(
-                "Austin is free, but at the cost of a soul's destruction.")
-            self.output(
-                "═══════════════════════════════════════════════════════════════════════════════")
-            self.output(
+            lines = (
+                "═══════════════════════════════════════════════════════════════════════════════",
+                "With no other options, you strike at Vale's heart.",
+                "The necroframe explodes in brilliant light as his power breaks.",
+                "Vale screams as his essence scatters to the winds.",
+                "Austin is free, but at the cost of a soul's destruction.",
+                "═══════════════════════════════════════════════════════════════════════════════",
                 "**ENDING: OBLITERATION** - Vale is destroyed completely.")
+        self.emit(Ending(ending_type, lines))
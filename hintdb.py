@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Hint Database
+Maps a state hash to the next useful command toward the nearest ending,
+precomputed offline and kept in SQLite. The game looks hints up by
+Game.state_hash() through a small LRU cache; the table itself is a single
+primary-key B-tree, so a lookup is one indexed probe.
+
+  python hintdb.py [--db PATH] [--depth N] [--workers N] [--max-turns N]
+
+The build explores every state first reached before ``--depth`` turns (see
+explorer.explore) and runs a backward Dijkstra from the story endings over
+the explored moves. Every state with a known way to an ending gets a row;
+states off the explored map have none and the game falls back to its
+general hints.
+"""
+
+import argparse
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+
+HINTS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "shadow_circuit_hints.db")
+
+Hint = namedtuple("Hint", ["command", "ending", "turns"])
+
+
+def _signed(h):
+    """SQLite integers are signed 64-bit"""
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+class HintIndex:
+    """Read-only hint table with an LRU of recent lookups, misses included"""
+
+    def __init__(self, path=HINTS_DB, cache_size=4096):
+        self.db = sqlite3.connect(f"file:{path}?mode=ro", uri=True,
+                                  check_same_thread=False)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path=HINTS_DB, cache_size=4096):
+        """HintIndex over path, or None if it hasn't been built"""
+        if not os.path.exists(path):
+            return None
+        return cls(path, cache_size)
+
+    def lookup(self, h):
+        """Hint for a state hash, or None"""
+        with self.lock:
+            cache = self.cache
+            if h in cache:
+                cache.move_to_end(h)
+                return cache[h]
+            row = self.db.execute(
+                "SELECT command, ending, turns FROM hints WHERE state = ?",
+                (_signed(h),)).fetchone()
+            hint = Hint(*row) if row else None
+            cache[h] = hint
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+            return hint
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM hints").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+def next_moves(edges, ending_states, timeout):
+    """{state hash: Hint} from a backward Dijkstra over explored moves.
+
+    ``edges`` is explorer.Report.edges; each state's hint is the command
+    that starts a shortest line from it to any story ending.
+    """
+    reverse = defaultdict(list)
+    for block, commands in edges:
+        for i in range(0, len(block), 3):
+            reverse[block[i + 1]].append((block[i], block[i + 2], commands[i // 3]))
+    distance = {}
+    heap = []
+    for ending, hashes in ending_states.items():
+        if ending == timeout:
+            continue
+        for h in hashes:
+            distance[h] = 0
+            heap.append((0, h, ending))
+    heapq.heapify(heap)
+    hints = {}
+    while heap:
+        d, h, ending = heapq.heappop(heap)
+        if d > distance[h]:
+            continue
+        for parent, cost, command in reverse.get(h, ()):
+            nd = d + cost
+            if parent not in distance or nd < distance[parent]:
+                distance[parent] = nd
+                hints[parent] = Hint(command, ending, nd)
+                heapq.heappush(heap, (nd, parent, ending))
+    return hints
+
+
+def build(path=HINTS_DB, depth=14, workers=None, max_turns=None):
+    """Explore, solve backwards and write the hint table; returns
+    (rows, states explored)"""
+    # The builder needs the whole engine; lookups only need sqlite
+    from explorer import explore
+    from solver import Solver
+
+    report = explore(workers, max_turns=max_turns, depth=depth, moves=True)
+    timeout = Solver(max_turns=max_turns).timeout_line().ending
+    hints = next_moves(report.edges, report.ending_states, timeout)
+
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    db = sqlite3.connect(tmp)
+    try:
+        db.execute("CREATE TABLE hints (state INTEGER PRIMARY KEY, "
+                   "command TEXT NOT NULL, ending TEXT NOT NULL, "
+                   "turns INTEGER NOT NULL) WITHOUT ROWID")
+        db.executemany("INSERT INTO hints VALUES (?, ?, ?, ?)",
+                       ((_signed(h), *hint) for h, hint in hints.items()))
+        db.commit()
+    finally:
+        db.close()
+    os.replace(tmp, path)
+    return len(hints), report.states
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute the next-move hint table")
+    parser.add_argument("--db", default=HINTS_DB)
+    parser.add_argument("--depth", type=int, default=14,
+                        help="explore states reached before this turn")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-turns", type=int, default=None)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows, states = build(args.db, args.depth, args.workers, args.max_turns)
+    print(f"{rows} hints for {states} explored states written to {args.db} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
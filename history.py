@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Undo History
+Records what each command changed as a reversible delta so UNDO and REWIND
+only touch what those commands touched.
+
+A delta holds the before-values of whatever the command wrote: vitals and
+location, rooms seen, the flag bits, the RNG state, each record whose session changes were
+written (items, NPCs, exits) and each item or NPC location and room bucket
+that moved. Records and the location indexes log those themselves while a
+command runs (Table.log, LocationIndex.log), so recording costs nothing for
+state the command didn't touch. Deltas sit in a bounded ring; every few
+turns a full snapshot is kept as a keyframe, so a long rewind can jump to
+one instead of undoing command by command, and can reach back past the
+oldest delta still held.
+"""
+
+from collections import deque, namedtuple
+
+DEPTH = 64          # commands UNDO can step back through
+KEYFRAME_EVERY = 8  # turns between keyframes
+
+TABLES = ("items", "npcs", "world")
+INDEXES = ("item_locs", "npc_locs")
+
+# turn: the turn the command finished on; the other fields hold what it
+# changed as it was before, or None / () when it changed nothing there
+Delta = namedtuple("Delta", ["seq", "turn", "vitals", "seen", "flags",
+                             "rng", "tables", "indexes"])
+
+
+def _vitals(s):
+    return s.turn, s.max_turns, s.health, s.will, s.hunger, s.location
+
+
+class History:
+    """One session's ring of command deltas and keyframe snapshots"""
+
+    def __init__(self, depth=DEPTH, keyframe_every=KEYFRAME_EVERY):
+        self.deltas = deque(maxlen=depth)
+        self.keyframes = deque(maxlen=depth // keyframe_every + 1)
+        self.keyframe_every = keyframe_every
+        self.seq = 0
+        # Bumped whenever the session's state stops being what replaying
+        # its recorded commands would give (undo, rewind, clear)
+        self.generation = 0
+        self.pending = None
+        # Logs are handed to the tables each command and emptied after, and
+        # rooms seen are only copied when the set changed
+        self.logs = [{} for _ in TABLES]
+        self.index_logs = [({}, {}) for _ in INDEXES]
+        self.seen = frozenset()
+
+    def __len__(self):
+        return len(self.deltas)
+
+    def clear(self, game=None):
+        """Forget every delta and keyframe. Called mid-command (LOAD), pass
+        the game: what the command logged so far is dropped and recording
+        starts over from the state it has now"""
+        recording = game is not None and self.pending is not None
+        if recording:
+            self.abort(game)
+        self.deltas.clear()
+        self.keyframes.clear()
+        self.pending = None
+        self.generation += 1
+        if recording:
+            self.begin(game)
+
+    # ---------- Recording ----------
+
+    def begin(self, game):
+        """Start logging the writes of the command about to run"""
+        s = game.s
+        for name, log in zip(TABLES, self.logs):
+            getattr(game, name).log = log
+        for name, log in zip(INDEXES, self.index_logs):
+            getattr(game, name).log = log
+        if len(self.seen) != len(s.seen) or not self.seen.issuperset(s.seen):
+            self.seen = frozenset(s.seen)
+        self.pending = (_vitals(s), s.f.snapshot(), game.rng.getstate(),
+                        tuple(getattr(game, name).hash for name in TABLES))
+
+    def commit(self, game):
+        """Stop logging; keep the command's delta if it changed anything"""
+        if self.pending is None:
+            return
+        vitals, flags, rng, hashes = self.pending
+        self.pending = None
+        s = game.s
+        tables = []
+        for name, hash, log in zip(TABLES, hashes, self.logs):
+            if log:
+                tables.append((name, hash, tuple(log.items())))
+                log.clear()
+            getattr(game, name).log = None
+        indexes = []
+        for i, name in enumerate(INDEXES):
+            where, at = self.index_logs[i]
+            if where:
+                indexes.append((name, where, at))
+                self.index_logs[i] = ({}, {})
+            getattr(game, name).log = None
+        seen = self.seen
+        delta = Delta(self.seq + 1, s.turn,
+                      vitals if vitals != _vitals(s) else None,
+                      seen if len(seen) != len(s.seen) or seen != s.seen else None,
+                      flags if flags != s.f.snapshot() else None,
+                      rng if rng != game.rng.getstate() else None,
+                      tuple(tables), tuple(indexes))
+        if not any(delta[2:]):
+            return
+        self.seq += 1
+        self.deltas.append(delta)
+        turn = s.turn
+        last = self.keyframes[-1][1] if self.keyframes else 0
+        if turn // self.keyframe_every > last // self.keyframe_every:
+            self.keyframes.append((self.seq, turn, game.snapshot()))
+
+    def abort(self, game):
+        """Stop logging without keeping a delta"""
+        if self.pending is None:
+            return
+        self.pending = None
+        for name, log in zip(TABLES, self.logs):
+            log.clear()
+            getattr(game, name).log = None
+        for name, (where, at) in zip(INDEXES, self.index_logs):
+            where.clear()
+            at.clear()
+            getattr(game, name).log = None
+
+    # ---------- Going back ----------
+
+    @staticmethod
+    def _revert(game, delta):
+        s = game.s
+        if delta.vitals is not None:
+            (s.turn, s.max_turns, s.health, s.will, s.hunger,
+             s.location) = delta.vitals
+        if delta.seen is not None:
+            s.seen = set(delta.seen)
+        if delta.flags is not None:
+            s.f.restore(delta.flags)
+        if delta.rng is not None:
+            game.rng.setstate(delta.rng)
+        for name, hash, images in delta.tables:
+            getattr(game, name).rewind(hash, images)
+        for name, where, at in delta.indexes:
+            getattr(game, name).rewind(where, at)
+
+    def _drop_keyframes_after(self, seq):
+        while self.keyframes and self.keyframes[-1][0] > seq:
+            self.keyframes.pop()
+
+    def undo(self, game, count=1):
+        """Revert the last count commands (fewer if the ring runs out);
+        returns how many were reverted"""
+        self.abort(game)
+        self.generation += 1
+        done = 0
+        while done < count and self.deltas:
+            delta = self.deltas.pop()
+            self._revert(game, delta)
+            self.seq = delta.seq - 1
+            done += 1
+        self._drop_keyframes_after(self.seq)
+        return done
+
+    def rewind(self, game, turn):
+        """Go back to the latest point at or before a turn; returns the turn
+        reached, or None if neither the deltas nor a keyframe reach it"""
+        self.abort(game)
+        self.generation += 1
+        deltas = self.deltas
+        # Deltas to revert: every one that finished after the target turn
+        count = 0
+        for delta in reversed(deltas):
+            if delta.turn <= turn:
+                break
+            count += 1
+        if count == 0:
+            return game.s.turn if game.s.turn <= turn else None
+        oldest = deltas[-count]
+        started = oldest.vitals[0] if oldest.vitals else oldest.turn
+        if count == len(deltas) and started > turn:
+            return self._jump(game, turn)
+        target = oldest.seq - 1
+        # A keyframe between the target and now saves reverting the newer deltas
+        frame = next((f for f in self.keyframes if f[0] >= target), None)
+        if frame is not None and frame[0] < deltas[-1].seq:
+            seq, _, token = frame
+            while deltas and deltas[-1].seq > seq:
+                deltas.pop()
+            game.restore_state(token)
+        while deltas and deltas[-1].seq > target:
+            self._revert(game, deltas.pop())
+        self.seq = target
+        self._drop_keyframes_after(target)
+        return game.s.turn
+
+    def _jump(self, game, turn):
+        """Restore the newest keyframe at or before a turn the deltas no
+        longer reach; everything after it is forgotten"""
+        frame = None
+        for f in self.keyframes:
+            if f[1] <= turn:
+                frame = f
+        if frame is None:
+            return None
+        seq, _, token = frame
+        game.restore_state(token)
+        self.deltas.clear()
+        self.seq = seq
+        self._drop_keyframes_after(seq)
+        return game.s.turn
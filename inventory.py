@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Inventory
+The player's holdings, stored as the "inv" location of the item index so an
+item's location and the inventory can never disagree.
+"""
+
+HELD = "inv"
+NOWHERE = "NOWHERE"  # used up, out of play
+
+
+class Inventory:
+    """Ordered set of carried item keys backed by a LocationIndex.
+
+    Adding or removing an item moves it through ``move(key, dest)`` (normally
+    Game.move_item), so membership is answered by the index in O(1) and
+    iteration follows pick-up order.
+    """
+
+    def __init__(self, index, move=None):
+        self._index = index
+        self._move = move or index.move
+
+    def add(self, key):
+        """Put an item in the player's hands"""
+        self._move(key, HELD)
+
+    def remove(self, key, dest=NOWHERE):
+        """Take an item out of the inventory, by default out of play"""
+        if key not in self:
+            raise ValueError(f"{key} is not in the inventory")
+        self._move(key, dest)
+
+    def discard(self, key, dest=NOWHERE):
+        """Like remove(), but quiet if the item is not carried"""
+        if key in self:
+            self._move(key, dest)
+
+    def keys(self):
+        """Carried item keys, in pick-up order"""
+        return self._index.at(HELD)
+
+    def __contains__(self, key):
+        return self._index.where(key) == HELD
+
+    def __iter__(self):
+        return iter(self._index.at(HELD))
+
+    def __len__(self):
+        return self._index.count(HELD)
+
+    def __bool__(self):
+        return self._index.count(HELD) > 0
+
+    def __repr__(self):
+        return f"Inventory({self.keys()!r})"
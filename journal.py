@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Session Journal
+Write-ahead log of every command a session runs, so a restarted worker can
+rebuild any session: load its latest snapshot and replay the commands
+logged after it through Game.process_command.
+
+Each session has two files in the journal directory:
+
+  <session>.log   one JSON line per command: [seq, turn, command, rng]
+                  with the session RNG's state as the command started
+  <session>.snap  pickled (version, seq, Game.snapshot()) of the newest
+                  snapshot, replaced atomically
+
+A command is appended before it runs. Appends go straight to the file;
+fsync is group-committed by one background thread per process, which
+syncs every file written to in the last few milliseconds at once, so
+sessions waiting on durability share the cost of a flush. Every
+SNAPSHOT_EVERY commands, and after UNDO, REWIND or LOAD (which depend on
+undo history or saves that replay can't count on), the session is
+snapshotted and its log emptied.
+Replay skips records the snapshot already covers, so a crash between the
+two steps is harmless, and stops at a torn last line.
+"""
+
+import json
+import os
+import pickle
+import re
+import threading
+import time
+
+from game_engine import Game, Snapshot
+
+JOURNAL_DIR = os.environ.get(
+    "SHADOW_CIRCUIT_JOURNALS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "journals"))
+SNAPSHOT_EVERY = 16
+FLUSH_INTERVAL = 0.002  # seconds a flush waits to gather more writes
+SNAPSHOT_VERSION = 2
+
+SESSION_ID = re.compile(r"[0-9a-f]{8,64}")
+
+
+class GroupCommit:
+    """Background fsync shared by every journal in the process.
+
+    ``written(fd)`` returns a ticket; ``wait(ticket)`` blocks until a flush
+    that started after that write has synced the file.
+    """
+
+    def __init__(self, interval=FLUSH_INTERVAL):
+        self.interval = interval
+        self.cond = threading.Condition()
+        self.dirty = set()
+        self.written_count = 0
+        self.synced_count = 0
+        self.thread = None
+
+    def written(self, fd):
+        with self.cond:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True,
+                                               name="journal-fsync")
+                self.thread.start()
+            self.dirty.add(fd)
+            self.written_count += 1
+            self.cond.notify_all()
+            return self.written_count
+
+    def wait(self, ticket):
+        with self.cond:
+            while self.synced_count < ticket:
+                self.cond.wait()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.dirty:
+                    self.cond.wait()
+            time.sleep(self.interval)  # let other sessions' writes join in
+            with self.cond:
+                fds, self.dirty = self.dirty, set()
+                upto = self.written_count
+            for fd in fds:
+                try:
+                    os.fsync(fd)
+                except OSError:
+                    pass  # closed since; Journal.close() synced it
+            with self.cond:
+                self.synced_count = upto
+                self.cond.notify_all()
+
+
+_COMMITTER = GroupCommit()
+
+
+def paths(session, directory=JOURNAL_DIR):
+    """(log path, snapshot path) for a session id"""
+    if not SESSION_ID.fullmatch(session or ""):
+        raise ValueError(f"bad session id {session!r}")
+    base = os.path.join(directory, session)
+    return base + ".log", base + ".snap"
+
+
+class Journal:
+    """One session's command log and snapshots"""
+
+    def __init__(self, session, directory=JOURNAL_DIR, seq=0,
+                 snapshot_every=SNAPSHOT_EVERY, committer=None):
+        os.makedirs(directory, exist_ok=True)
+        self.session = session
+        self.log_path, self.snap_path = paths(session, directory)
+        self.fd = os.open(self.log_path,
+                          os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.seq = seq
+        self.snapshot_every = snapshot_every
+        self.committer = committer or _COMMITTER
+        self.since_snapshot = 0
+        self.ticket = 0
+
+    def append(self, game, command, durable=True):
+        """Log a command about to run; with durable, return once it's synced"""
+        self.seq += 1
+        line = json.dumps([self.seq, game.s.turn, command,
+                           list(game.rng.getstate())],
+                          ensure_ascii=False, separators=(",", ":"))
+        os.write(self.fd, (line + "\n").encode("utf-8"))
+        self.ticket = self.committer.written(self.fd)
+        if durable:
+            self.committer.wait(self.ticket)
+
+    def process(self, game, command, durable=True):
+        """Journal a command, run it and snapshot when due; returns the
+        command's result"""
+        history = game.history
+        before = history.generation if history is not None else 0
+        self.append(game, command, durable)
+        result = game.process_command(command)
+        self.since_snapshot += 1
+        jumped = history is not None and history.generation != before
+        if self.since_snapshot >= self.snapshot_every or jumped:
+            self.snapshot(game)
+        return result
+
+    def snapshot(self, game):
+        """Write the game's state as of the last logged command and empty
+        the log"""
+        data = pickle.dumps((SNAPSHOT_VERSION, self.seq, game.snapshot()),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        tmp = self.snap_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snap_path)
+        os.ftruncate(self.fd, 0)
+        self.since_snapshot = 0
+
+    def close(self):
+        if self.ticket:
+            self.committer.wait(self.ticket)
+        os.close(self.fd)
+
+    def remove(self):
+        """Close and delete the session's files"""
+        self.close()
+        for path in (self.log_path, self.snap_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def recover(session, directory=JOURNAL_DIR, game_factory=Game):
+    """Rebuild a session from its snapshot and log; (game, seq) or None
+    if nothing was journaled for it"""
+    log_path, snap_path = paths(session, directory)
+    if not os.path.exists(log_path) and not os.path.exists(snap_path):
+        return None
+    game = game_factory()
+    seq = 0
+    if os.path.exists(snap_path):
+        with open(snap_path, "rb") as f:
+            version, seq, token = pickle.load(f)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"snapshot version {version} isn't supported")
+        game.restore(Snapshot(*token))
+    if os.path.exists(log_path):
+        with open(log_path, "rb") as f:
+            for line in f:
+                try:
+                    number, _, command, rng = json.loads(line)
+                except ValueError:
+                    break  # torn by a crash mid-write
+                if number <= seq:
+                    continue
+                game.rng.setstate(rng)
+                game.process_command(command)
+                seq = number
+    game.output_buffer = []
+    return game, seq
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Location Index
+Keeps "what is where" for items and NPCs so room queries only touch the
+things in that room.
+"""
+
+_UNSET = object()
+
+
+class LocationIndex:
+    """Two-way map between keys and locations.
+
+    Each location holds an ordered set of keys (a dict with None values), so
+    ``at(loc)`` lists things in the order they arrived and moves are O(1).
+
+    An index made with ``copy()`` is layered over its parent: it records only
+    the keys it moved and the locations it touched, reading everything else
+    from the parent, which must not change afterwards.
+
+    While ``log`` is a pair of dicts, each key's location and each bucket are
+    saved as they were before their first change, for rewind().
+    """
+
+    def __init__(self, base=None):
+        self._base = base
+        self._where = {}
+        self._at = {}
+        self.log = None
+
+    @classmethod
+    def build(cls, placements):
+        """Index a {key: location} mapping"""
+        index = cls()
+        for key, loc in placements.items():
+            index.move(key, loc)
+        return index
+
+    def copy(self):
+        """Independent index with the same placements"""
+        return LocationIndex(self)
+
+    def snapshot(self):
+        """Immutable copy of this layer's placements"""
+        return (tuple(self._where.items()),
+                tuple((loc, tuple(keys)) for loc, keys in self._at.items()))
+
+    def restore(self, token):
+        """Return this layer to a snapshot() taken over the same parent"""
+        where, at = token
+        self._where = dict(where)
+        self._at = {loc: dict.fromkeys(keys) for loc, keys in at}
+
+    def rewind(self, where, at):
+        """Put back the locations and buckets a log saved"""
+        for key, loc in where.items():
+            if loc is _UNSET:
+                self._where.pop(key, None)
+            else:
+                self._where[key] = loc
+        for loc, bucket in at.items():
+            if bucket is None:
+                self._at.pop(loc, None)
+            else:
+                self._at[loc] = bucket
+
+    def _remember(self, key, *locs):
+        where, at = self.log
+        if key not in where:
+            where[key] = self._where.get(key, _UNSET)
+        for loc in locs:
+            if loc not in at:
+                bucket = self._at.get(loc)
+                at[loc] = None if bucket is None else dict(bucket)
+
+    def _peek(self, loc):
+        bucket = self._at.get(loc)
+        if bucket is None and self._base is not None:
+            return self._base._peek(loc)
+        return bucket
+
+    def _bucket(self, loc):
+        bucket = self._at.get(loc)
+        if bucket is None:
+            inherited = self._base._peek(loc) if self._base else None
+            bucket = self._at[loc] = dict(inherited or ())
+        return bucket
+
+    def where(self, key):
+        """Current location of a key, or None"""
+        if key in self._where or self._base is None:
+            return self._where.get(key)
+        return self._base.where(key)
+
+    def at(self, loc):
+        """Keys at a location, in arrival order"""
+        return list(self._peek(loc) or ())
+
+    def count(self, loc):
+        """Number of keys at a location"""
+        return len(self._peek(loc) or ())
+
+    def move(self, key, dest):
+        """Put a key at dest and return where it was"""
+        old = self.where(key)
+        if self.log is not None and old != dest:
+            self._remember(key, old, dest)
+        if key in self:
+            if old == dest:
+                return old
+            del self._bucket(old)[key]
+        self._where[key] = dest
+        self._bucket(dest)[key] = None
+        return old
+
+    def keys(self):
+        """Every indexed key"""
+        if self._base is None:
+            return list(self._where)
+        return list(dict.fromkeys([*self._base.keys(), *self._where]))
+
+    def __contains__(self, key):
+        if key in self._where:
+            return True
+        return self._base is not None and key in self._base
+
+    def __len__(self):
+        return len(self.keys())
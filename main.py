@@ -37,9 +37,20 @@ Parser (aliases in []):
 
 # ---- headers, utilities, state, world/items/npcs/hints ---
 
-import sys, json, os, textwrap, random
+import sys, os, textwrap
 from collections import defaultdict
 
+from autosave import atomic_write, writer
+from locations import LocationIndex
+from rng import SessionRandom
+from rules import RuleRegistry, NO_TARGET
+from savefmt import Layout, SaveCodec, diff_records
+
+SAVE_PATH = "shadow_circuit.sav"
+AUTOSAVE_PATH = "shadow_circuit_autosave.sav"
+LEGACY_SAVE_PATH = "shadow_circuit_save.json"  # JSON saves from older builds
+AUTOSAVE_EVERY = 5  # turns
+
 def wrap(s, width=94):
     return "\n".join(textwrap.wrap(s, width)) if s else ""
 
@@ -50,6 +61,39 @@ def norm(s): return s.lower().strip()
 
 DIRECTIONS = {"n":"north","s":"south","e":"east","w":"west","u":"up","d":"down"}
 
+def _fishing_pair(game, a, b):
+    if not b or "NEWSSTAND" not in game.world[game.s.location].get("features",[]):
+        return False
+    return {a, game.find_item_key(b, where="PLAYER")} == {"STRING","TAROT_COIN"}
+
+def _interaction_rules():
+    rules = RuleRegistry()
+    add = rules.rule
+    add("use", "SOLVENT", "use_solvent", targets=("locket","resin","threads"),
+        location="L05", otherwise="No resin-bound locket here.")
+    add("use", "EMPTY_JAR", "use_jar", targets=("resin",),
+        location="L07", otherwise="No safe resin to sample here.")
+    for k in ["STRING","TAROT_COIN"]:
+        add("use", k, "use_fishing", when=_fishing_pair)
+    for k in ["MAGNET_CARD_hidden","CASE_KEY"]:
+        add("use", k, "use_case", targets=("case","lock","lens","array"),
+            location="L09", otherwise="No case here.")
+    add("use", "RAG", "use_rag", targets=(NO_TARGET,"hand","hands","fingers"))
+    add("use", "WARD_CHALK", "use_ward_chalk")
+    add("use", "SILVERED_THREAD", "use_thread", location="L11")
+    add("use", "WIRE_CUTTER", "use_wire_cutter", location="L11")
+    add("use", "BOLT", "use_bolt", location="L12")
+    add("use", "SILVER_NAILS", "use_nails", targets=("resin",),
+        holding=("AETHER_RESIN",), otherwise="You don't have refined resin yet.")
+    add("use", "LENS_ARRAY", "use_lens", targets=("blueprint",),
+        holding=("BLUEPRINT",), otherwise="You need the tower blueprints to plan angles.")
+    add("use", "POLICE_RADIO", "use_radio", location="L12")
+    add("give", "MUG", "give_mug", targets=("REEF",))
+    add("give", "BONE", "give_bone", targets=("GASKET",))
+    return rules
+
+RULES = _interaction_rules()
+
 class State:
     def __init__(self):
         self.turn = 0
@@ -87,12 +131,14 @@ class State:
         }
 
 class Game:
-    def __init__(self):
+    def __init__(self, seed=None):
         self.s = State()
+        self.rng = SessionRandom(seed)
         self.world = self._build_world()
         self.items = self._build_items()
         self.npcs = self._build_npcs()
         self.hints = self._build_hints()
+        self.index_locations()
 
     # ---------- World / Items / NPCs ----------
     def _build_world(self):
@@ -376,6 +422,7 @@ class Game:
                 cmd = input("> ").strip()
             except (EOFError, KeyboardInterrupt):
                 print("\nGoodnight.")
+                writer().wait()
                 return
             if not cmd:
                 continue
@@ -384,7 +431,9 @@ class Game:
     # ---------- Turn / Status ----------
     def tick(self, cost=1):
         self.s.turn += cost
-        if self.s.hunger >= 4 and random.random() < 0.1:
+        if cost and self.s.turn // AUTOSAVE_EVERY > (self.s.turn - cost) // AUTOSAVE_EVERY:
+            self.autosave()
+        if self.s.hunger >= 4 and self.rng.random() < 0.1:
             print("Your hunger scrapes the back of your throat. Words come out with fangs.")
         self.s.health = max(0, min(3, self.s.health))
         self.s.will = max(0, min(3, self.s.will))
@@ -393,6 +442,8 @@ class Game:
     def lose(self, why):
         print("\n" + wrap(why))
         print("\n*** You lose. Dawn takes what it is owed. ***")
+        self.autosave()
+        writer().wait()
         sys.exit(0)
 
     def stats(self):
@@ -406,13 +457,13 @@ class Game:
         if announce:
             print("\n" + title(f"{L['name']} — Turn {self.s.turn+1}"))
         print("\n" + wrap(L["desc"]))
-        vis_items = [self.items[i]["name"] for i in self.items if self.items[i]["loc"] == self.s.location and not i.endswith("_hidden")]
+        vis_items = [self.items[i]["name"] for i in self.item_locs.at(self.s.location) if not i.endswith("_hidden")]
         if vis_items:
             print("You notice:", ", ".join(vis_items) + ".")
         feats = L.get("features", [])
         if feats:
             print("Features here:", ", ".join(f.lower().replace("_"," ") for f in feats) + ".")
-        npcs = [k for k,v in self.npcs.items() if v["loc"] == self.s.location]
+        npcs = self.npc_locs.at(self.s.location)
         if npcs:
             print("Someone here:", ", ".join(self.npcs[n]["name"] for n in npcs) + ".")
         exits = []
@@ -495,6 +546,7 @@ class Game:
             return
         if v in ["quit","exit"]:
             print("Goodnight.")
+            writer().wait()
             sys.exit(0)
         if v in ["look"]:
             self.tick(0); self.look(announce=True); return
@@ -669,7 +721,7 @@ class Game:
         self.tick()
         if key not in self.s.inv:
             self.s.inv.append(key)
-        self.items[key]["loc"] = "PLAYER"
+        self.move_item(key, "PLAYER")
         print(f"You take the {self.items[key]['name']}.")
 
     def do_drop(self, obj):
@@ -679,7 +731,7 @@ class Game:
             return
         self.tick()
         self.s.inv.remove(key)
-        self.items[key]["loc"] = self.s.location
+        self.move_item(key, self.s.location)
         print(f"You drop the {self.items[key]['name']}.")
 
     # ---------- Use / Combine ----------
@@ -689,129 +741,101 @@ class Game:
             print("You don't have that.")
             return
 
-        if A == "SOLVENT" and b and any(t in b.lower() for t in ["locket","resin","threads"]):
-            if self.s.location != "L05":
-                self.tick(); print("No resin-bound locket here."); return
-            if self.items["SOLVENT"].get("uses",0) <= 0:
-                self.tick(); print("Your solvent bottle is dry."); return
+        if not self.interact("use", A, b):
             self.tick()
-            self.items["SOLVENT"]["uses"] -= 1
-            self.items["BRASS_LOCKET"]["stuck"] = False
-            print(wrap("You soak the rag with solvent and press to the threads. They hiss and slacken. "
-                       "With a tug, the locket comes free."))
-            if "BRASS_LOCKET" not in self.s.inv:
-                self.s.inv.append("BRASS_LOCKET")
-                self.items["BRASS_LOCKET"]["loc"] = "PLAYER"
-                print("You take the brass locket.")
-            return
+            print("Nothing obvious happens.")
 
-        if A == "EMPTY_JAR" and b and "resin" in b.lower():
-            if self.s.location != "L07":
-                self.tick(); print("No safe resin to sample here."); return
-            if "RESIN_SAMPLE" in self.s.inv:
-                self.tick(); print("You already have a sample."); return
-            self.tick()
-            self.s.inv.append("RESIN_SAMPLE")
-            self.items["RESIN_SAMPLE"]["loc"] = "PLAYER"
-            self.s.f["resin_sampled"] = True
-            print("You coax warm resin into the jar. It taps the glass like a slow heartbeat.")
-            return
+    def interact(self, verb, a, b, tokens=None):
+        rule, blocked = RULES.match(self, verb, a, b, tokens)
+        if not rule and not blocked:
+            return False
+        self.tick()
+        if rule: rule.fire(self, a, b)
+        else: print(blocked)
+        return True
 
-        if A in ["STRING","TAROT_COIN"] and b:
-            B = self.find_item_key(b, where="PLAYER")
-            pair = {A, B}
-            feats = self.world[self.s.location].get("features",[])
-            if "NEWSSTAND" in feats and "STRING" in pair and "TAROT_COIN" in pair:
-                self.tick()
-                print("You tie the coin to the string and fish behind the newsstand…")
-                if self.items["MAGNET_CARD_hidden"]["loc"] == "L09_hidden":
-                    self.items["MAGNET_CARD_hidden"]["loc"] = "L04"
-                    print("Clack. A magnet card slides free onto the sidewalk.")
-                else:
-                    print("You scrape gum and a movie stub. Still—nice technique.")
-                return
+    def use_solvent(self, a, b):
+        if self.items["SOLVENT"].get("uses",0) <= 0:
+            print("Your solvent bottle is dry."); return
+        self.items["SOLVENT"]["uses"] -= 1
+        self.items["BRASS_LOCKET"]["stuck"] = False
+        print(wrap("You soak the rag with solvent and press to the threads. They hiss and slacken. "
+                   "With a tug, the locket comes free."))
+        if "BRASS_LOCKET" not in self.s.inv:
+            self.s.inv.append("BRASS_LOCKET")
+            self.move_item("BRASS_LOCKET", "PLAYER")
+            print("You take the brass locket.")
+
+    def use_jar(self, a, b):
+        if "RESIN_SAMPLE" in self.s.inv:
+            print("You already have a sample."); return
+        self.s.inv.append("RESIN_SAMPLE")
+        self.move_item("RESIN_SAMPLE", "PLAYER")
+        self.s.f["resin_sampled"] = True
+        print("You coax warm resin into the jar. It taps the glass like a slow heartbeat.")
+
+    def use_fishing(self, a, b):
+        print("You tie the coin to the string and fish behind the newsstand…")
+        if self.item_locs.where("MAGNET_CARD_hidden") == "L09_hidden":
+            self.move_item("MAGNET_CARD_hidden", "L04")
+            print("Clack. A magnet card slides free onto the sidewalk.")
+        else:
+            print("You scrape gum and a movie stub. Still—nice technique.")
 
-        if A in ["MAGNET_CARD_hidden","CASE_KEY"] and b and any(t in b.lower() for t in ["case","lock","lens","array"]):
-            if self.s.location != "L09":
-                self.tick(); print("No case here."); return
-            self.tick()
-            print("You trip the glass seam. *Click.* The case pops open.")
-            if self.items["LENS_ARRAY_CASE"]["loc"] == "L09":
-                self.items["LENS_ARRAY_CASE"]["loc"] = "NOWHERE"
-                self.items["LENS_ARRAY"]["loc"] = "L09"
-            return
+    def use_case(self, a, b):
+        print("You trip the glass seam. *Click.* The case pops open.")
+        if self.item_locs.where("LENS_ARRAY_CASE") == "L09":
+            self.move_item("LENS_ARRAY_CASE", "NOWHERE")
+            self.move_item("LENS_ARRAY", "L09")
 
-        if A == "RAG" and (not b or any(t in (b or "").lower() for t in ["hand","hands","fingers"])):
-            self.tick()
-            self.s.f["sticky_fingers"] = False
-            print("You wipe your hands clean. Mostly.")
-            return
+    def use_rag(self, a, b):
+        self.s.f["sticky_fingers"] = False
+        print("You wipe your hands clean. Mostly.")
 
-        if A == "WARD_CHALK":
-            self.tick()
-            feats = self.world[self.s.location].get("features",[])
-            if self.s.location == "L06" and "WARD_SIGIL_BENCH" in feats:
-                if "NEWSPAPER" in self.s.inv:
-                    print("You chalk and press newspaper for a clean rubbing—the ward token lifts into your palm.")
-                else:
-                    print("You trace the ward lines and lift a chalky token—rough but serviceable.")
-                if not self.s.f["token_ward"]:
-                    self.s.f["token_ward"] = True
-                    self.s.inv.append("WARD_TOKEN"); self.items["WARD_TOKEN"]["loc"] = "PLAYER"
-                return
-            if self.s.location == "L08" and "SIGIL_MANUAL" in [k for k in self.items if self.items[k]["loc"]=="L08"]:
-                print("With the manual's pattern, you draw a feather sigil, lift it as a token.")
-                if not self.s.f["token_feather"]:
-                    self.s.f["token_feather"] = True
-                    self.s.inv.append("FEATHER_TOKEN"); self.items["FEATHER_TOKEN"]["loc"] = "PLAYER"
-                return
-            if self.s.location == "L07" and self.world["L07"]["features"]:
-                print("Chalking over the vault does nothing without proper tokens.")
-                return
-            print("You sketch idle sigils in the air. Pretty; ineffective.")
+    def use_ward_chalk(self, a, b):
+        feats = self.world[self.s.location].get("features",[])
+        if self.s.location == "L06" and "WARD_SIGIL_BENCH" in feats:
+            if "NEWSPAPER" in self.s.inv:
+                print("You chalk and press newspaper for a clean rubbing—the ward token lifts into your palm.")
+            else:
+                print("You trace the ward lines and lift a chalky token—rough but serviceable.")
+            if not self.s.f["token_ward"]:
+                self.s.f["token_ward"] = True
+                self.s.inv.append("WARD_TOKEN"); self.move_item("WARD_TOKEN", "PLAYER")
             return
-
-        if A == "SILVERED_THREAD" and self.s.location == "L11":
-            self.tick()
-            print("You tie the silvered thread to the inner latch through the gate bars. Now if only someone could pull…")
-            self.s.f["loyal_dog"] = True
+        if self.s.location == "L08" and self.item_locs.where("SIGIL_MANUAL") == "L08":
+            print("With the manual's pattern, you draw a feather sigil, lift it as a token.")
+            if not self.s.f["token_feather"]:
+                self.s.f["token_feather"] = True
+                self.s.inv.append("FEATHER_TOKEN"); self.move_item("FEATHER_TOKEN", "PLAYER")
             return
-
-        if A == "WIRE_CUTTER" and self.s.location == "L11":
-            self.tick()
-            print("You snip the chain with a grunt. The gate swings loose.")
+        if self.s.location == "L07" and self.world["L07"]["features"]:
+            print("Chalking over the vault does nothing without proper tokens.")
             return
+        print("You sketch idle sigils in the air. Pretty; ineffective.")
 
-        if A == "BOLT" and self.s.location == "L12":
-            self.tick()
-            self.s.f["antenna_fixed"] = True
-            print("You twist the bolt into place. The panel sits firm, hum sharpening to a stable chord.")
-            return
+    def use_thread(self, a, b):
+        print("You tie the silvered thread to the inner latch through the gate bars. Now if only someone could pull…")
+        self.s.f["loyal_dog"] = True
 
-        if A == "SILVER_NAILS" and b and "resin" in b.lower():
-            if "AETHER_RESIN" in self.s.inv:
-                self.tick()
-                print("You coat the nails with refined resin—the air around them tastes like winter metal.")
-                return
-            self.tick(); print("You don't have refined resin yet."); return
+    def use_wire_cutter(self, a, b):
+        print("You snip the chain with a grunt. The gate swings loose.")
 
-        if A == "LENS_ARRAY" and b and "blueprint" in b.lower():
-            if "BLUEPRINT" in self.s.inv:
-                self.tick()
-                print("You plan the mirror angles along the dawn line. It will cut the ritual like glass.")
-                return
-            self.tick(); print("You need the tower blueprints to plan angles."); return
+    def use_bolt(self, a, b):
+        self.s.f["antenna_fixed"] = True
+        print("You twist the bolt into place. The panel sits firm, hum sharpening to a stable chord.")
 
-        if A == "POLICE_RADIO" and self.s.location == "L12":
-            self.tick()
-            if not self.s.f["antenna_fixed"]:
-                print("The radio hisses; the panel rattles too much to hold a clear frequency. Maybe secure it first?")
-            else:
-                print("You sweep channels until the hum locks—remember the cadence. TUNE ANTENNA could seal it.")
-            return
+    def use_nails(self, a, b):
+        print("You coat the nails with refined resin—the air around them tastes like winter metal.")
 
-        self.tick()
-        print("Nothing obvious happens.")
+    def use_lens(self, a, b):
+        print("You plan the mirror angles along the dawn line. It will cut the ritual like glass.")
+
+    def use_radio(self, a, b):
+        if not self.s.f["antenna_fixed"]:
+            print("The radio hisses; the panel rattles too much to hold a clear frequency. Maybe secure it first?")
+        else:
+            print("You sweep channels until the hum locks—remember the cadence. TUNE ANTENNA could seal it.")
 
     def do_combine(self, a, b):
         A = self.find_item_key(a, where="PLAYER")
@@ -898,8 +922,8 @@ class Game:
             if "BRASS_LOCKET" in self.s.inv and self.s.f["tia_trust"] < 1:
                 self.s.f["tia_trust"] = 1
                 print("She sees the locket, gentles. “Keep that close. Here—chalk and a feather pattern.”")
-                if "WARD_CHALK" not in self.s.inv and self.items["WARD_CHALK"]["loc"] != "PLAYER":
-                    self.s.inv.append("WARD_CHALK"); self.items["WARD_CHALK"]["loc"] = "PLAYER"
+                if "WARD_CHALK" not in self.s.inv and self.item_locs.where("WARD_CHALK") != "PLAYER":
+                    self.s.inv.append("WARD_CHALK"); self.move_item("WARD_CHALK", "PLAYER")
             return
         if npc == "GASKET":
             print("Gasket pants happily, tail going like a metronome for joy.")
@@ -981,7 +1005,7 @@ class Game:
             print("You already have counter-sigil ink.")
             return
         self.tick()
-        self.s.inv.append("COUNTER_INK"); self.items["COUNTER_INK"]["loc"] = "PLAYER"
+        self.s.inv.append("COUNTER_INK"); self.move_item("COUNTER_INK", "PLAYER")
         print("You grind herbs and stone—steeped in your breath. The ink smells like thunder before rain.")
         self.s.f["empathy"] += 1
 
@@ -1025,7 +1049,7 @@ class Game:
         if self.s.location == "L10" and not self.s.f["token_shadow"]:
             print("The shadowmark lifts in your sight. You press the rag—an imprint comes away, cold.")
             self.s.f["token_shadow"] = True
-            self.s.inv.append("SHADOW_TOKEN"); self.items["SHADOW_TOKEN"]["loc"] = "PLAYER"
+            self.s.inv.append("SHADOW_TOKEN"); self.move_item("SHADOW_TOKEN", "PLAYER")
             self.s.f["shadowmark_seen"] = True
             return
         if self.s.location == "L06" and not self.s.f["token_ward"]:
@@ -1042,15 +1066,15 @@ class Game:
             return
         self.tick()
         self.s.f["sockets_inserted"] += 1
-        self.s.inv.remove(which); self.items[which]["loc"] = "NOWHERE"
+        self.s.inv.remove(which); self.move_item(which, "NOWHERE")
         print(f"You press the {self.items[which]['name']} into a socket. It hums in place.")
         if self.s.f["sockets_inserted"] >= 3 and not self.s.f["vault_open"]:
             self.s.f["vault_open"] = True
             print("The vault sighs open. Inside: refined AETHER RESIN…and a tiny CASE KEY.")
             if "AETHER_RESIN" not in self.s.inv:
-                self.s.inv.append("AETHER_RESIN"); self.items["AETHER_RESIN"]["loc"] = "PLAYER"
+                self.s.inv.append("AETHER_RESIN"); self.move_item("AETHER_RESIN", "PLAYER")
             if "CASE_KEY" not in self.s.inv:
-                self.s.inv.append("CASE_KEY"); self.items["CASE_KEY"]["loc"] = "PLAYER"
+                self.s.inv.append("CASE_KEY"); self.move_item("CASE_KEY", "PLAYER")
 
     def tune_antenna(self):
         if self.s.location != "L12":
@@ -1065,24 +1089,72 @@ class Game:
         print("You nudge the three tones until they lock—like teeth of a key finding its ward. The path south slackens.")
 
     # ---------- Save / Load ----------
-    def do_save(self, path="shadow_circuit_save.json"):
-        data = {"state":self.s.__dict__,
-                "items":self.items,
-                "world":self.world}
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+    _codec = None
+
+    def save_codec(self):
+        # Saves hold changes from the freshly built content, indexed by name
+        if Game._codec is None:
+            world, items, npcs = self._build_world(), self._build_items(), self._build_npcs()
+            fields = {f for table in (world, items, npcs) for rec in table.values() for f in rec}
+            Game._codec = SaveCodec(Layout.from_content(
+                world, items, npcs, fields, State().f, extra=["PLAYER"], base=(world, items, npcs)))
+        return Game._codec
+
+    def save_bytes(self):
+        codec = self.save_codec()
+        world, items, npcs = codec.layout.base
+        s = self.s
+        return codec.encode({
+            "turn":s.turn, "health":s.health, "will":s.will, "hunger":s.hunger,
+            "location":s.location, "inv":s.inv, "seen":s.seen, "flags":s.f,
+            "items":diff_records(items, self.items),
+            "npcs":diff_records(npcs, self.npcs),
+            "world":diff_records(world, self.world),
+            "rng":list(self.rng.getstate())})
+
+    def queue_save(self, path):
+        # Serialize now, write on the background writer
+        writer().submit(path, atomic_write, path, self.save_bytes())
+
+    def autosave(self):
+        self.queue_save(AUTOSAVE_PATH)
+
+    def do_save(self, path=SAVE_PATH):
+        self.queue_save(path)
         self.tick(0)
         print(f"Saved game to {path}")
 
-    def do_load(self, path="shadow_circuit_save.json"):
+    def do_load(self, path=SAVE_PATH):
+        writer().wait(path)
+        if not os.path.exists(path) and path == SAVE_PATH and os.path.exists(LEGACY_SAVE_PATH):
+            # Upgrade the old JSON save in place of the new one
+            with open(LEGACY_SAVE_PATH, "rb") as f:
+                atomic_write(path, self.save_codec().encode(self.save_codec().decode(f.read())))
+            os.replace(LEGACY_SAVE_PATH, LEGACY_SAVE_PATH + ".migrated")
         if not os.path.exists(path):
             print("No save found.")
             return
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        self.s.__dict__ = data["state"]
-        self.items = data["items"]
-        self.world = data["world"]
+        with open(path, "rb") as f:
+            data = self.save_codec().decode(f.read())
+        self.s = State()
+        for name in ("turn", "health", "will", "hunger", "location"):
+            setattr(self.s, name, data[name])
+        self.s.inv = list(data["inv"])
+        self.s.seen = set(data["seen"])
+        self.s.f.update(data["flags"])
+        self.world, self.items, self.npcs = self._build_world(), self._build_items(), self._build_npcs()
+        for table, changes in ((self.world, data["world"]), (self.items, data["items"]), (self.npcs, data["npcs"])):
+            for key, fields in changes.items():
+                if key not in table:
+                    continue
+                for name, value in fields.items():
+                    if isinstance(value, dict) and isinstance(table[key].get(name), dict):
+                        table[key][name].update(value)
+                    else:
+                        table[key][name] = value
+        if data.get("rng"):
+            self.rng.setstate(data["rng"])
+        self.index_locations()
         self.tick(0)
         print("Loaded save.")
         self.look(announce=True)
@@ -1097,25 +1169,38 @@ class Game:
         if not npc:
             print("They're not here.")
             return
-        self.tick()
-        if npc == "REEF" and it == "MUG":
-            if "HEMATITE" not in self.s.inv:
-                self.s.inv.append("HEMATITE"); self.items["HEMATITE"]["loc"] = "PLAYER"
-                print("You hand him the warmth. He presses a hematite stone into your palm. “Ground yourself.”")
-            else:
-                print("He nods gratefully, warms his hands. “Bless you.”")
-            self.s.inv.remove("MUG"); self.items["MUG"]["loc"] = self.s.location
-            return
-        if npc == "GASKET" and it == "BONE":
-            self.s.inv.remove("BONE"); self.items["BONE"]["loc"] = self.s.location
-            if self.s.f["loyal_dog"]:
-                print("Gasket slips through the gate with the thread and yanks—*click*. The latch releases.")
-            else:
-                print("Gasket crunches the bone, tail a metronome of joy.")
-            return
-        print("They accept it with a nod, but nothing obvious changes.")
+        if not self.interact("give", it, npc, tokens=[npc]):
+            self.tick()
+            print("They accept it with a nod, but nothing obvious changes.")
+
+    def give_mug(self, it, npc):
+        if "HEMATITE" not in self.s.inv:
+            self.s.inv.append("HEMATITE"); self.move_item("HEMATITE", "PLAYER")
+            print("You hand him the warmth. He presses a hematite stone into your palm. “Ground yourself.”")
+        else:
+            print("He nods gratefully, warms his hands. “Bless you.”")
+        self.s.inv.remove("MUG"); self.move_item("MUG", self.s.location)
+
+    def give_bone(self, it, npc):
+        self.s.inv.remove("BONE"); self.move_item("BONE", self.s.location)
+        if self.s.f["loyal_dog"]:
+            print("Gasket slips through the gate with the thread and yanks—*click*. The latch releases.")
+        else:
+            print("Gasket crunches the bone, tail a metronome of joy.")
 
     # ---------- Helpers ----------
+    def index_locations(self):
+        self.item_locs = LocationIndex.build({k: v.get("loc") for k, v in self.items.items()})
+        self.npc_locs = LocationIndex.build({k: v.get("loc") for k, v in self.npcs.items()})
+
+    def move_item(self, key, dest):
+        self.item_locs.move(key, dest)
+        self.items[key]["loc"] = dest
+
+    def move_npc(self, key, dest):
+        self.npc_locs.move(key, dest)
+        self.npcs[key]["loc"] = dest
+
     def find_item_key(self, name, where=None):
         if not name: return None
         name = norm(name)
@@ -1125,19 +1210,17 @@ class Game:
                     return k
         if where == "PLAYER":
             return None
-        for k,v in self.items.items():
-            if v["loc"] == self.s.location:
-                if name in v["name"].lower() or name == k.lower():
-                    return k
+        for k in self.item_locs.at(self.s.location):
+            if name in self.items[k]["name"].lower() or name == k.lower():
+                return k
         return None
 
     def find_npc(self, name):
         if not name: return None
         name = norm(name)
-        for k,v in self.npcs.items():
-            if v["loc"] == self.s.location:
-                if name in v["name"].lower() or name == k.lower():
-                    return k
+        for k in self.npc_locs.at(self.s.location):
+            if name in self.npcs[k]["name"].lower() or name == k.lower():
+                return k
         return None
 
     # ---------- Endings ----------
@@ -1156,11 +1239,14 @@ class Game:
         else:
             print("*** Ending — Unknown ***")
         print("\nThanks for playing ‘Shadow Circuit: A Night in Austin’.")
+        self.autosave()
+        writer().wait()
         sys.exit(0)
 
 # ---------- Command glue for GIVE / TOKEN INSERT / TUNE ----------
 def main():
-    g = Game()
+    seed = os.environ.get("SHADOW_CIRCUIT_SEED")
+    g = Game(int(seed) if seed else None)
     print("Type HELP for commands. Extra verbs: ENTER CODE ####, TRACE SIGIL, CRAFT COUNTER-INK, "
           "TUNE ANTENNA, INSERT TOKEN <WARD/FEATHER/SHADOW>, GIVE <item> TO <npc>")
     while True:
@@ -1170,6 +1256,7 @@ def main():
             cmd = input("> ").strip()
         except (EOFError, KeyboardInterrupt):
             print("\nGoodnight.")
+            writer().wait()
             return
         if not cmd:
             continue
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Save Migration
+Upgrades and checks every save in a store after the content changes:
+
+  python migrate.py [--db PATH] [--renames FILE] [--report FILE]
+                    [--batch N] [--workers N] [--dry-run]
+
+Saves are streamed out of the store in primary-key batches. Worker
+processes decode each one with the layout it was written with (the store
+keeps them all), rename keys the content renamed, check it against the
+current catalog, try loading it into a Game and re-encode it with the
+current layout. The parent writes changed saves back a batch at a time and
+appends problems to the report as they come in, and at most a few batches
+are in flight, so memory stays flat however many saves there are.
+
+--renames is a JSON file of old key -> new key maps under "rooms",
+"items", "npcs" and "flags", e.g. {"items": {"MUG": "COFFEE_MUG"}}.
+The report has one JSON line per save with problems:
+{"player", "slot", "problems": [[kind, detail], ...]}. Saves with
+problems are left as they were, and so is a save the player overwrote
+while it was being upgraded (reported as "saved during migration"; the
+next run upgrades the new one).
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from game_engine import Game, FLAG_SCHEMA
+from inventory import HELD, NOWHERE
+from savefmt import Layout, SaveCodec, layout_id
+from saves import SAVES_DB, SQLiteSaveStore
+
+BATCH_SIZE = 1000
+IN_FLIGHT = 2  # batches queued per worker
+
+
+def rename(data, renames):
+    """A save dict with renamed rooms, items, NPCs and flags"""
+    rooms = renames.get("rooms", {})
+    items = renames.get("items", {})
+    npcs = renames.get("npcs", {})
+    flags = renames.get("flags", {})
+    if not (rooms or items or npcs or flags):
+        return data
+
+    def place(loc):
+        return rooms.get(loc, loc) if isinstance(loc, str) else loc
+
+    def records(changes, keys):
+        out = {}
+        for key, fields in changes.items():
+            fields = dict(fields)
+            if "loc" in fields:
+                fields["loc"] = place(fields["loc"])
+            if isinstance(fields.get("exits"), dict):
+                fields["exits"] = {d: place(to)
+                                   for d, to in fields["exits"].items()}
+            out[keys.get(key, key)] = fields
+        return out
+
+    data = dict(data)
+    data["location"] = place(data.get("location"))
+    data["seen"] = [place(room) for room in data.get("seen", ())]
+    data["inv"] = [items.get(key, key) for key in data.get("inv", ())]
+    data["flags"] = {flags.get(name, name): value
+                     for name, value in data.get("flags", {}).items()}
+    data["items"] = records(data.get("items", {}), items)
+    data["npcs"] = records(data.get("npcs", {}), npcs)
+    data["world"] = records(data.get("world", {}), rooms)
+    return data
+
+
+class Checker:
+    """Validates save dicts against the current catalog"""
+
+    def __init__(self):
+        catalog = Game.catalog()
+        self.world = catalog.world
+        self.items = catalog.items
+        self.npcs = catalog.npcs
+        # Places a save may put things: rooms, plus the pseudo-rooms exits
+        # and starting locations use and where used-up items go
+        self.places = set(self.world) | {HELD, NOWHERE, None}
+        self.places.update(to for room in self.world.values()
+                           for to in room.exits.values())
+        self.places.update(r.loc for r in self.items.values())
+        self.places.update(r.loc for r in self.npcs.values())
+        self.game = Game()
+        self.game.history = None
+        self.fresh = self.game.snapshot()
+
+    def problems(self, data):
+        """[(kind, detail)] for everything wrong with a save"""
+        found = []
+        if data.get("location") not in self.world:
+            found.append(("missing location", data.get("location")))
+        for room in data.get("seen", ()):
+            if room not in self.world:
+                found.append(("missing location", room))
+        for key in data.get("inv", ()):
+            if key not in self.items:
+                found.append(("missing item", key))
+        for name, kind, table in (("items", "item", self.items),
+                                  ("npcs", "npc", self.npcs),
+                                  ("world", "location", self.world)):
+            for key, fields in data.get(name, {}).items():
+                if key not in table:
+                    found.append((f"missing {kind}", key))
+                if fields.get("loc") not in self.places:
+                    found.append(("missing location", fields["loc"]))
+                for to in (fields.get("exits") or {}).values():
+                    if to not in self.places:
+                        found.append(("missing location", to))
+        for name in data.get("flags", {}):
+            if name not in FLAG_SCHEMA:
+                found.append(("unknown flag", name))
+        if not found:
+            try:
+                self.game.restore(self.fresh)
+                self.game.load_data(data)
+            except Exception as e:
+                found.append(("doesn't load", f"{type(e).__name__}: {e}"))
+        return found
+
+
+_WORKER = None
+
+
+def _init_worker(layouts, renames):
+    global _WORKER
+    current = Game.save_codec()
+    codecs = {int(id): SaveCodec(Layout.from_json(spec))
+              for id, spec in layouts.items()}
+    codecs[current.layout.id] = current
+    _WORKER = (codecs, current, renames, Checker())
+
+
+def _migrate(rows):
+    """Upgrade and check a batch of (player, slot, stored data) rows;
+    returns (rows to write back, [(player, slot, problems)], counts)"""
+    codecs, current, renames, checker = _WORKER
+    updated, bad = [], []
+    counts = Counter()
+    for player, slot, blob in rows:
+        counts["saves"] += 1
+        try:
+            id = layout_id(blob)
+            codec = current if id is None else codecs.get(id)
+            if codec is None:
+                raise ValueError(f"layout {id} isn't in the store")
+            data = rename(codec.decode(blob), renames)
+        except Exception as e:
+            bad.append((player, slot, [("doesn't decode", str(e))]))
+            counts["broken"] += 1
+            continue
+        problems = checker.problems(data)
+        if problems:
+            bad.append((player, slot, problems))
+            counts["broken"] += 1
+            continue
+        new = current.encode(data)
+        if new != blob:
+            updated.append((player, slot, blob, new, data.get("turn"),
+                            data.get("location")))
+            counts["upgraded"] += 1
+    return updated, bad, counts
+
+
+def migrate(path=SAVES_DB, renames=None, report=None, batch_size=BATCH_SIZE,
+            workers=None, dry_run=False):
+    """Stream every save in the store at path through the workers; returns
+    Counter of saves, upgraded, broken and skipped (saved over meanwhile)"""
+    store = SQLiteSaveStore(path, codec=Game.save_codec())
+    workers = workers or os.cpu_count() or 1
+    totals = Counter()
+    out = open(report, "w", encoding="utf-8") if report else None
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(store.layouts(), renames or {})
+                                 ) as pool:
+            limit = IN_FLIGHT * workers
+            pending = deque()
+
+            def drain(wait_for):
+                while len(pending) > wait_for:
+                    updated, bad, counts = pending.popleft().result()
+                    if updated and not dry_run:
+                        skipped = store.replace_raw(updated)
+                        counts["upgraded"] -= len(skipped)
+                        counts["skipped"] += len(skipped)
+                        bad += [(player, slot, [("saved during migration",
+                                                 "left for the next run")])
+                                for player, slot in skipped]
+                    for player, slot, problems in bad:
+                        if out:
+                            out.write(json.dumps(
+                                {"player": player, "slot": slot,
+                                 "problems": problems},
+                                ensure_ascii=False) + "\n")
+                    totals.update(counts)
+
+            for rows in store.scan(batch_size):
+                pending.append(pool.submit(_migrate, rows))
+                drain(limit)
+            drain(0)
+    finally:
+        if out:
+            out.close()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Upgrade and check every save in a save store")
+    parser.add_argument("--db", default=SAVES_DB)
+    parser.add_argument("--renames", default=None,
+                        help="JSON file of renamed rooms, items, npcs, flags")
+    parser.add_argument("--report", default="migrate_report.jsonl",
+                        help="JSON lines of saves with problems")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="check and report without writing saves back")
+    args = parser.parse_args()
+
+    renames = None
+    if args.renames:
+        with open(args.renames, encoding="utf-8") as f:
+            renames = json.load(f)
+    started = time.perf_counter()
+    totals = migrate(args.db, renames, args.report, args.batch, args.workers,
+                     args.dry_run)
+    print(f"{totals['saves']} saves in {time.perf_counter() - started:.1f}s: "
+          f"{totals['upgraded']} {'to upgrade' if args.dry_run else 'upgraded'}, "
+          f"{totals['broken']} with problems, "
+          f"{totals['skipped']} saved over meanwhile (see {args.report})")
+
+
+if __name__ == "__main__":
+    main()
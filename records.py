@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Records
+Slotted, read-only Room / Item / Npc records for the shared catalog, and the
+per-session views that keep only a player's changes to them.
+"""
+
+from collections.abc import Mapping, MutableMapping
+from types import MappingProxyType
+
+from zobrist import zdelta
+
+
+class _Gone:
+    """Marks a key deleted in an overlay"""
+
+    def __repr__(self):
+        return "<gone>"
+
+    def __reduce__(self):
+        return "_GONE"  # unpickles as the same marker
+
+
+_GONE = _Gone()
+
+
+def freeze(value):
+    """Deep read-only copy: dicts become mapping proxies, lists tuples"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+class Record:
+    """Read-only record with typed, slotted fields.
+
+    Subclasses list ``FIELDS`` as (name, type, default) and the names a
+    session may change in ``MUTABLE``. Values are converted to the field's
+    type when the record is built; containers are frozen.
+    """
+
+    __slots__ = ("key",)
+    FIELDS = ()
+    MUTABLE = frozenset()
+
+    def __init__(self, key, **fields):
+        object.__setattr__(self, "key", key)
+        for name, kind, default in self.FIELDS:
+            value = fields.pop(name, default)
+            if kind is not None and value is not None:
+                value = kind(value)
+            object.__setattr__(self, name, freeze(value))
+        if fields:
+            raise TypeError(
+                f"{type(self).__name__} {key}: unknown fields {sorted(fields)}")
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} records are read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} records are read-only")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.key!r}, {self.name!r})"
+
+
+class Room(Record):
+    FIELDS = (("name", str, ""), ("desc", str, ""), ("exits", dict, {}),
+              ("features", tuple, ()), ("items", tuple, ()),
+              ("npcs", tuple, ()), ("locked", bool, False))
+    __slots__ = tuple(f[0] for f in FIELDS)
+    MUTABLE = frozenset({"exits", "locked"})
+
+
+class Item(Record):
+    FIELDS = (("name", str, ""), ("desc", str, ""), ("loc", str, None),
+              ("portable", bool, True), ("stuck", bool, False),
+              ("hidden", bool, False), ("open", bool, False),
+              ("locked", bool, False), ("count", int, 1),
+              ("combined", bool, False), ("crafted", bool, False),
+              ("aliases", tuple, ()))
+    __slots__ = tuple(f[0] for f in FIELDS)
+    MUTABLE = frozenset({"loc", "stuck", "hidden", "open", "locked", "count"})
+
+
+class Npc(Record):
+    FIELDS = (("name", str, ""), ("desc", str, ""), ("loc", str, None),
+              ("trust", int, 0), ("spoken", bool, False),
+              ("topics", dict, {}), ("aliases", tuple, ()))
+    __slots__ = tuple(f[0] for f in FIELDS)
+    MUTABLE = frozenset({"loc", "trust", "spoken"})
+
+
+class Overlay(MutableMapping):
+    """Copy-on-write view of a frozen mapping.
+
+    Reads fall through to the shared base; writes land in a per-session
+    delta dict, created on first write and registered with the parent via
+    ``parent._changes()[key]``. Writing back the base value drops the change.
+    """
+
+    __slots__ = ("_base", "_delta", "_parent", "_key")
+
+    def __init__(self, base, delta=None, parent=None, key=None):
+        self._base = base
+        self._delta = delta
+        self._parent = parent
+        self._key = key
+
+    def _changes(self):
+        if self._delta is None:
+            self._delta = {}
+            if self._parent is not None:
+                self._parent._changes()[self._key] = self._delta
+        return self._delta
+
+    def _path(self):
+        if self._parent is None:
+            return ()
+        return self._parent._path() + (self._key,)
+
+    def _note(self, old_key, old, new):
+        if self._parent is not None and old != new:
+            base = self._base.get(old_key, _GONE)
+            self._parent._rehash(zdelta(self._path() + (old_key,), old, new, base))
+
+    def _rehash(self, delta):
+        if self._parent is not None:
+            self._parent._rehash(delta)
+
+    def _touch(self):
+        if self._parent is not None:
+            self._parent._touch()
+
+    def __getitem__(self, key):
+        delta = self._delta
+        if delta is not None and key in delta:
+            value = delta[key]
+            if value is _GONE:
+                raise KeyError(key)
+            return value
+        return self._base[key]
+
+    def __setitem__(self, key, value):
+        self._touch()
+        self._note(key, self.get(key, _GONE), value)
+        if key in self._base and self._base[key] == value:
+            if self._delta is not None:
+                self._delta.pop(key, None)
+            return
+        self._changes()[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._touch()
+        self._note(key, self[key], _GONE)
+        if key in self._base:
+            self._changes()[key] = _GONE
+        else:
+            del self._delta[key]
+
+    def __contains__(self, key):
+        delta = self._delta
+        if delta is not None and key in delta:
+            return delta[key] is not _GONE
+        return key in self._base
+
+    def __iter__(self):
+        delta = self._delta or {}
+        for key in self._base:
+            if delta.get(key) is not _GONE:
+                yield key
+        for key in delta:
+            if key not in self._base:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def changes(self):
+        """This session's changes as a plain dict"""
+        return {k: v for k, v in (self._delta or {}).items() if v is not _GONE}
+
+    def apply(self, changes):
+        """Replay changes produced by changes()"""
+        for key, value in changes.items():
+            self[key] = value
+
+    def __repr__(self):
+        return f"Overlay({self.changes()!r})"
+
+
+class View:
+    """A session's view of one record.
+
+    Attribute reads return the session's value if it changed one, otherwise
+    the shared record's. Only ``MUTABLE`` fields can be assigned; mutable
+    mapping fields (a room's exits) come back as Overlays.
+    """
+
+    __slots__ = ("_record", "_table")
+
+    def __init__(self, record, table):
+        object.__setattr__(self, "_record", record)
+        object.__setattr__(self, "_table", table)
+
+    def __getattr__(self, name):
+        record = self._record
+        value = getattr(record, name)
+        if name not in record.MUTABLE:
+            return value
+        delta = self._table._deltas.get(record.key)
+        if isinstance(value, Mapping):
+            return Overlay(value, delta.get(name) if delta else None, self, name)
+        if delta and name in delta:
+            return delta[name]
+        return value
+
+    def __setattr__(self, name, value):
+        record = self._record
+        if name not in record.MUTABLE or isinstance(getattr(record, name), Mapping):
+            raise AttributeError(
+                f"{type(record).__name__}.{name} can't be changed by a session")
+        table = self._table
+        if table.log is not None:
+            table.touch(record.key)
+        base = getattr(record, name)
+        delta = table._deltas.get(record.key)
+        old = delta.get(name, base) if delta else base
+        table.hash ^= zdelta((record.key, name), old, value, base)
+        if base == value:
+            if delta:
+                delta.pop(name, None)
+            return
+        table._deltas.setdefault(record.key, {})[name] = value
+
+    def _changes(self):
+        return self._table._deltas.setdefault(self._record.key, {})
+
+    def _path(self):
+        return (self._record.key,)
+
+    def _rehash(self, delta):
+        self._table.hash ^= delta
+
+    def _touch(self):
+        if self._table.log is not None:
+            self._table.touch(self._record.key)
+
+    @property
+    def record(self):
+        """The shared, read-only record"""
+        return self._record
+
+    def changes(self):
+        """Fields this session changed, as plain values"""
+        out = {}
+        for name, value in self._table._deltas.get(self._record.key, {}).items():
+            if isinstance(value, dict):
+                value = {k: v for k, v in value.items() if v is not _GONE}
+                if not value:
+                    continue
+            out[name] = value
+        return out
+
+    def apply(self, changes):
+        """Replay changes(); fields a session can't change are ignored"""
+        for name, value in changes.items():
+            if name not in self._record.MUTABLE:
+                continue
+            current = getattr(self, name)
+            if isinstance(current, Overlay):
+                current.apply(value)
+            else:
+                setattr(self, name, value)
+
+    def __repr__(self):
+        return f"View({self._record!r}, {self.changes()!r})"
+
+
+class Table(Mapping):
+    """Key -> View for one session over a shared dict of records.
+
+    ``hash`` is a Zobrist hash of every change the session made, kept up to
+    date on each write; an unchanged table hashes to 0. While ``log`` is a
+    dict, the first write to a record saves its changes as they were there,
+    for rewind().
+    """
+
+    __slots__ = ("_records", "_deltas", "hash", "log")
+
+    def __init__(self, records):
+        self._records = records
+        self._deltas = {}
+        self.hash = 0
+        self.log = None
+
+    def __getitem__(self, key):
+        return View(self._records[key], self)
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def snapshot(self):
+        """Immutable copy of this session's changes and hash"""
+        return self.hash, tuple(
+            (key, tuple((name, tuple(value.items()) if isinstance(value, dict)
+                         else value) for name, value in fields.items()))
+            for key, fields in self._deltas.items() if fields)
+
+    def restore(self, token):
+        """Go back to a snapshot() of this table"""
+        self.hash, deltas = token
+        records = self._records
+        self._deltas = {
+            key: {name: dict(value)
+                  if isinstance(getattr(records[key], name), Mapping) else value
+                  for name, value in fields}
+            for key, fields in deltas}
+
+    def touch(self, key):
+        """Log a record's changes before the first write since ``log`` was set"""
+        log = self.log
+        if key not in log:
+            fields = self._deltas.get(key)
+            log[key] = None if fields is None else {
+                name: dict(value) if isinstance(value, dict) else value
+                for name, value in fields.items()}
+
+    def rewind(self, hash, images):
+        """Put back records logged by touch() and the hash from before"""
+        self.hash = hash
+        for key, fields in images:
+            if fields is None:
+                self._deltas.pop(key, None)
+            else:
+                self._deltas[key] = fields
+
+    def changes(self):
+        """Every changed record, as {key: {field: value}}"""
+        out = {}
+        for key in self._deltas:
+            fields = self[key].changes()
+            if fields:
+                out[key] = fields
+        return out
+
+    def apply(self, changes):
+        """Replay changes(); unknown keys are ignored"""
+        for key, fields in changes.items():
+            if key in self._records:
+                self[key].apply(fields)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Noun Resolver
+Maps what the player types ("lens", "tia", "chalk sigil") to item, NPC and
+feature keys through an index built once from the catalog.
+"""
+
+import re
+
+# Kinds of things a noun phrase can name
+ITEM = "item"
+NPC = "npc"
+FEATURE = "feature"
+
+# Match ranks, best first
+EXACT, ALIAS, NGRAM, PREFIX = range(4)
+
+MIN_PREFIX = 3
+
+_SPLIT = re.compile(r"[^\w']+")
+
+
+def words_of(phrase):
+    """Lower-case words of a phrase; hyphens and brackets separate words"""
+    return [w for w in _SPLIT.split(phrase.lower()) if w]
+
+
+class NounResolver:
+    """Index of normalized names, aliases and word n-grams.
+
+    Every phrase maps to a short list of candidates sorted by match rank,
+    then by name length, then by catalog order, so ambiguous input always
+    resolves the same way. Scope checks happen on that short list only.
+    """
+
+    def __init__(self):
+        self._index = {}
+        self._order = 0
+
+    def add(self, kind, key, name, aliases=()):
+        """Index one named thing"""
+        self._order += 1
+        words = words_of(name)
+        size = len(words)
+        self._put(" ".join(words), EXACT, size, kind, key)
+        for alias in aliases:
+            self._put(" ".join(words_of(alias)), ALIAS, size, kind, key)
+        for n in range(1, len(words) + 1):
+            for i in range(len(words) - n + 1):
+                self._put(" ".join(words[i:i + n]), NGRAM, size, kind, key)
+        for word in words:
+            for end in range(MIN_PREFIX, len(word)):
+                self._put(word[:end], PREFIX, size, kind, key)
+
+    def _put(self, phrase, rank, size, kind, key):
+        if not phrase:
+            return
+        entries = self._index.setdefault(phrase, [])
+        for i, entry in enumerate(entries):
+            if entry[3] == kind and entry[4] == key:
+                if entry[0] <= rank:
+                    return
+                del entries[i]
+                break
+        entries.append((rank, size, self._order, kind, key))
+        entries.sort()
+
+    def candidates(self, phrase):
+        """Ranked (kind, key) pairs a phrase could refer to"""
+        phrase = " ".join(words_of(phrase)) if phrase else ""
+        return [(e[3], e[4]) for e in self._index.get(phrase, ())]
+
+    def resolve(self, phrase, *scopes):
+        """First candidate accepted by a scope, trying scopes in order.
+
+        Each scope is a (kind, accept) pair where ``accept(key)`` says whether
+        the thing is reachable right now.
+        """
+        found = self.candidates(phrase)
+        if not found:
+            return None
+        for kind, accept in scopes:
+            for cand_kind, key in found:
+                if cand_kind == kind and accept(key):
+                    return key
+        return None
+
+    @classmethod
+    def build(cls, world, items, npcs):
+        """Index every item, NPC and room feature"""
+        resolver = cls()
+        for key, item in items.items():
+            resolver.add(ITEM, key, item.name, item.aliases)
+        for key, npc in npcs.items():
+            resolver.add(NPC, key, npc.name, npc.aliases)
+        for room in world.values():
+            for feature in room.features:
+                resolver.add(FEATURE, feature, feature.replace("_", " "))
+        return resolver
+
+    def __len__(self):
+        return len(self._index)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Session RNG
+Each game draws from its own seeded generator instead of the module-level
+``random``, so a session's rolls depend only on its seed and what it did,
+and the state can travel with snapshots, saves and journals.
+"""
+
+import os
+import random
+
+
+class SessionRandom(random.Random):
+    """random.Random whose state is (seed, 32-bit words drawn so far).
+
+    Every draw goes through random() or getrandbits(), which count the
+    Mersenne Twister words they consume, so getstate() is two ints instead
+    of the generator's 625-word table and JSON-friendly. setstate() reseeds
+    and discards that many words, which is cheap because the game draws
+    rarely. gauss() keeps a cached second value this state doesn't carry.
+    """
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), "big")
+        super().__init__(seed)
+
+    def seed(self, a=None, version=2):
+        if not isinstance(a, int):
+            raise TypeError("SessionRandom seeds must be ints")
+        super().seed(a, version)
+        self.start = a
+        self.words = 0
+
+    def random(self):
+        self.words += 2
+        return super().random()
+
+    def getrandbits(self, k):
+        self.words += (k + 31) // 32
+        return super().getrandbits(k)
+
+    def getstate(self):
+        return self.start, self.words
+
+    def setstate(self, state):
+        start, words = state
+        if (start, words) == (self.start, self.words):
+            return
+        self.seed(start)
+        draw = super().getrandbits
+        for _ in range(words):
+            draw(32)
+        self.words = words
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Interaction Rules
+Declarative USE / COMBINE / GIVE / INSERT interactions, indexed by
+(verb, item) and then by target token.
+"""
+
+from resolver import words_of
+
+ANY_ITEM = None    # rule applies whatever item is used
+NO_TARGET = None   # USE RADIO (nothing after the item)
+ANY_TARGET = "*"   # with or without a target
+
+
+def target_tokens(target):
+    """Tokens a free-text target can match: its word n-grams, longest first"""
+    if target is None:
+        return [NO_TARGET, ANY_TARGET]
+    words = words_of(target)
+    tokens = []
+    for n in range(len(words), 0, -1):
+        for i in range(len(words) - n + 1):
+            tokens.append(" ".join(words[i:i + n]))
+    tokens.append(ANY_TARGET)
+    return tokens
+
+
+class Rule:
+    """One interaction and the conditions under which it fires.
+
+    ``handler`` is a Game method name (or callable taking the game) called
+    with ``(item_key, target)``. Preconditions: ``location`` (one or more
+    room keys), ``flags`` (name -> required value), ``holding`` (item keys
+    that must be carried), ``npcs`` (NPC keys that must be present) and
+    ``when(game, item_key, target)`` for anything else. If the item and
+    target match but a precondition fails, ``otherwise`` is shown instead of
+    falling through to later rules.
+    """
+
+    def __init__(self, verb, item, handler, targets=(ANY_TARGET,),
+                 location=None, flags=None, holding=(), npcs=(), when=None,
+                 otherwise=None):
+        self.verb = verb
+        self.item = item
+        self.handler = handler
+        self.targets = tuple(targets)
+        if isinstance(location, str):
+            location = (location,)
+        self.location = tuple(location) if location else ()
+        self.flags = dict(flags or {})
+        self.holding = tuple(holding)
+        self.npcs = tuple(npcs)
+        self.when = when
+        self.otherwise = otherwise
+        self.order = 0
+
+    def allowed(self, game, item_key=None, target=None):
+        """Do the preconditions hold in this game"""
+        s = game.s
+        if self.location and s.location not in self.location:
+            return False
+        for name, value in self.flags.items():
+            if s.f.get(name) != value:
+                return False
+        for key in self.holding:
+            if key not in s.inv:
+                return False
+        for key in self.npcs:
+            if not game.present(key):
+                return False
+        if self.when is not None and not self.when(game, item_key, target):
+            return False
+        return True
+
+    def fire(self, game, item_key, target):
+        """Run the handler"""
+        handler = self.handler
+        if isinstance(handler, str):
+            return getattr(game, handler)(item_key, target)
+        return handler(game, item_key, target)
+
+    def __repr__(self):
+        item = self.item or "*"
+        targets = "|".join("-" if t is None else t for t in self.targets)
+        where = f" @{'/'.join(self.location)}" if self.location else ""
+        return f"Rule({self.verb} {item} [{targets}]{where} -> {self.handler})"
+
+
+class RuleRegistry:
+    """Interaction rules keyed by (verb, item) and then target token"""
+
+    def __init__(self):
+        self._index = {}
+        self._rules = []
+
+    def add(self, rule):
+        """Register a rule; earlier rules win ties"""
+        rule.order = len(self._rules)
+        self._rules.append(rule)
+        bucket = self._index.setdefault((rule.verb, rule.item), {})
+        for token in rule.targets:
+            bucket.setdefault(token, []).append(rule)
+        return rule
+
+    def rule(self, verb, item, handler, **kwargs):
+        """Build and register a rule in one call"""
+        return self.add(Rule(verb, item, handler, **kwargs))
+
+    def match(self, game, verb, item_key, target, tokens=None):
+        """Pick the rule for an interaction.
+
+        Returns (rule, None) when a rule fires, (None, message) when a
+        matching rule's preconditions fail and it has an ``otherwise``
+        message, and (None, None) when nothing applies.
+        """
+        if tokens is None:
+            tokens = target_tokens(target)
+        blocked = None
+        for key in (item_key, ANY_ITEM):
+            bucket = self._index.get((verb, key))
+            if not bucket:
+                continue
+            candidates = []
+            for token in tokens:
+                candidates.extend(bucket.get(token, ()))
+            candidates.sort(key=lambda r: r.order)
+            for rule in candidates:
+                if rule.allowed(game, item_key, target):
+                    return rule, None
+                if blocked is None and rule.otherwise:
+                    blocked = rule.otherwise
+            if blocked is not None:
+                return None, blocked
+        return None, None
+
+    def rules(self, verb=None, item=None):
+        """Every registered rule, optionally filtered, in registration order"""
+        return [r for r in self._rules
+                if (verb is None or r.verb == verb)
+                and (item is None or r.item == item)]
+
+    def items(self, verb=None):
+        """Item keys that take part in at least one rule"""
+        return {r.item for r in self.rules(verb) if r.item is not ANY_ITEM}
+
+    def __len__(self):
+        return len(self._rules)
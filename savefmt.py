@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Save Format
+Compact binary encoding of a save (the dict Game.save_data() returns), and
+the upgrades that read older JSON saves into the same dict.
+
+A save is an 11-byte header and a body:
+
+  magic   2 bytes  b"SC"
+  version 1 byte   FORMAT_VERSION
+  layout  4 bytes  which symbol table the body indexes into
+  crc32   4 bytes  of the version, layout and body
+
+Version 1 headers had a 2-byte layout id over the rooms and symbols
+only; they are still read.
+
+The body is the save's fields in FIELDS order, each one value. A value's
+lead byte says what it is:
+
+  0x00-0xBF  the layout symbol with that index (a room, item, NPC, field,
+             flag or exit name)
+  0xC0-0xDF  the int 0-31
+  0xE0-0xE2  None, False, True
+  0xE3-0xE8  a varint follows: int, negative int (-1 - n), symbol index,
+             then string length, list length or dict length, each
+             followed by that many bytes / values / key-value pairs
+  0xF0-0xF7  a list of 0-7 values
+  0xF8-0xFF  a dict of 0-7 key-value pairs
+
+So a moved item is three bytes (item, field, room) and most values are
+one; rooms seen are one bitmask int over the layout's rooms, and flags
+keep only the ones off their default. Saves come to 40-155 bytes, and
+decoding is mostly one table lookup per value.
+
+The layout is built from the content the save describes, so a save can
+only be read with the layout it was written with; the layout id in the
+header catches a mismatch instead of misreading indexes. Stores keep each
+layout they write with (Layout.to_json()), so saves can be upgraded after
+content changes (see migrate.py).
+"""
+
+import json
+import struct
+import zlib
+
+MAGIC = b"SC"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<2sBII")
+HEADERS = {1: struct.Struct("<2sBHI"), FORMAT_VERSION: HEADER}
+
+FIELDS = ("turn", "health", "will", "hunger", "location", "inv", "seen",
+          "flags", "items", "npcs", "world", "rng")
+
+# Lead bytes (see above)
+SMALL_INT = 0xC0
+CONSTANTS = 0xE0  # None, False, True
+INT, NEG, SYMBOL, TEXT, LIST, DICT = range(0xE3, 0xE9)
+SHORT_LIST = 0xF0
+SHORT_DICT = 0xF8
+DIRECT = INT  # lead bytes below this are whole values
+
+
+class SaveFormatError(ValueError):
+    """A save that can't be decoded: corrupt, truncated or another layout"""
+
+
+def _varint(out, n):
+    while n > 0x7F:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+class Layout:
+    """What a save's indexes refer to.
+
+    ``rooms`` orders the rooms-seen bitmask; ``symbols`` are every name a
+    value may be stored as an index of; ``flag_defaults`` are left out of
+    saves. ``base`` is optional (world, items, npcs) as plain dicts of
+    dicts, the starting content that full-state legacy saves are diffed
+    against.
+    """
+
+    def __init__(self, rooms, symbols, flag_defaults, base=None):
+        self.rooms = tuple(sorted(rooms))
+        self.room_bit = {room: 1 << i for i, room in enumerate(self.rooms)}
+        self.symbols = tuple(sorted(set(symbols) | set(self.rooms)))
+        self.index = {name: i for i, name in enumerate(self.symbols)}
+        self.flag_defaults = dict(flag_defaults)
+        self.base = base
+        # Over everything the layout stores, so any change is a new id
+        self.id = zlib.crc32(self.to_json().encode("utf-8"))
+        # What version 1 headers held
+        text = "\n".join(self.rooms) + "\0" + "\n".join(self.symbols)
+        self.legacy_id = zlib.crc32(text.encode("utf-8")) & 0xFFFF
+
+    @classmethod
+    def from_content(cls, world, items, npcs, fields, flag_defaults,
+                     extra=(), base=None):
+        """Layout over rooms, items and NPCs keyed by name, with ``fields``
+        the record field names saves may hold; exit directions and targets
+        and string flag values become symbols too"""
+        symbols = set(world) | set(items) | set(npcs) | set(fields)
+        symbols.update(flag_defaults)
+        symbols.update(extra)
+        for room in world.values():
+            exits = room["exits"] if isinstance(room, dict) else room.exits
+            symbols.update(exits)
+            symbols.update(v for v in exits.values() if isinstance(v, str))
+        return cls(world, symbols, flag_defaults, base)
+
+    def to_json(self):
+        """The layout as JSON text, for from_json() to rebuild"""
+        return json.dumps({"rooms": self.rooms, "symbols": self.symbols,
+                           "flag_defaults": self.flag_defaults},
+                          ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text):
+        spec = json.loads(text)
+        return cls(spec["rooms"], spec["symbols"], spec["flag_defaults"])
+
+
+def layout_id(blob):
+    """The layout id in a binary save's header, or None for a JSON save;
+    version 1 saves give the 16-bit id they were written with"""
+    if isinstance(blob, str) or blob[:2] != MAGIC or len(blob) < 3:
+        return None
+    header = HEADERS.get(blob[2])
+    if header is None or len(blob) < header.size:
+        return None
+    return header.unpack_from(blob)[2]
+
+
+class SaveCodec:
+    """encode()/decode() between save dicts and bytes for one Layout"""
+
+    def __init__(self, layout):
+        self.layout = layout
+        # What each lead byte below DIRECT decodes to
+        symbols = layout.symbols[:SMALL_INT]
+        self.direct = (symbols + (None,) * (SMALL_INT - len(symbols))
+                       + tuple(range(32)) + (None, False, True))
+
+    # ---------- Writing ----------
+
+    def encode(self, data):
+        layout = self.layout
+        data = dict(data)
+        data["seen"] = self._seen_mask(data.get("seen", ()))
+        data["flags"] = _changed_flags(data.get("flags"), layout)
+        body = bytearray()
+        for name in FIELDS:
+            self._write(body, data.get(name))
+        prefix = bytes((FORMAT_VERSION,)) + struct.pack("<I", layout.id)
+        crc = zlib.crc32(body, zlib.crc32(prefix))
+        return HEADER.pack(MAGIC, FORMAT_VERSION, layout.id, crc) + bytes(body)
+
+    def _seen_mask(self, seen):
+        bits = self.layout.room_bit
+        mask = 0
+        for room in seen:
+            mask |= bits.get(room, 0)
+        return mask
+
+    def _write(self, out, value):
+        if value is None or value is False or value is True:
+            out.append(CONSTANTS + (0 if value is None else 1 + value))
+        elif isinstance(value, int):
+            if 0 <= value < 32:
+                out.append(SMALL_INT + value)
+            elif value >= 0:
+                out.append(INT)
+                _varint(out, value)
+            else:
+                out.append(NEG)
+                _varint(out, -value - 1)
+        elif isinstance(value, str):
+            index = self.layout.index.get(value)
+            if index is None:
+                raw = value.encode("utf-8")
+                out.append(TEXT)
+                _varint(out, len(raw))
+                out += raw
+            elif index < SMALL_INT:
+                out.append(index)
+            else:
+                out.append(SYMBOL)
+                _varint(out, index)
+        elif isinstance(value, (list, tuple)):
+            if len(value) < 8:
+                out.append(SHORT_LIST + len(value))
+            else:
+                out.append(LIST)
+                _varint(out, len(value))
+            for item in value:
+                self._write(out, item)
+        elif isinstance(value, dict):
+            if len(value) < 8:
+                out.append(SHORT_DICT + len(value))
+            else:
+                out.append(DICT)
+                _varint(out, len(value))
+            for key, item in value.items():
+                self._write(out, key)
+                self._write(out, item)
+        else:
+            raise SaveFormatError(
+                f"can't store {type(value).__name__} values in a save")
+
+    # ---------- Reading ----------
+
+    def decode(self, blob):
+        """The save dict in blob: this format, or an older JSON save"""
+        if isinstance(blob, str) or blob[:1] == b"{":
+            return upgrade(json.loads(blob), self.layout)
+        if len(blob) < 3:
+            raise SaveFormatError("save is truncated")
+        if blob[:2] != MAGIC:
+            raise SaveFormatError("not a save")
+        header = HEADERS.get(blob[2])
+        if header is None:
+            raise SaveFormatError(f"save format {blob[2]} isn't supported")
+        if len(blob) < header.size:
+            raise SaveFormatError("save is truncated")
+        _, version, layout_id, crc = header.unpack_from(blob)
+        start = header.size
+        if zlib.crc32(blob[start:], zlib.crc32(blob[2:start - 4])) != crc:
+            raise SaveFormatError("save is corrupt (checksum mismatch)")
+        expected = self.layout.id if version == FORMAT_VERSION \
+            else self.layout.legacy_id
+        if layout_id != expected:
+            raise SaveFormatError("save was written for different content")
+        try:
+            values, pos = self._read_list(blob, start, len(FIELDS))
+        except (IndexError, TypeError, UnicodeDecodeError):
+            raise SaveFormatError("save is truncated") from None
+        if pos != len(blob):
+            raise SaveFormatError("save has trailing bytes")
+        data = {name: value for name, value in zip(FIELDS, values)
+                if value is not None}
+        rooms = self.layout.rooms
+        mask = data.get("seen", 0)
+        data["seen"] = [room for i, room in enumerate(rooms) if mask >> i & 1]
+        return data
+
+    def _read_list(self, buf, pos, count):
+        direct = self.direct
+        out = []
+        append = out.append
+        for _ in range(count):
+            lead = buf[pos]
+            pos += 1
+            if lead < DIRECT:
+                append(direct[lead])
+                continue
+            if lead >= SHORT_LIST:
+                n = lead & 7
+            else:
+                n = shift = 0
+                while True:
+                    byte = buf[pos]
+                    pos += 1
+                    n |= (byte & 0x7F) << shift
+                    shift += 7
+                    if byte < 0x80:
+                        break
+            if lead == INT:
+                append(n)
+            elif lead == LIST or SHORT_LIST <= lead < SHORT_DICT:
+                value, pos = self._read_list(buf, pos, n)
+                append(value)
+            elif lead == DICT or lead >= SHORT_DICT:
+                pairs, pos = self._read_list(buf, pos, 2 * n)
+                append(dict(zip(pairs[::2], pairs[1::2])))
+            elif lead == SYMBOL:
+                append(self.layout.symbols[n])
+            elif lead == NEG:
+                append(-n - 1)
+            elif lead == TEXT:
+                append(buf[pos:pos + n].decode("utf-8"))
+                pos += n
+            else:
+                raise SaveFormatError(f"bad lead byte {lead:#x}")
+        return out, pos
+
+
+def _changed_flags(flags, layout):
+    defaults = layout.flag_defaults
+    return {name: value for name, value in (flags or {}).items()
+            if name not in defaults or value != defaults[name]}
+
+
+# ---------- Older saves ----------
+
+def diff_records(base, current):
+    """{key: {field: value}} for every field of current's records that
+    differs from base; mapping fields (a room's exits) keep only the
+    entries that changed"""
+    out = {}
+    for key, record in current.items():
+        start = base.get(key, {})
+        fields = {}
+        for name, value in record.items():
+            old = start.get(name)
+            if value == old:
+                continue
+            if isinstance(value, dict) and isinstance(old, dict):
+                value = {k: v for k, v in value.items() if old.get(k) != v}
+            fields[name] = value
+        if fields:
+            out[key] = fields
+    return out
+
+
+def upgrade(data, layout):
+    """Bring a JSON save of any earlier generation up to the current dict:
+
+      main.py's shadow_circuit_save.json: {"state", "items", "world", "rng"}
+          with every record in full; diffed against layout.base
+      game_engine's savegame.json: every flag, no NPC changes
+      save store rows from before this format: already current
+    """
+    if "state" in data:
+        if layout.base is None:
+            raise SaveFormatError("full-state saves need the layout's base")
+        world, items, npcs = layout.base
+        state = data["state"]
+        data = dict({name: state[name] for name in FIELDS[:7] if name in state},
+                    flags=state.get("f"),
+                    items=diff_records(items, data.get("items", {})),
+                    npcs=diff_records(npcs, data.get("npcs", {})),
+                    world=diff_records(world, data.get("world", {})),
+                    rng=data.get("rng"))
+    data = dict(data)
+    data["flags"] = _changed_flags(data.get("flags"), layout)
+    for name in ("items", "npcs", "world"):
+        data.setdefault(name, {})
+    return data
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Save Store
+Named save slots per player behind a small backend interface. SQLite is the
+default: one WAL-mode database per host, reached through a per-process pool
+of connections, with saves keyed by (player, slot) on a clustered primary
+key so SAVE, LOAD and SAVES are each one B-tree probe or prefix scan.
+
+A save holds only what a session changed from the shared catalog (see
+Game.save_data()), so it stays small however big the world gets. Stores
+take and return those dicts; a codec turns them into what is stored,
+compact JSON unless the store is given another (the game uses the binary
+savefmt.SaveCodec, which also reads the JSON rows).
+"""
+
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+SAVES_DB = os.environ.get(
+    "SHADOW_CIRCUIT_SAVES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                 "shadow_circuit_saves.db"))
+POOL_SIZE = 8
+
+SLOT_NAME = re.compile(r"[a-z0-9_-]{1,32}")
+
+# One row of SAVES: slot name, turn, location and when it was written
+SlotInfo = namedtuple("SlotInfo", ["slot", "turn", "location", "saved_at"])
+
+
+def valid_slot(slot):
+    return bool(SLOT_NAME.fullmatch(slot))
+
+
+class JsonCodec:
+    """Save dicts as compact JSON text"""
+
+    def encode(self, data):
+        return json.dumps(data, separators=(",", ":"))
+
+    def decode(self, blob):
+        return json.loads(blob)
+
+
+JSON_CODEC = JsonCodec()
+
+
+class SaveStore:
+    """Backend interface: save data dicts by (player, slot)"""
+
+    def save(self, player, slot, data):
+        raise NotImplementedError
+
+    def load(self, player, slot):
+        """The data saved in a slot, or None"""
+        raise NotImplementedError
+
+    def slots(self, player):
+        """SlotInfo for each of a player's saves, by slot name"""
+        raise NotImplementedError
+
+    def delete(self, player, slot):
+        raise NotImplementedError
+
+
+class MemorySaveStore(SaveStore):
+    """Saves in a dict; for tests and throwaway servers"""
+
+    def __init__(self, codec=None):
+        self.codec = codec or JSON_CODEC
+        self.rows = {}
+        self.lock = threading.Lock()
+
+    def save(self, player, slot, data):
+        info = SlotInfo(slot, data.get("turn"), data.get("location"),
+                        time.time())
+        with self.lock:
+            self.rows[(player, slot)] = (info, self.codec.encode(data))
+
+    def load(self, player, slot):
+        row = self.rows.get((player, slot))
+        return self.codec.decode(row[1]) if row else None
+
+    def slots(self, player):
+        with self.lock:
+            return sorted(info for (who, _), (info, _) in self.rows.items()
+                          if who == player)
+
+    def delete(self, player, slot):
+        with self.lock:
+            self.rows.pop((player, slot), None)
+
+
+class ConnectionPool:
+    """Up to ``size`` SQLite connections shared by a process's threads"""
+
+    def __init__(self, path, size=POOL_SIZE, setup=None):
+        self.path = path
+        self.setup = setup
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.pid = os.getpid()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        if self.setup:
+            self.setup(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        self.slots.acquire()
+        try:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            self.idle.put(conn)
+        finally:
+            self.slots.release()
+
+
+class SQLiteSaveStore(SaveStore):
+    """Saves in a WAL-mode SQLite database"""
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, path=SAVES_DB, pool_size=POOL_SIZE, codec=None):
+        self.path = path
+        self.pool_size = pool_size
+        self.codec = codec or JSON_CODEC
+        # Whether the codec's layout (if it has one) is in the layouts table
+        self.registered = getattr(self.codec, "layout", None) is None
+
+    @staticmethod
+    def _create(conn):
+        conn.execute("CREATE TABLE IF NOT EXISTS saves ("
+                     "player TEXT NOT NULL, slot TEXT NOT NULL, "
+                     "turn INTEGER, location TEXT, saved_at REAL NOT NULL, "
+                     "data BLOB NOT NULL, PRIMARY KEY (player, slot)) "
+                     "WITHOUT ROWID")
+        # Every layout a binary codec has written with, so saves stay
+        # readable after the content changes
+        conn.execute("CREATE TABLE IF NOT EXISTS layouts ("
+                     "id INTEGER PRIMARY KEY, spec TEXT NOT NULL)")
+
+    @property
+    def pool(self):
+        """This process's pool for the database; a forked child makes its own"""
+        key = (self.path, os.getpid())
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    pool = ConnectionPool(self.path, self.pool_size,
+                                          self._create)
+                    self._pools[key] = pool
+        return pool
+
+    def save(self, player, slot, data):
+        with self.pool.connection() as conn:
+            if not self.registered:
+                self._register(conn, self.codec.layout)
+                self.registered = True
+            conn.execute(
+                "INSERT OR REPLACE INTO saves VALUES (?, ?, ?, ?, ?, ?)",
+                (player, slot, data.get("turn"), data.get("location"),
+                 time.time(), self.codec.encode(data)))
+
+    @staticmethod
+    def _register(conn, layout):
+        """Add a layout to the layouts table; ValueError if a different
+        one already has its id, since saves written with either would be
+        read with the other"""
+        spec = layout.to_json()
+        conn.execute("INSERT OR IGNORE INTO layouts VALUES (?, ?)",
+                     (layout.id, spec))
+        stored, = conn.execute("SELECT spec FROM layouts WHERE id = ?",
+                               (layout.id,)).fetchone()
+        if stored != spec:
+            raise ValueError(f"layout id {layout.id} is already used by "
+                             "different content")
+
+    def load(self, player, slot):
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT data FROM saves WHERE player = ? AND slot = ?",
+                (player, slot)).fetchone()
+        return self.codec.decode(row[0]) if row else None
+
+    def slots(self, player):
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT slot, turn, location, saved_at FROM saves "
+                "WHERE player = ? ORDER BY slot", (player,)).fetchall()
+        return [SlotInfo(*row) for row in rows]
+
+    def delete(self, player, slot):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM saves WHERE player = ? AND slot = ?",
+                         (player, slot))
+
+    # ---------- Bulk access, for migrate.py ----------
+
+    def layouts(self):
+        """{layout id: Layout.to_json() text} for every layout saves used"""
+        with self.pool.connection() as conn:
+            return dict(conn.execute("SELECT id, spec FROM layouts"))
+
+    def scan(self, batch_size=1000):
+        """Every save as lists of up to batch_size (player, slot, stored
+        data) rows in key order; each batch is one primary-key range read,
+        so memory stays at a batch however many saves there are"""
+        after = ("", "")
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute(
+                    "SELECT player, slot, data FROM saves "
+                    "WHERE (player, slot) > (?, ?) ORDER BY player, slot "
+                    "LIMIT ?", (*after, batch_size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            after = rows[-1][:2]
+
+    def replace_raw(self, rows):
+        """Overwrite stored data with (player, slot, old data, data, turn,
+        location) rows in one transaction, each only if the slot still
+        holds the old data; returns the (player, slot) pairs skipped
+        because it didn't (saved over since it was read)"""
+        layout = getattr(self.codec, "layout", None)
+        skipped = []
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if layout is not None:
+                    self._register(conn, layout)
+                for player, slot, old, data, turn, location in rows:
+                    cur = conn.execute(
+                        "UPDATE saves SET data = ?, turn = ?, location = ? "
+                        "WHERE player = ? AND slot = ? AND data = ?",
+                        (data, turn, location, player, slot, old))
+                    if cur.rowcount == 0:
+                        skipped.append((player, slot))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return skipped
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Line Server
+Hosts many games in one process over a plain-text TCP line protocol, MUD
+style, so telnet or netcat is a client:
+
+  python server.py [--host H] [--port N] [--max-connections N]
+                   [--idle-timeout SECONDS]
+
+Each connection gets its own Game. A line in is one command; the reply is
+the command's output followed by a "> " prompt. QUIT ends the connection
+and a finished game starts a new night.
+
+Saves belong to a player id. A connection starts with a fresh one, shown
+in the welcome; sending PLAYER <id> (8-64 hex digits, the same ids app.py
+keeps in ?session=) switches to it, so a client that reconnects can LOAD
+what it saved before.
+
+Everything runs on one asyncio event loop: commands take well under a
+millisecond, so they run inline between reads. Verbs marked blocking (SAVE,
+LOAD, SAVES, HINT wait on the save store or the hint database) run in the
+loop's thread pool instead; a connection reads its next line only after its
+command finishes, so one game never runs two commands at once. Each connection's read
+buffer is capped at MAX_LINE bytes (longer lines are refused). Replies go
+through the transport's write buffer, and a connection whose buffer
+passes WRITE_HIGH stops being read until the client catches up. Silent
+connections are closed after the idle timeout, and connections over the
+cap are turned away.
+"""
+
+import argparse
+import asyncio
+import re
+import time
+import uuid
+
+from game_engine import Game
+from journal import SESSION_ID
+
+HOST = "127.0.0.1"
+PORT = 4040
+MAX_CONNECTIONS = 20000
+IDLE_TIMEOUT = 600.0  # seconds
+MAX_LINE = 1024       # bytes a command may take
+WRITE_HIGH = 64 * 1024
+WRITE_LOW = 16 * 1024
+
+WELCOME = ("Welcome to Shadow Circuit: A Night in Austin.\r\n"
+           "You are MARLOWE CROSS, a newly-turned vampire detective. "
+           "Type HELP for commands.\r\n"
+           "Your player id is {player}; send PLAYER <id> when you "
+           "reconnect to reach your saves.\r\n\r\n")
+PROMPT = "\r\n> "
+# Telnet commands (IAC ...) a client may send before or inside a line
+TELNET = re.compile(rb"\xff[\xfb-\xfe].|\xff[\xf0-\xfa]", re.DOTALL)
+
+
+def _raise_fd_limit():
+    """Let the process hold as many sockets as the hard limit allows"""
+    try:
+        import resource
+    except ImportError:  # not on Windows
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def _wire(text):
+    """Output text as CRLF-terminated lines for the socket"""
+    return text.replace("\r\n", "\n").replace("\n", "\r\n")
+
+
+class GameServer:
+    """Accepts connections and runs one Game per connection"""
+
+    def __init__(self, host=HOST, port=PORT, max_connections=MAX_CONNECTIONS,
+                 idle_timeout=IDLE_TIMEOUT, game_factory=Game):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.game_factory = game_factory
+        self.connections = 0
+        self.commands = 0
+        self.refused = 0
+        self.timed_out = 0
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self._serve, self.host, self.port, limit=MAX_LINE,
+            backlog=4096)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+
+    def new_game(self, player=None):
+        """A Game saving as player, or as a new player id"""
+        game = self.game_factory()
+        game.player = player or uuid.uuid4().hex
+        return game
+
+    @staticmethod
+    def _switch_player(game, player):
+        """Reply to PLAYER <id>"""
+        player = player.lower()
+        if not SESSION_ID.fullmatch(player):
+            return "Player ids are 8 to 64 hex digits."
+        game.player = player
+        game.queued.clear()  # the old id's writes aren't this one's
+        return f"Playing as {player}. LOAD and SAVES now use its slots."
+
+    async def _serve(self, reader, writer):
+        if self.connections >= self.max_connections:
+            self.refused += 1
+            writer.write(b"The city is full tonight. Try again later.\r\n")
+            writer.close()
+            return
+        self.connections += 1
+        writer.transport.set_write_buffer_limits(WRITE_HIGH, WRITE_LOW)
+        try:
+            await self._session(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _session(self, reader, writer):
+        game = self.new_game()
+        writer.write((WELCOME.format(player=game.player)
+                      + _wire(game.look_around()) + PROMPT)
+                     .encode("utf-8"))
+        while True:
+            try:
+                line = await asyncio.wait_for(reader.readline(),
+                                              self.idle_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                writer.write(b"\r\nThe night moves on without you.\r\n")
+                return
+            except (asyncio.LimitOverrunError, ValueError):
+                writer.write(b"\r\nThat's too long to say.\r\n")
+                return
+            if not line:
+                return  # client closed
+            if b"\xff" in line:
+                line = TELNET.sub(b"", line)
+            command = line.decode("utf-8", "replace").strip()
+            if not command.isprintable():
+                command = "".join(c for c in command if c.isprintable())
+            self.commands += 1
+            words = command.lower().split()
+            if words[:1] == ["player"]:
+                reply = self._switch_player(game, " ".join(words[1:]))
+                writer.write((reply + PROMPT).encode("utf-8"))
+                await writer.drain()
+                continue
+            verb, _ = game.verbs.lookup(words)
+            if verb is not None and verb.blocking:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    None, game.process_command, command)
+            else:
+                result = game.process_command(command)
+            if result == "QUIT":
+                writer.write((_wire(game.get_output()) + "\r\n")
+                             .encode("utf-8"))
+                await writer.drain()
+                return
+            if result == "GAME_OVER":
+                ended = _wire(game.get_output())
+                game = self.new_game(game.player)
+                reply = (f"{ended}\r\n*** GAME OVER ***\r\n"
+                         f"\r\nA new night begins.\r\n\r\n"
+                         f"{_wire(game.look_around())}")
+            else:
+                reply = _wire(result)
+            writer.write((reply + PROMPT).encode("utf-8"))
+            # Backpressure: past WRITE_HIGH this waits, and the client's
+            # next command isn't read, until the buffer is down to WRITE_LOW
+            await writer.drain()
+
+
+async def _report(server, every=10.0):
+    last, then = 0, time.perf_counter()
+    while True:
+        await asyncio.sleep(every)
+        now = time.perf_counter()
+        rate = (server.commands - last) / (now - then)
+        last, then = server.commands, now
+        print(f"{server.connections} connections, {rate:.0f} commands/s, "
+              f"{server.refused} refused, {server.timed_out} timed out",
+              flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve Shadow Circuit over a TCP line protocol")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-connections", type=int,
+                        default=MAX_CONNECTIONS)
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help="seconds before a silent connection is closed")
+    parser.add_argument("--quiet", action="store_true",
+                        help="don't print a status line every 10s")
+    args = parser.parse_args()
+
+    _raise_fd_limit()
+    server = GameServer(args.host, args.port, args.max_connections,
+                        args.idle_timeout)
+
+    async def run():
+        await server.start()
+        print(f"Listening on {server.host}:{server.port}", flush=True)
+        if not args.quiet:
+            asyncio.ensure_future(_report(server))
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
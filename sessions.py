@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Session Pool
+Keeps the sessions players are using in memory and spills the rest to a
+store, so a server's resident memory follows its active players rather
+than everyone who ever opened a tab.
+
+A Session is one player's Game plus what the front end shows for it (a
+bounded Transcript and the last few commands) and its journal. SessionManager holds hot
+sessions in an LRU under a memory budget. Use a session inside
+``with manager.session(id) as session:``; while it's checked out it can't
+be evicted. When the estimated size of the hot sessions passes the budget,
+the least recently used are serialized (Game.snapshot() and the
+transcript, pickled) into the store and dropped. The next checkout of a
+spilled session rehydrates it. Undo history isn't spilled, so UNDO can't
+reach back past an eviction. A journaled session keeps logging after it
+comes back, so the spill can fall behind its journal if the server
+restarts before the next spill; rehydrating then recovers from the
+journal instead.
+
+Stores are byte key-value maps (get, put, delete). MemorySessionStore is
+for tests; FileSessionStore writes one file per session. A Redis or
+memcached store only has to map those three calls onto GET, SET and DEL.
+"""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from autosave import atomic_write
+from game_engine import Game, Snapshot
+from journal import JOURNAL_DIR, Journal, SESSION_ID, recover
+from transcript import Transcript
+
+SESSION_DIR = os.environ.get(
+    "SHADOW_CIRCUIT_SESSIONS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions"))
+MEMORY_BUDGET = 64 * 1024 * 1024  # bytes of hot sessions
+# Rough resident size of a Game with a full undo ring; the transcript is
+# counted on top by its length
+GAME_BYTES = 32 * 1024
+COMMANDS_KEPT = 50
+SPILL_VERSION = 2  # 1 held the transcript as a plain list
+
+
+class SessionStore:
+    """Backend interface: spilled sessions as bytes by session id"""
+
+    def get(self, session_id):
+        """The bytes put for a session, or None"""
+        raise NotImplementedError
+
+    def put(self, session_id, data):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Spilled sessions in a dict; for tests"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, session_id):
+        return self.data.get(session_id)
+
+    def put(self, session_id, data):
+        self.data[session_id] = data
+
+    def delete(self, session_id):
+        self.data.pop(session_id, None)
+
+
+class FileSessionStore(SessionStore):
+    """One file per spilled session in a local directory"""
+
+    def __init__(self, directory=SESSION_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def _path(self, session_id):
+        if not SESSION_ID.fullmatch(session_id or ""):
+            raise ValueError(f"bad session id {session_id!r}")
+        return os.path.join(self.directory, session_id + ".session")
+
+    def get(self, session_id):
+        try:
+            with open(self._path(session_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, session_id, data):
+        atomic_write(self._path(session_id), data)
+
+    def delete(self, session_id):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+
+class Session:
+    """One player's game, transcript, recent commands and journal"""
+
+    def __init__(self, session_id, game, output=(), commands=(),
+                 journal=None):
+        self.id = session_id
+        self.game = game
+        self.output = output if isinstance(output, Transcript) \
+            else Transcript(output)
+        self.commands = deque(commands, maxlen=COMMANDS_KEPT)
+        self.journal = journal
+        # Held while checked out, so commands and spilling take turns
+        self.lock = threading.Lock()
+        self.pins = 0
+        self.used = time.monotonic()
+        self.accounted = 0  # size() as last added to the manager's total
+
+    def size(self):
+        """Estimated bytes this session keeps resident"""
+        return (GAME_BYTES + self.output.size()
+                + sum(len(cmd) for cmd in self.commands))
+
+    def add_command(self, command):
+        self.commands.append(command)
+
+    def run(self, command):
+        """Run a command through the journal if there is one"""
+        if self.journal is not None:
+            return self.journal.process(self.game, command)
+        return self.game.process_command(command)
+
+    def dump(self):
+        game = self.game
+        seq = self.journal.seq if self.journal is not None else None
+        return pickle.dumps(
+            (SPILL_VERSION, game.player, tuple(game.snapshot()),
+             self.output, list(self.commands), seq),
+            protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, session_id, data, game_factory=Game,
+             journal_dir=JOURNAL_DIR):
+        version, player, token, output, commands, seq = pickle.loads(data)
+        if version not in (1, SPILL_VERSION):
+            raise ValueError(f"spilled session version {version} "
+                             "isn't supported")
+        game = game_factory()
+        game.restore(Snapshot(*token))
+        journal, behind = None, False
+        if seq is not None:
+            # Commands logged after the spill mean it's stale
+            try:
+                restored = recover(session_id, journal_dir, game_factory)
+            except ValueError:
+                restored = None
+            if restored is not None and restored[1] > seq:
+                game, seq = restored
+                behind = True
+            journal = Journal(session_id, journal_dir, seq=seq)
+        game.player = player
+        session = cls(session_id, game, output, commands, journal)
+        if behind:
+            session.output.append("*Your night picks up where it left off.*")
+            session.output.append(game.look_around())
+        return session
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+
+class SessionManager:
+    """LRU of hot sessions under a memory budget, spilling to a store.
+
+    ``create(session_id)`` makes a Session for an id the store has never
+    seen; the default starts a new Game. Spilled sessions with a journal
+    reopen it in journal_dir.
+    """
+
+    def __init__(self, store, budget=MEMORY_BUDGET, create=None,
+                 game_factory=Game, journal_dir=JOURNAL_DIR):
+        self.store = store
+        self.budget = budget
+        self.journal_dir = journal_dir
+        self.create = create or (
+            lambda session_id: Session(session_id,
+                                       game_factory(player=session_id)))
+        self.game_factory = game_factory
+        self.hot = OrderedDict()
+        self.spilling = {}
+        self.resident = 0
+        self.lock = threading.Lock()
+        self.spills = 0
+        self.rehydrations = 0
+
+    def __len__(self):
+        return len(self.hot)
+
+    @contextmanager
+    def session(self, session_id):
+        """Check a session out for the length of the with block"""
+        session = self._checkout(session_id)
+        try:
+            with session.lock:
+                yield session
+        finally:
+            self._checkin(session)
+
+    def _checkout(self, session_id):
+        with self.lock:
+            session = self.hot.get(session_id)
+            if session is None:
+                # Being written out right now: take it straight back
+                session = self.spilling.get(session_id)
+                if session is not None:
+                    self._admit(session)
+            if session is not None:
+                self.hot.move_to_end(session_id)
+                session.pins += 1
+                return session
+        data = self.store.get(session_id)
+        if data is not None:
+            loaded = Session.load(session_id, data, self.game_factory,
+                                  self.journal_dir)
+            self.rehydrations += 1
+        else:
+            loaded = self.create(session_id)
+        with self.lock:
+            session = self.hot.get(session_id) or self.spilling.get(session_id)
+            if session is None:
+                session = loaded
+                loaded = None
+            if session.id not in self.hot:
+                self._admit(session)
+            self.hot.move_to_end(session_id)
+            session.pins += 1
+        if loaded is not None:  # another thread got there first
+            loaded.close()
+        return session
+
+    def _admit(self, session):
+        self.spilling.pop(session.id, None)
+        self.hot[session.id] = session
+        session.accounted = session.size()
+        self.resident += session.accounted
+
+    def _checkin(self, session):
+        with self.lock:
+            session.pins -= 1
+            session.used = time.monotonic()
+            if self.hot.get(session.id) is session:
+                size = session.size()
+                self.resident += size - session.accounted
+                session.accounted = size
+            victims = self._over_budget()
+        self._spill(victims)
+
+    def _over_budget(self):
+        """Take the least recently used unpinned sessions out of the LRU
+        until the rest fit the budget"""
+        victims = []
+        if self.resident <= self.budget:
+            return victims
+        for session in list(self.hot.values()):
+            if self.resident <= self.budget:
+                break
+            if session.pins:
+                continue
+            victims.append(self._take(session))
+        return victims
+
+    def _take(self, session):
+        del self.hot[session.id]
+        self.resident -= session.accounted
+        self.spilling[session.id] = session
+        return session
+
+    def _spill(self, victims):
+        for session in victims:
+            with session.lock:
+                data = session.dump()
+            self.store.put(session.id, data)
+            with self.lock:
+                if self.spilling.get(session.id) is not session:
+                    continue  # checked out again while it was written
+                del self.spilling[session.id]
+                self.spills += 1
+            session.close()
+
+    def evict_idle(self, seconds):
+        """Spill every session unused for at least seconds"""
+        cutoff = time.monotonic() - seconds
+        with self.lock:
+            victims = [self._take(s) for s in list(self.hot.values())
+                       if not s.pins and s.used <= cutoff]
+        self._spill(victims)
+        return len(victims)
+
+    def flush(self):
+        """Spill every session that isn't checked out"""
+        return self.evict_idle(float("-inf"))
+
+    def discard(self, session_id):
+        """Forget a session, hot or spilled"""
+        with self.lock:
+            session = self.hot.pop(session_id, None)
+            if session is not None:
+                self.resident -= session.accounted
+                session.close()
+        self.store.delete(session_id)
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Solver
+Treats Game as a transition system and searches it for the shortest line to
+every ending: breadth-first by turns (exhaustive, so endings it never finds
+are proven out of reach before dawn) or A* toward one ending. States are
+deduplicated in a transposition table keyed on Game.state_hash().
+
+  python solver.py [--astar] [--max-turns N]
+
+Only relevant actions are tried in each state (see ActionIndex): moves along
+the room's exits, interaction rules whose preconditions hold, the story
+commands of that room. An action that needs items the player lacks is
+tried as one step that takes them and then acts, so items are picked up
+when they're about to be used rather than in every order and room.
+Commands left out (TALK, READ, BITE, MESMERIZE, DROP, the senses...) only
+change flags and vitals that no rule or exit reads, so they can't make an
+ending reachable sooner.
+
+The lines are shortest under the engine as it stands, quirks included:
+the dynamic items (fishing gear, counter-ink, the sigil tokens) start in
+the inventory, and TAKE of a known item that's out of sight recovers it
+from anywhere (Game.recover_lost_item). A line may use a token it never
+picked up or take an item in another room, so these are lower bounds on
+the engine, not walkthroughs for a player. Fixing those behaviours changes
+every result.
+"""
+
+import argparse
+import heapq
+from collections import deque, namedtuple
+
+from game_engine import Game, FLAG_SCHEMA
+from resolver import words_of
+from rules import ANY_TARGET, NO_TARGET
+
+# Hard-coded commands the search may need: (command, room or None, items it
+# requires, items it reads but can do without)
+STORY_COMMANDS = (
+    ("trace sigil", "L01", (), ("NOTE_SCRAP", "SIGIL_MANUAL")),
+    ("enter code 1207", "L05", (), ()),
+    ("push crate", "L01", (), ()),
+    ("tune antenna", "L12", (), ()),
+    ("examine lens array", "L09", (), ()),
+    ("craft counter-ink", None, ("GARLIC", "ROSEMARY", "HEMATITE"), ()),
+    ("open brass locket", None, ("BRASS_LOCKET",), ()),
+)
+
+# Rule handlers that end the game, for the A* heuristic
+ENDING_HANDLERS = {
+    "redemption": "confront_redemption",
+    "containment": "confront_containment",
+    "obliteration": "confront_obliteration",
+}
+
+Line = namedtuple("Line", ["ending", "turns", "commands"])
+
+
+def phrase(name):
+    return " ".join(words_of(name))
+
+
+class ActionIndex:
+    """Relevant commands for a game state, precomputed per room and rule.
+
+    Rule commands are rendered once; ``actions(game)`` only checks which
+    rules' preconditions hold and which items the player is missing. Each
+    action is a tuple of commands: TAKE for every missing item, then the
+    command itself. Deferring a take to just before its first use never
+    makes a line longer, and it keeps the search from enumerating every
+    subset of items the player could be carrying.
+    """
+
+    def __init__(self, game_factory=Game):
+        self.game_factory = game_factory
+        probe = game_factory()
+        catalog = probe.catalog()
+        self.items = catalog.items
+        self.exits = {key: tuple(f"go {d}" for d in room.exits)
+                      for key, room in catalog.world.items()}
+        self.takes = {}
+        self.rules = []
+        for rule in probe.rules.rules():
+            if rule.item is None:
+                continue  # catch-alls never make progress
+            command = self._render(rule, catalog)
+            needs = (rule.item,) + rule.holding
+            self.rules.append((rule, command, needs))
+            for key in needs:
+                self._take(key)
+        self.commands = {}
+        for command, room, needs, uses in STORY_COMMANDS:
+            self.commands.setdefault(room, []).append((command, needs, uses))
+            for key in needs + uses:
+                self._take(key)
+
+    def _take(self, key):
+        """TAKE command for an item; the phrase the take-back system knows if
+        it answers to a shorter one"""
+        if key in self.takes:
+            return
+        words = words_of(self.items[key].name)
+        phrases = [" ".join(words[i:i + n]) for n in range(len(words), 0, -1)
+                   for i in range(len(words) - n + 1)]
+        for candidate in phrases:
+            game = self.game_factory()
+            if key in game.s.inv:
+                break
+            game.s.location = "nowhere"
+            game.process_command(f"take {candidate}")
+            if key in game.s.inv:
+                self.takes[key] = f"take {candidate}"
+                return
+        self.takes[key] = f"take {phrases[0]}"
+
+    @staticmethod
+    def _render(rule, catalog):
+        item = phrase(catalog.items[rule.item].name)
+        target = rule.targets[0]
+        if rule.verb == "give":
+            return f"give {item} to {phrase(catalog.npcs[target].name)}"
+        if rule.verb == "combine":
+            return f"combine {item} with {phrase(catalog.items[target].name)}"
+        if rule.verb == "insert" or target in (NO_TARGET, ANY_TARGET):
+            return f"{rule.verb} {item}"
+        return f"{rule.verb} {item} on {target}"
+
+    @staticmethod
+    def ready(rule, game):
+        """Rule preconditions other than what the player carries"""
+        s = game.s
+        if rule.location and s.location not in rule.location:
+            return False
+        for name, value in rule.flags.items():
+            if s.f.get(name) != value:
+                return False
+        for key in rule.npcs:
+            if not game.present(key):
+                return False
+        if rule.verb == "give" and not game.present(rule.targets[0]):
+            return False
+        if rule.when is not None and not rule.when(game, rule.item, None):
+            return False
+        return True
+
+    def actions(self, game):
+        """Command sequences worth trying in the game's current state"""
+        inv = game.s.inv
+        location = game.s.location
+        out = [(move,) for move in self.exits.get(location, ())]
+        for rule, command, needs in self.rules:
+            if self.ready(rule, game):
+                out.append(self._with(command, needs, inv))
+        for room in (location, None):
+            for command, needs, uses in self.commands.get(room, ()):
+                out.append(self._with(command, needs, inv))
+                for key in uses:
+                    if key not in inv:
+                        out.append(self._with(command, needs + (key,), inv))
+        return out
+
+    def _with(self, command, needs, inv):
+        # TAKE works from any room here because recover_lost_item fetches
+        # items that aren't in sight; see the module docstring
+        takes = tuple(self.takes[key] for key in needs if key not in inv)
+        return takes + (command,)
+
+
+class Solver:
+    """Shortest winning lines through the game's state space"""
+
+    def __init__(self, game_factory=Game, max_turns=None, index=None):
+        self.game_factory = game_factory
+        self.index = index or ActionIndex(game_factory)
+        self.game = game_factory()
+        self.game.history = None  # the search restores states, it never undoes
+        if max_turns is not None:
+            self.game.s.max_turns = max_turns
+        self.max_turns = self.game.s.max_turns
+        self.start = self.game.snapshot()
+        self.endings = [v for v in FLAG_SCHEMA.fields["ending"].values if v]
+        self.expanded = 0
+        self.distances = self._room_distances()
+
+    # ---------- Search ----------
+
+    def _expand(self, token):
+        """(commands, turn, hash, ending, snapshot) for each relevant action"""
+        game = self.game
+        game.restore(token)
+        self.expanded += 1
+        for commands in self.index.actions(game):
+            game.restore(token)
+            for command in commands:
+                if game.process_command(command) == "GAME_OVER":
+                    break
+            ending = game.s.f["ending"]
+            yield (commands, game.s.turn, game.state_hash(), ending,
+                   None if ending else game.snapshot())
+
+    def _line(self, table, key):
+        commands = []
+        while True:
+            _, parent, action = table[key]
+            if parent is None:
+                break
+            commands.extend(reversed(action))
+            key = parent
+        return commands[::-1]
+
+    def bfs(self):
+        """Every ending's minimum-turn line, or None if it can't be reached.
+
+        Explores states in order of turns taken (PUSH costs two), so the
+        first line found to each state is a shortest one. The search stops
+        once every ending is found; otherwise it runs until no state is left
+        before dawn, which proves the missing endings unreachable.
+        """
+        root = self.game.state_hash()
+        table = {root: (0, None, None)}
+        buckets = [deque() for _ in range(self.max_turns + 1)]
+        buckets[0].append((root, self.start))
+        found = {}
+        timeout = self.timeout_line()
+        if timeout is not None:
+            found[timeout.ending] = timeout
+        for turn, bucket in enumerate(buckets):
+            if len(found) == len(self.endings) and all(
+                    line.turns <= turn for line in found.values()
+                    if line is not timeout):
+                break
+            while bucket:
+                key, token = bucket.popleft()
+                if table[key][0] != turn:
+                    continue  # reached sooner since it was queued
+                for action, cost, child, ending, snap in self._expand(token):
+                    if child in table and table[child][0] <= cost:
+                        continue
+                    table[child] = (cost, key, action)
+                    if ending:
+                        best = found.get(ending)
+                        if best is None or cost < best.turns:
+                            found[ending] = Line(ending, cost,
+                                                 self._line(table, child))
+                    elif cost < self.max_turns:
+                        buckets[cost].append((child, snap))
+        self.states = len(table)
+        return {ending: found.get(ending) for ending in self.endings}
+
+    def astar(self, ending):
+        """Minimum-turn line to one ending, or None if it can't be reached"""
+        if ending not in ENDING_HANDLERS:
+            timeout = self.timeout_line()
+            return timeout if timeout and timeout.ending == ending else None
+        goals = [rule for rule, _, _ in self.index.rules
+                 if rule.handler == ENDING_HANDLERS[ending]]
+        root = self.game.state_hash()
+        table = {root: (0, None, None)}
+        heap = [(self._estimate(self.game, goals), 0, root, self.start)]
+        while heap:
+            _, turn, key, token = heapq.heappop(heap)
+            if table[key][0] != turn:
+                continue
+            if token is None:  # the ending itself, now known to be cheapest
+                self.states = len(table)
+                return Line(ending, turn, self._line(table, key))
+            for action, cost, child, reached, snap in self._expand(token):
+                if child in table and table[child][0] <= cost:
+                    continue
+                if reached:
+                    if reached == ending:
+                        table[child] = (cost, key, action)
+                        heapq.heappush(heap, (cost, cost, child, None))
+                    continue
+                estimate = cost + self._estimate(self.game, goals)
+                if estimate > self.max_turns - 1:
+                    continue  # can't finish before dawn
+                table[child] = (cost, key, action)
+                heapq.heappush(heap, (estimate, cost, child, snap))
+        self.states = len(table)
+        return None
+
+    def timeout_line(self):
+        """The ending reached by waiting out the clock"""
+        game = self.game
+        game.restore(self.start)
+        while game.process_command("wait") != "GAME_OVER":
+            pass
+        ending, turns = game.s.f["ending"], game.s.turn
+        game.restore(self.start)
+        return Line(ending, turns, ["wait"] * turns) if ending else None
+
+    def replay(self, line):
+        """Play a line on a fresh game; True if it ends as promised in as
+        many turns"""
+        game = self.game_factory()
+        game.s.max_turns = self.max_turns
+        for command in line.commands:
+            if game.process_command(command) == "GAME_OVER":
+                break
+        return game.s.f["ending"] == line.ending and game.s.turn == line.turns
+
+    # ---------- Heuristic ----------
+
+    def _room_distances(self):
+        """Shortest moves between rooms along every exit, locked or not"""
+        world = self.game.catalog().world
+        graph = {}
+        for key, room in world.items():
+            graph[key] = set()
+            for dest in room.exits.values():
+                for suffix in ("_locked", "_req"):
+                    if dest.endswith(suffix):
+                        dest = dest[:-len(suffix)]
+                if dest in world:
+                    graph[key].add(dest)
+        distances = {}
+        for start in graph:
+            seen = {start: 0}
+            queue = deque([start])
+            while queue:
+                room = queue.popleft()
+                for dest in graph[room]:
+                    if dest not in seen:
+                        seen[dest] = seen[room] + 1
+                        queue.append(dest)
+            distances[start] = seen
+        return distances
+
+    def _estimate(self, game, goals):
+        """Turns still needed at least: walk to the goal room, get each
+        missing item (one action apiece) and fire the rule"""
+        best = None
+        here = self.distances.get(game.s.location, {})
+        inv = game.s.inv
+        for rule in goals:
+            rooms = rule.location or (game.s.location,)
+            walk = min((here[r] for r in rooms if r in here), default=None)
+            if walk is None:
+                continue
+            missing = sum(1 for key in (rule.item,) + rule.holding
+                          if key not in inv)
+            cost = walk + missing + 1
+            if best is None or cost < best:
+                best = cost
+        return best if best is not None else self.max_turns
+
+    def solve(self, astar=False):
+        """Line or None for every ending"""
+        if astar:
+            return {ending: self.astar(ending) for ending in self.endings}
+        return self.bfs()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shortest lines to every ending")
+    parser.add_argument("--astar", action="store_true",
+                        help="A* per ending instead of one breadth-first sweep")
+    parser.add_argument("--max-turns", type=int, default=None)
+    args = parser.parse_args()
+
+    solver = Solver(max_turns=args.max_turns)
+    lines = solver.solve(astar=args.astar)
+    for ending, line in lines.items():
+        if line is None:
+            print(f"{ending}: unreachable within {solver.max_turns} turns")
+        elif line.commands == ["wait"] * line.turns:
+            print(f"{ending}: {line.turns} turns (wait out the clock)")
+        else:
+            checked = "" if solver.replay(line) else " (REPLAY FAILED)"
+            print(f"{ending}: {line.turns} turns{checked}")
+            print("  " + ", ".join(line.commands))
+    print(f"{solver.expanded} states expanded")
+
+
+if __name__ == "__main__":
+    main()
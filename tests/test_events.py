@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Event Stream Tests
+"""
+
+from events import (Ending, Message, Quit, RoomDescription, StateChange,
+                    render)
+from game_engine import Game
+
+
+def kinds(events):
+    return [event.kind for event in events]
+
+
+def test_reply_comes_before_the_state_change():
+    game = Game(seed=0)
+    events = list(game.play("e"))
+    assert kinds(events) == ["room", "state"]
+    room, state = events
+    assert isinstance(room, RoomDescription) and room.key == "L02"
+    assert "paperclip" in room.items
+    assert (state.turn, state.location, state.inventory) == (1, "L02", None)
+
+    events = list(game.play("take paperclip"))
+    assert events[0] == Message("Taken: paperclip")
+    assert "paperclip" in events[-1].inventory
+
+
+def test_reply_streams_before_the_turn_advances():
+    game = Game(seed=0)
+    stream = game.play("wait")
+    assert next(stream) == Message("Time passes...")
+    assert game.s.turn == 0
+    assert isinstance(next(stream), StateChange)
+    assert game.s.turn == 1
+
+
+def test_closing_the_stream_early_still_finishes_the_command():
+    game = Game(seed=0)
+    stream = game.play("e")
+    next(stream)
+    stream.close()
+    assert (game.s.turn, game.s.location) == (1, "L02")
+    assert game.output_buffer == []
+    game.process_command("undo")
+    assert (game.s.turn, game.s.location) == (0, "L01")
+
+
+def test_night_ends_with_an_ending_event():
+    game = Game(seed=0)
+    for _ in range(game.s.max_turns - 1):
+        game.process_command("wait")
+    events = list(game.play("wait"))
+    assert kinds(events) == ["message", "state", "ending"]
+    assert events[-1].ending == "defeat"
+    assert "DAWN BREAKS" in events[-1].render()
+
+    after = list(game.play("look"))
+    assert isinstance(after[-1], Ending) and after[-1].ending == "defeat"
+
+
+def test_string_api_keeps_the_ending_text():
+    game = Game(seed=0)
+    for _ in range(game.s.max_turns - 1):
+        assert game.process_command("wait") == "Time passes..."
+    assert game.process_command("wait") == "GAME_OVER"
+    text = game.get_output()
+    assert text.startswith("Time passes...\n")
+    assert "ENDING: DAWN'S DEFEAT" in text
+
+
+def test_quit_closes_the_stream():
+    game = Game(seed=0)
+    events = list(game.play("quit"))
+    assert isinstance(events[-1], Quit)
+    assert Game(seed=0).process_command("quit") == "QUIT"
+
+
+def test_process_command_renders_the_same_events():
+    commands = ["look", "e", "take paperclip", "i", "x poster", "xyzzy"]
+    typed, text = Game(seed=0), Game(seed=0)
+    for cmd in commands:
+        assert text.process_command(cmd) == render(typed.play(cmd))
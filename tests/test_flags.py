@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Flag Vector and State Hash Tests
+"""
+
+import pytest
+
+from flags import Flags, FlagSchema
+from game_engine import Game
+
+SCHEMA = FlagSchema([("vault_open", bool), ("trust", range(0, 4)),
+                     ("ending", (None, "redemption", "defeat"))])
+
+
+def test_values_pack_into_fixed_fields():
+    f = Flags(SCHEMA)
+    assert (f["vault_open"], f["trust"], f["ending"]) == (False, 0, None)
+    assert SCHEMA.width == 1 + 2 + 2
+    f["trust"] += 3
+    f["ending"] = "defeat"
+    assert f["trust"] == 3 and f["ending"] == "defeat"
+    assert f.changes() == {"trust": 3, "ending": "defeat"}
+    assert f.get("not_a_flag", "default") == "default"
+    del f["trust"]
+    assert f["trust"] == 0
+
+
+def test_out_of_range_values_are_refused():
+    f = Flags(SCHEMA)
+    with pytest.raises(OverflowError):
+        f["trust"] = 4
+    with pytest.raises(ValueError):
+        f["ending"] = "victory"
+    with pytest.raises(KeyError):
+        f["not_a_flag"] = True
+
+
+def test_hash_depends_only_on_the_values():
+    a, b = Flags(SCHEMA), Flags(SCHEMA)
+    assert a.hash == 0  # defaults contribute nothing
+    a["vault_open"] = True
+    a["trust"] = 2
+    b["trust"] = 2
+    b["vault_open"] = True
+    assert a == b and a.hash == b.hash != 0
+    a["trust"] = 0
+    a["trust"] = 2
+    assert a.hash == b.hash
+    copy = Flags.from_bits(SCHEMA, a.bits)
+    assert copy == a and copy.hash == a.hash
+    token = a.snapshot()
+    a["vault_open"] = False
+    a.restore(token)
+    assert a == b
+
+
+def test_state_hash_tracks_the_game_not_the_path():
+    one, two = Game(seed=0), Game(seed=1)
+    assert one.state_hash() == two.state_hash()
+    for cmd in ["e", "take paperclip", "w"]:
+        one.process_command(cmd)
+    for cmd in ["e", "take paperclip", "look", "w"]:
+        two.process_command(cmd)
+    assert one.s.turn != two.s.turn
+    assert one.state_hash() == two.state_hash()
+    two.process_command("e")
+    assert one.state_hash() != two.state_hash()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Undo History Tests
+"""
+
+import pytest
+
+from game_engine import Game
+from saves import MemorySaveStore
+
+
+@pytest.fixture
+def saves(monkeypatch):
+    store = MemorySaveStore(codec=Game.save_codec())
+    monkeypatch.setattr(Game, "saves", store)
+    return store
+
+
+def test_undo_after_load_stays_in_the_loaded_game(saves):
+    game = Game(seed=0, player="p1")
+    for cmd in ["e", "take paperclip", "save s1"]:
+        game.process_command(cmd)
+
+    loaded = Game(seed=0, player="p1")
+    loaded.process_command("load s1")
+    expected = loaded.snapshot()
+    loaded.process_command("drop poster")
+    loaded.process_command("undo")
+
+    assert "PAPERCLIP" in loaded.s.inv
+    assert loaded.items["PAPERCLIP"].loc == "inv"
+    assert loaded.snapshot().item_locs == expected.item_locs
+    assert loaded.state_hash() == _hash_of(expected)
+
+
+def _hash_of(token):
+    game = Game()
+    game.restore(token)
+    return game.state_hash()
+
+
+@pytest.mark.parametrize("back", ["undo 7", "rewind to turn 3"])
+def test_going_back_restores_the_rng(back):
+    game = Game(seed=0)
+    for cmd in ["e", "hint", "hint"]:
+        game.process_command(cmd)
+    at_turn_3 = game.rng.getstate()
+    following = game.process_command("hint")
+    for _ in range(6):
+        game.process_command("hint")  # crosses a keyframe
+
+    game.process_command(back)
+    assert game.s.turn == 3
+    assert game.rng.getstate() == at_turn_3
+    assert game.process_command("hint") == following
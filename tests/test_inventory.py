@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Inventory Tests
+"""
+
+import pytest
+
+from game_engine import Game
+from inventory import HELD, NOWHERE, Inventory
+from locations import LocationIndex
+
+
+def test_inventory_is_the_held_location():
+    index = LocationIndex.build({"BOLT": "L12", "BONE": "L11"})
+    inv = Inventory(index)
+    assert not inv and len(inv) == 0
+    inv.add("BONE")
+    inv.add("BOLT")
+    assert list(inv) == ["BONE", "BOLT"] and inv.keys() == ["BONE", "BOLT"]
+    assert "BONE" in inv and index.where("BONE") == HELD
+    inv.remove("BONE")
+    assert "BONE" not in inv and index.where("BONE") == NOWHERE
+    inv.remove("BOLT", "L01")
+    assert index.at("L01") == ["BOLT"]
+
+
+def test_removing_what_isnt_carried():
+    inv = Inventory(LocationIndex.build({"BOLT": "L12"}))
+    with pytest.raises(ValueError):
+        inv.remove("BOLT")
+    inv.discard("BOLT")
+    assert inv.keys() == []
+
+
+def test_item_records_follow_the_inventory():
+    game = Game(seed=0)
+    game.process_command("e")
+    game.process_command("take paperclip")
+    assert "PAPERCLIP" in game.s.inv
+    assert game.items["PAPERCLIP"].loc == HELD
+    game.process_command("drop paperclip")
+    assert "PAPERCLIP" not in game.s.inv
+    assert game.items["PAPERCLIP"].loc == "L02"
+    assert game.validate_inventory_consistency() == 0
+
+
+def test_used_up_items_leave_play():
+    game = Game(seed=0)
+    for cmd in ["e", "e", "s", "take hematite", "e", "take garlic",
+                "take rosemary", "craft counter-ink"]:
+        game.process_command(cmd)
+    for key in ("HEMATITE", "GARLIC", "ROSEMARY"):
+        assert key not in game.s.inv
+        assert game.items[key].loc == NOWHERE
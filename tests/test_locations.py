@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Location Index Tests
+"""
+
+from game_engine import Game
+from locations import LocationIndex
+
+
+def test_moves_keep_both_directions_in_step():
+    index = LocationIndex.build({"BOLT": "L12", "BONE": "L11",
+                                 "CUTTER": "L11"})
+    assert index.at("L11") == ["BONE", "CUTTER"]
+    assert index.move("BONE", "inv") == "L11"
+    assert index.where("BONE") == "inv"
+    assert index.at("L11") == ["CUTTER"]
+    assert index.count("inv") == 1
+    assert index.at("nowhere") == [] and index.where("GHOST") is None
+    index.move("BONE", "L11")
+    assert index.at("L11") == ["CUTTER", "BONE"]  # arrival order
+
+
+def test_copies_are_layered_over_an_unchanged_parent():
+    base = LocationIndex.build({"BOLT": "L12", "BONE": "L11"})
+    one, two = base.copy(), base.copy()
+    one.move("BOLT", "inv")
+    assert one.where("BOLT") == "inv" and one.at("L12") == []
+    assert two.where("BOLT") == "L12" and base.at("L12") == ["BOLT"]
+    assert sorted(one.keys()) == ["BOLT", "BONE"] and len(one) == 2
+
+
+def test_snapshot_restore_and_logged_rewind():
+    index = LocationIndex.build({"BOLT": "L12"}).copy()
+    token = index.snapshot()
+    index.move("BOLT", "inv")
+    index.restore(token)
+    assert index.where("BOLT") == "L12"
+
+    where, at = index.log = ({}, {})
+    index.move("BOLT", "inv")
+    index.move("NEW", "L01")
+    index.log = None
+    index.rewind(where, at)
+    assert index.where("BOLT") == "L12" and index.at("inv") == []
+    assert "NEW" not in index and index.at("L01") == []
+
+
+def test_game_rooms_list_only_their_own_things():
+    game = Game(seed=0)
+    assert "CRATE" in game.room_items()
+    game.process_command("e")
+    assert game.room_items() == ["POSTER", "PAPERCLIP", "TAROT_COIN"]
+    game.process_command("take paperclip")
+    assert "PAPERCLIP" not in game.room_items()
+    assert game.item_locs.where("PAPERCLIP") == "inv"
+    assert game.items["PAPERCLIP"].loc == "inv"
+    assert game.room_npcs() == []
+    game.process_command("e")
+    assert game.room_npcs() == ["LUPITA"]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Save Migration Tests
+"""
+
+from game_engine import Game
+from migrate import Checker, migrate
+from saves import SQLiteSaveStore
+
+CRAFTED = ["e", "e", "s", "take hematite", "e", "take garlic",
+           "take rosemary", "craft counter-ink"]
+
+
+def played(commands):
+    game = Game(seed=0)
+    for cmd in commands:
+        game.process_command(cmd)
+    return game.save_data()
+
+
+def rows(path):
+    return [row for batch in SQLiteSaveStore(path).scan() for row in batch]
+
+
+def test_used_up_items_are_a_valid_location():
+    data = played(CRAFTED)
+    assert data["items"]["HEMATITE"]["loc"] == "NOWHERE"
+    assert Checker().problems(data) == []
+
+
+def test_checker_reports_unknown_keys():
+    data = played(["e"])
+    data["inv"] = ["GHOST"]
+    data["flags"] = {"no_such_flag": True}
+    problems = Checker().problems(data)
+    assert ("missing item", "GHOST") in problems
+    assert ("unknown flag", "no_such_flag") in problems
+
+
+def test_json_saves_are_upgraded_and_broken_ones_reported(tmp_path):
+    path = str(tmp_path / "saves.db")
+    report = tmp_path / "report.jsonl"
+    store = SQLiteSaveStore(path)  # JSON rows, as before savefmt
+    store.save("p1", "good", played(CRAFTED))
+    broken = played(["e"])
+    broken["location"] = "ATLANTIS"
+    store.save("p1", "bad", broken)
+
+    totals = migrate(path, report=str(report), workers=1)
+    assert (totals["saves"], totals["upgraded"], totals["broken"]) == (2, 1, 1)
+    assert '"slot": "bad"' in report.read_text()
+    upgraded = SQLiteSaveStore(path, codec=Game.save_codec())
+    assert upgraded.load("p1", "good") == played(CRAFTED)
+    assert migrate(path, workers=1)["upgraded"] == 0
+
+
+def test_upgrade_skips_a_slot_saved_over_meanwhile(tmp_path):
+    path = str(tmp_path / "saves.db")
+    store = SQLiteSaveStore(path, codec=Game.save_codec())
+    store.save("p1", "s1", played(["e"]))
+    store.save("p1", "s2", played(["e"]))
+    (_, _, read1), (_, _, read2) = rows(path)
+    store.save("p1", "s1", played(["e", "e"]))  # the player saves again
+    now = rows(path)[0][2]
+
+    skipped = store.replace_raw([
+        ("p1", "s1", read1, b"upgraded", 1, "ALLEY_MOUTH"),
+        ("p1", "s2", read2, b"upgraded", 1, "ALLEY_MOUTH")])
+    assert skipped == [("p1", "s1")]
+    assert [data for _, _, data in rows(path)] == [now, b"upgraded"]
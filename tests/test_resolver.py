@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Noun Resolver Tests
+"""
+
+from game_engine import Game
+from resolver import FEATURE, ITEM, NPC, NounResolver, words_of
+
+
+def resolver():
+    nouns = NounResolver()
+    nouns.add(ITEM, "LENS_ARRAY_CASE", "lens array case")
+    nouns.add(ITEM, "LENS", "lens")
+    nouns.add(ITEM, "BRASS_LOCKET", "brass locket", aliases=("pendant",))
+    nouns.add(NPC, "TIA_SOL", "Tia Sol")
+    nouns.add(FEATURE, "chalk_sigil", "chalk sigil")
+    return nouns
+
+
+def test_words_split_on_punctuation():
+    assert words_of("Counter-Ink (crafted)") == ["counter", "ink", "crafted"]
+    assert words_of("  Tia's  CAT ") == ["tia's", "cat"]
+
+
+def test_exact_beats_alias_beats_ngram_beats_prefix():
+    nouns = resolver()
+    assert nouns.candidates("lens")[:2] == [(ITEM, "LENS"),
+                                           (ITEM, "LENS_ARRAY_CASE")]
+    assert nouns.candidates("pendant") == [(ITEM, "BRASS_LOCKET")]
+    assert nouns.candidates("array case") == [(ITEM, "LENS_ARRAY_CASE")]
+    assert nouns.candidates("LOCK") == [(ITEM, "BRASS_LOCKET")]
+    assert nouns.candidates("lo") == []  # under MIN_PREFIX
+    assert nouns.candidates("sigil") == [(FEATURE, "chalk_sigil")]
+    assert nouns.candidates("tia") == [(NPC, "TIA_SOL")]
+
+
+def test_scopes_are_tried_in_order():
+    nouns = resolver()
+    everywhere = (ITEM, lambda key: True)
+    cased_only = (ITEM, lambda key: key == "LENS_ARRAY_CASE")
+    people = (NPC, lambda key: True)
+    assert nouns.resolve("lens", everywhere) == "LENS"
+    assert nouns.resolve("lens", cased_only) == "LENS_ARRAY_CASE"
+    assert nouns.resolve("lens", people) is None
+    assert nouns.resolve("tia", cased_only, people) == "TIA_SOL"
+    assert nouns.resolve("", everywhere) is None
+
+
+def test_game_resolves_only_what_is_in_reach():
+    game = Game(seed=0)
+    assert game.resolve("crate", "room") == "CRATE"
+    assert game.resolve("sigil", "feature") == "CHALK_SIGIL"
+    assert game.resolve("paperclip", "room") is None
+    game.process_command("e")
+    assert game.resolve("paper", "room") == "PAPERCLIP"
+    assert game.resolve("sigil", "feature") is None
+    game.process_command("take paperclip")
+    assert game.resolve("paperclip", "room", "inv") == "PAPERCLIP"
+    assert game.resolve("paperclip", "room") is None
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Interaction Rule Tests
+"""
+
+from game_engine import Game
+from rules import ANY_ITEM, ANY_TARGET, NO_TARGET, RuleRegistry, target_tokens
+
+
+def test_target_tokens_longest_first():
+    assert target_tokens("chalk sigil") == ["chalk sigil", "chalk", "sigil",
+                                            ANY_TARGET]
+    assert target_tokens(None) == [NO_TARGET, ANY_TARGET]
+
+
+def registry():
+    rules = RuleRegistry()
+    rules.rule("use", "BOLT", "fix", targets=("antenna",), location="L12",
+               otherwise="There's no antenna here.")
+    rules.rule("use", "BOLT", "fix_anywhere", targets=("antenna",))
+    rules.rule("use", ANY_ITEM, "shrug")
+    rules.rule("use", "LENS", "aim", targets=("vale",),
+               holding=("BLUEPRINT",))
+    return rules
+
+
+def test_first_allowed_rule_wins_and_any_item_is_the_fallback():
+    rules = registry()
+    game = Game(seed=0)
+    game.s.location = "L12"
+    rule, _ = rules.match(game, "use", "BOLT", "antenna panel")
+    assert rule.handler == "fix"
+    rule, _ = rules.match(game, "use", "BONE", "antenna")
+    assert rule.handler == "shrug"
+    assert rules.match(game, "give", "BONE", "antenna") == (None, None)
+
+
+def test_blocked_rule_shows_its_otherwise_text():
+    rules = RuleRegistry()
+    rules.rule("use", "BOLT", "fix", targets=("antenna",), location="L12",
+               otherwise="There's no antenna here.")
+    game = Game(seed=0)
+    assert rules.match(game, "use", "BOLT", "antenna") == (
+        None, "There's no antenna here.")
+    # A later rule that is allowed still fires
+    rule, _ = registry().match(game, "use", "BOLT", "antenna")
+    assert rule.handler == "fix_anywhere"
+
+
+def test_holding_precondition():
+    rules = registry()
+    game = Game(seed=0)
+    assert rules.match(game, "use", "LENS", "vale")[0].handler == "shrug"
+    game.s.inv.add("BLUEPRINT")
+    assert rules.match(game, "use", "LENS", "vale")[0].handler == "aim"
+
+
+def test_registry_queries():
+    rules = registry()
+    assert len(rules) == 4
+    assert [r.handler for r in rules.rules(item="BOLT")] == ["fix",
+                                                            "fix_anywhere"]
+    assert rules.items("use") == {"BOLT", "LENS"}
+
+
+def test_game_interactions_go_through_the_rules():
+    game = Game(seed=0)
+    reply = game.process_command("use counter-ink on sigil")
+    assert "service door unlocks" in reply
+    assert game.s.f["façade_unlocked"]
+    game = Game(seed=0)
+    game.process_command("e")
+    assert "no sigil here" in game.process_command("use counter-ink on sigil")
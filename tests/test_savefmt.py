@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Save Format Tests
+"""
+
+import json
+import struct
+import zlib
+
+import pytest
+
+from game_engine import DEFAULT_SLOT, Game
+from savefmt import (HEADERS, MAGIC, Layout, SaveCodec, SaveFormatError,
+                     layout_id)
+from saves import MemorySaveStore, SQLiteSaveStore
+
+OPENING = ["e", "take paperclip", "e", "s", "take hematite"]
+
+
+@pytest.fixture
+def saved():
+    game = Game(seed=0)
+    for cmd in OPENING:
+        game.process_command(cmd)
+    return game.save_data()
+
+
+def test_round_trip_is_small_and_exact(saved):
+    codec = Game.save_codec()
+    blob = codec.encode(saved)
+    assert len(blob) < 200
+    assert layout_id(blob) == codec.layout.id
+    assert codec.decode(blob) == saved
+
+
+def test_corrupt_and_truncated_saves_are_rejected(saved):
+    codec = Game.save_codec()
+    blob = codec.encode(saved)
+    flipped = blob[:-1] + bytes((blob[-1] ^ 1,))
+    with pytest.raises(SaveFormatError, match="checksum"):
+        codec.decode(flipped)
+    with pytest.raises(SaveFormatError):
+        codec.decode(blob[:6])
+    with pytest.raises(SaveFormatError, match="not a save"):
+        codec.decode(b"XX" + blob[2:])
+
+
+def test_other_content_is_rejected(saved):
+    codec = Game.save_codec()
+    layout = codec.layout
+    other = SaveCodec(Layout(layout.rooms, layout.symbols + ("ZZZ",),
+                             layout.flag_defaults))
+    with pytest.raises(SaveFormatError, match="different content"):
+        other.decode(codec.encode(saved))
+
+
+def test_version_1_headers_are_still_read(saved):
+    codec = Game.save_codec()
+    body = codec.encode(saved)[HEADERS[2].size:]
+    legacy = codec.layout.legacy_id
+    crc = zlib.crc32(body, zlib.crc32(b"\x01" + struct.pack("<H", legacy)))
+    blob = HEADERS[1].pack(MAGIC, 1, legacy, crc) + body
+    assert layout_id(blob) == legacy
+    assert codec.decode(blob) == saved
+
+
+def test_json_saves_are_upgraded(saved):
+    assert Game.save_codec().decode(json.dumps(saved)) == saved
+
+
+def test_store_refuses_a_different_layout_under_the_same_id(tmp_path, saved):
+    path = str(tmp_path / "saves.db")
+    layout = Game.save_codec().layout
+    SQLiteSaveStore(path, codec=SaveCodec(layout)).save("p1", "s1", saved)
+    other = Layout(layout.rooms, layout.symbols + ("ZZZ",),
+                   layout.flag_defaults)
+    other.id = layout.id
+    with pytest.raises(ValueError, match="different content"):
+        SQLiteSaveStore(path, codec=SaveCodec(other)).save("p1", "s2", saved)
+
+
+def test_legacy_save_file_is_only_imported_for_the_local_player(
+        tmp_path, monkeypatch, saved):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Game, "saves",
+                        MemorySaveStore(codec=Game.save_codec()))
+    (tmp_path / "savegame.json").write_text(json.dumps(saved))
+
+    remote = Game(player="someone")
+    assert "No save" in remote.process_command("load")
+    assert (tmp_path / "savegame.json").exists()
+
+    local = Game()
+    assert "Game loaded" in local.process_command("load")
+    assert local.save_data()["items"] == saved["items"]
+    assert not (tmp_path / "savegame.json").exists()
+    assert Game.saves.load("local", DEFAULT_SLOT) is not None
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Line Server Tests
+"""
+
+import asyncio
+import re
+
+import pytest
+
+from game_engine import Game
+from saves import MemorySaveStore
+from server import MAX_LINE, PROMPT, GameServer
+
+PROMPT_BYTES = PROMPT.encode()
+
+
+@pytest.fixture(autouse=True)
+def saves(monkeypatch):
+    monkeypatch.setattr(Game, "saves",
+                        MemorySaveStore(codec=Game.save_codec()))
+
+
+def serve(test, **kwargs):
+    """Run test(server, connect) against a server on a free port"""
+    async def main():
+        server = GameServer(port=0, **kwargs)
+        await server.start()
+
+        async def connect():
+            reader, writer = await asyncio.open_connection(
+                server.host, server.port)
+            greeting = await reader.readuntil(PROMPT_BYTES)
+            return reader, writer, greeting.decode()
+
+        try:
+            return await test(server, connect)
+        finally:
+            server.close()
+    return asyncio.run(main())
+
+
+async def ask(reader, writer, line):
+    writer.write(line.encode() + b"\r\n")
+    return (await reader.readuntil(PROMPT_BYTES)).decode()
+
+
+def test_each_line_gets_a_reply_and_a_prompt():
+    async def test(server, connect):
+        reader, writer, greeting = await connect()
+        assert "Welcome to Shadow Circuit" in greeting
+        assert "**RAIN ALLEY" in greeting
+        reply = await ask(reader, writer, "e")
+        assert reply.startswith("**ALLEY MOUTH")
+        assert "\r\nExits:" in reply
+        writer.write(b"quit\r\n")
+        assert b"Thanks for playing" in await reader.read()
+        return server.commands
+    assert serve(test) == 2
+
+
+def test_reconnecting_client_reaches_its_saves_by_player_id():
+    async def test(server, connect):
+        reader, writer, greeting = await connect()
+        player = re.search(r"player id is ([0-9a-f]+)", greeting).group(1)
+        await ask(reader, writer, "e")
+        assert "saved" in await ask(reader, writer, "save s1")
+        writer.close()
+
+        reader, writer, greeting = await connect()
+        assert player not in greeting  # a new connection, a new id
+        assert "No save" in await ask(reader, writer, "load s1")
+        assert "hex digits" in await ask(reader, writer, "player nope")
+        assert player in await ask(reader, writer, f"PLAYER {player}")
+        reply = await ask(reader, writer, "load s1")
+        writer.close()
+        return reply
+    assert "Game loaded from slot 's1'" in serve(test)
+
+
+def test_connections_over_the_cap_are_turned_away():
+    async def test(server, connect):
+        first = await connect()
+        reader, writer = await asyncio.open_connection(server.host,
+                                                       server.port)
+        refused = await reader.read()
+        first[1].close()
+        writer.close()
+        return refused, server.refused
+    refused, count = serve(test, max_connections=1)
+    assert b"full tonight" in refused and count == 1
+
+
+def test_overlong_lines_are_refused():
+    async def test(server, connect):
+        reader, writer, _ = await connect()
+        writer.write(b"x" * (MAX_LINE * 2) + b"\r\n")
+        return await reader.read()
+    assert b"too long" in serve(test)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Session Pool Tests
+"""
+
+import json
+import pickle
+
+import pytest
+
+from game_engine import Game
+from journal import Journal, recover
+from sessions import (GAME_BYTES, SPILL_VERSION, MemorySessionStore, Session,
+                      SessionManager)
+
+# Room for two sessions with a little transcript each
+TWO = 2 * GAME_BYTES + 4096
+
+
+def play(manager, session_id, *commands):
+    with manager.session(session_id) as session:
+        for cmd in commands:
+            session.add_command(cmd)
+            session.output.append(session.run(cmd))
+        return session.game.state_hash(), session.game.s.turn
+
+
+def test_sessions_past_the_budget_are_spilled():
+    store = MemorySessionStore()
+    manager = SessionManager(store, budget=TWO)
+    for session_id in ("a", "b", "c"):
+        play(manager, session_id, "look")
+    assert len(manager) == 2
+    assert manager.spills == 1
+    assert list(store.data) == ["a"]
+    assert manager.resident <= TWO
+
+
+def test_least_recently_used_is_spilled_first():
+    store = MemorySessionStore()
+    manager = SessionManager(store, budget=TWO)
+    play(manager, "a", "look")
+    play(manager, "b", "look")
+    play(manager, "a", "e")  # a is now the most recent
+    play(manager, "c", "look")
+    assert list(store.data) == ["b"]
+    assert list(manager.hot) == ["a", "c"]
+
+
+def test_spilled_session_comes_back_the_same():
+    store = MemorySessionStore()
+    manager = SessionManager(store, budget=TWO)
+    state = play(manager, "a", "e", "take paperclip", "s")
+    with manager.session("a") as session:
+        transcript = session.output.view()
+        commands = list(session.commands)
+    assert manager.flush() == 1
+    assert "a" in store.data and len(manager) == 0
+
+    with manager.session("a") as session:
+        assert (session.game.state_hash(), session.game.s.turn) == state
+        assert "PAPERCLIP" in session.game.s.inv
+        assert session.output.view() == transcript
+        assert list(session.commands) == commands
+    assert manager.rehydrations == 1
+
+
+def test_idle_sessions_are_evicted_but_not_checked_out_ones():
+    store = MemorySessionStore()
+    manager = SessionManager(store)
+    play(manager, "a", "look")
+    play(manager, "b", "look")
+    assert manager.evict_idle(3600) == 0
+    with manager.session("b"):
+        assert manager.evict_idle(0) == 1  # only a; b is pinned
+    assert list(store.data) == ["a"]
+    assert list(manager.hot) == ["b"]
+
+
+def test_spill_from_another_version_is_rejected():
+    store = MemorySessionStore()
+    manager = SessionManager(store)
+    play(manager, "a", "look")
+    manager.flush()
+    version, *rest = pickle.loads(store.data["a"])
+    assert version == SPILL_VERSION
+    store.put("a", pickle.dumps((SPILL_VERSION + 1, *rest)))
+    with pytest.raises(ValueError, match="isn't supported"):
+        with manager.session("a"):
+            pass
+
+
+def test_journal_newer_than_the_spill_wins_after_a_restart(tmp_path):
+    journals = str(tmp_path)
+    sid = "0123abcd"
+
+    def pool(store):
+        return SessionManager(store, journal_dir=journals, create=lambda i:
+                              Session(i, Game(player=i),
+                                      journal=Journal(i, journals)))
+
+    store = MemorySessionStore()
+    manager = pool(store)
+    play(manager, sid, "e", "take paperclip")
+    manager.flush()
+    live = play(manager, sid, "take poster", "s")  # after the rehydrate
+
+    restarted = pool(store)  # the first pool died without spilling again
+    with restarted.session(sid) as session:
+        assert (session.game.state_hash(), session.game.s.turn) == live
+        assert session.game.player == sid
+    play(restarted, sid, "n")
+    restarted.flush()
+
+    with open(tmp_path / (sid + ".log")) as f:
+        numbers = [json.loads(line)[0] for line in f]
+    assert numbers == sorted(set(numbers))
+    game, seq = recover(sid, journals)
+    assert seq == 5
+    with restarted.session(sid) as session:
+        assert session.game.state_hash() == game.state_hash()
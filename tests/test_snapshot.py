@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Snapshot and Clone Tests
+"""
+
+import pickle
+
+from game_engine import Game, Snapshot
+
+OPENING = ["e", "take paperclip", "e", "s", "take hematite"]
+
+
+def played(commands, **kwargs):
+    game = Game(seed=0, **kwargs)
+    for cmd in commands:
+        game.process_command(cmd)
+    return game
+
+
+def test_restore_puts_every_part_back():
+    game = played(OPENING)
+    token = game.snapshot()
+    before = (game.state_hash(), game.s.turn, sorted(game.s.seen),
+              list(game.s.inv), game.rng.getstate())
+    for cmd in ["take ward", "n", "hint", "w", "drop hematite"]:
+        game.process_command(cmd)
+    game.restore(token)
+    assert (game.state_hash(), game.s.turn, sorted(game.s.seen),
+            list(game.s.inv), game.rng.getstate()) == before
+    assert game.snapshot() == token
+    assert game.process_command("x hematite") == \
+        played(OPENING).process_command("x hematite")
+
+
+def test_snapshots_are_immutable_and_picklable():
+    game = played(OPENING)
+    token = game.snapshot()
+    game.process_command("n")
+    assert (token.location, game.s.location) == ("L06", "L04")
+    copy = Snapshot(*pickle.loads(pickle.dumps(tuple(token))))
+    fresh = Game()
+    fresh.restore(copy)
+    assert fresh.state_hash() == played(OPENING).state_hash()
+
+
+def test_clone_is_independent_and_keeps_who_it_saves_as():
+    game = played(OPENING, player="p1")
+    game.autosave_every = 5
+    clone = game.clone()
+    assert clone.state_hash() == game.state_hash()
+    assert (clone.player, clone.autosave_every) == ("p1", 5)
+    clone.process_command("drop paperclip")
+    assert "PAPERCLIP" in game.s.inv and "PAPERCLIP" not in clone.s.inv
+    assert game.items["PAPERCLIP"].loc == "inv"
+
+
+def test_restore_starts_the_undo_history_over():
+    game = played(OPENING)
+    game.restore(played(["e"]).snapshot())
+    assert len(game.history) == 0
+    game.process_command("take poster")
+    game.process_command("undo")
+    assert (game.s.turn, game.s.location) == (1, "L02")
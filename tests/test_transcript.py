@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Transcript Tests
+"""
+
+from transcript import Transcript
+
+
+def test_oldest_pages_are_dropped_but_still_counted():
+    blocks = [f"block {i}" for i in range(1000)]
+    t = Transcript(blocks, window=10, page_size=10, max_pages=5)
+    assert len(t.pages) == 5
+    assert len(t) == 1000
+    assert t.earlier(99) == blocks[-60:-10]
+    assert t.view() == blocks[-10:]
+    assert t.since(995) == blocks[995:]
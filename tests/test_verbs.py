@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Verb Table Tests
+"""
+
+import pytest
+
+from game_engine import VERBS, Game
+from verbs import PAIR, TEXT, WORD, Verb, VerbTable
+
+
+def lookup(command, table=VERBS):
+    verb, rest = table.lookup(command.split())
+    return (verb.names[0] if verb else None), rest
+
+
+def test_words_aliases_and_phrases():
+    assert lookup("x lens array") == ("examine", ["lens", "array"])
+    assert lookup("get bolt") == ("take", ["bolt"])
+    assert lookup("n") == ("north", [])
+    assert lookup("enter code 1207") == ("enter code", ["1207"])
+    assert lookup("enter") == ("inside", [])
+    assert lookup("rewind to turn 3") == ("rewind to turn", ["3"])
+    assert lookup("rewind 3") == ("rewind to turn", ["3"])
+    assert lookup("dance wildly") == (None, ["dance", "wildly"])
+    assert lookup("") == (None, [])
+
+
+def test_longest_phrase_wins():
+    table = VerbTable()
+    table.register(Verb("tune", "cmd_a"))
+    table.register(Verb("tune antenna", "cmd_b"))
+    table.register(Verb("tune antenna array", "cmd_c"))
+    assert table.lookup("tune antenna array now".split())[0].handler == "cmd_c"
+    assert table.lookup("tune antenna".split())[0].handler == "cmd_b"
+    assert table.lookup("tune radio".split())[0].handler == "cmd_a"
+    table.unregister("tune antenna array")
+    assert "tune antenna array" not in table
+    assert table.lookup("tune antenna array".split())[0].handler == "cmd_b"
+
+
+@pytest.mark.parametrize("grammar, words, args", [
+    (TEXT, ["lens", "array"], ("lens array",)),
+    (WORD, ["north", "quickly"], ("north",)),
+    (PAIR, ["bone", "to", "gasket"], ("bone", "gasket")),
+    (PAIR, ["bone", "to"], None),
+    (TEXT, [], None),
+])
+def test_argument_grammars(grammar, words, args):
+    verb = Verb("v", "cmd_v", grammar, "V what?", separator="to")
+    assert verb.parse(words) == args
+
+
+def test_handler_gets_fixed_then_parsed_arguments():
+    calls = []
+    verb = Verb("v", lambda game, *args: calls.append(args), TEXT,
+                fixed=("open",))
+    verb(None, ["the", "door"])
+    assert calls == [("open", "the door")]
+
+
+def test_missing_argument_shows_the_prompt_and_costs_a_turn():
+    game = Game(seed=0)
+    assert game.process_command("take") == "Take what?"
+    assert game.s.turn == 1
+
+
+def test_verb_cost_is_the_turns_taken():
+    game = Game(seed=0)
+    game.process_command("push crate")
+    assert game.s.turn == 2
+    game.process_command("undo")
+    assert game.s.turn == 0
+
+
+def test_verbs_added_to_a_copied_table_stay_local(monkeypatch):
+    table = VERBS.copy()
+    table.register(Verb("dance", lambda game: game.output("You dance.")))
+    monkeypatch.setattr(Game, "verbs", table)
+    assert Game(seed=0).process_command("dance") == "You dance."
+    assert "dance" not in VERBS
+    assert VERBS.lookup(["dance"])[0] is None
+
+
+def test_unknown_command():
+    game = Game(seed=0)
+    assert game.process_command("xyzzy") == "I don't understand that command."
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Transcript
+A session's scrollback, bounded: the newest blocks (commands and their
+output) stay as text in a ring, and older ones are packed into
+zlib-compressed pages of PAGE_SIZE blocks. A front end renders the ring
+and asks for earlier pages only when the player scrolls back, so the cost
+of a rerun doesn't grow with the length of the night. Only the last
+MAX_PAGES pages are kept; older ones are dropped, though block numbers
+keep counting them.
+"""
+
+import json
+import zlib
+from collections import deque
+from itertools import islice
+
+WINDOW = 40      # blocks kept as text
+PAGE_SIZE = 50   # blocks per compressed page
+MAX_PAGES = 20   # pages kept before the oldest is dropped
+
+
+class Transcript:
+    """Append-only list of text blocks, recent ones in memory as text"""
+
+    max_pages = MAX_PAGES  # for transcripts spilled before there was a cap
+
+    def __init__(self, blocks=(), window=WINDOW, page_size=PAGE_SIZE,
+                 max_pages=MAX_PAGES):
+        self.window = window
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.recent = deque()
+        self.pages = []  # compressed, oldest first
+        self.paged = 0   # blocks paged out, dropped pages included
+        for block in blocks:
+            self.append(block)
+
+    def __len__(self):
+        return self.paged + len(self.recent)
+
+    def __bool__(self):
+        return bool(self.recent) or bool(self.pages)
+
+    def append(self, block):
+        self.recent.append(block)
+        if len(self.recent) >= self.window + self.page_size:
+            page = [self.recent.popleft() for _ in range(self.page_size)]
+            self.pages.append(zlib.compress(
+                json.dumps(page, ensure_ascii=False).encode("utf-8")))
+            self.paged += len(page)
+            if len(self.pages) > self.max_pages:
+                del self.pages[0]
+
+    def size(self):
+        """Bytes of text and compressed pages held"""
+        return (sum(len(block) for block in self.recent)
+                + sum(len(page) for page in self.pages))
+
+    def earlier(self, pages):
+        """The blocks of the last ``pages`` compressed pages, oldest first"""
+        out = []
+        for page in self.pages[max(0, len(self.pages) - pages):]:
+            out += json.loads(zlib.decompress(page))
+        return out
+
+    def view(self, pages=0, end=None):
+        """What to render: ``pages`` earlier pages, then the recent blocks
+        (those before block number ``end`` if given)"""
+        recent = list(self.recent) if end is None \
+            else list(islice(self.recent, max(0, end - self.paged)))
+        if pages <= 0:
+            return recent
+        return self.earlier(pages) + recent
+
+    def since(self, start):
+        """The blocks from block number ``start`` on that are still in the
+        ring"""
+        return list(islice(self.recent, max(0, start - self.paged), None))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Verb Table
+Registered verbs, aliases and multi-word phrases used by Game.process_command
+"""
+
+# Argument grammars
+NOARGS = "noargs"   # LOOK, SENSE, TRACE SIGIL
+TEXT = "text"       # EXAMINE <rest of line>
+WORD = "word"       # GO <first word>
+PAIR = "pair"       # COMBINE <a> WITH <b>
+
+
+class Verb:
+    """A command verb: its names, argument grammar and handler.
+
+    ``handler`` is either the name of a Game method or a callable taking the
+    game as its first argument. ``fixed`` arguments are passed before the
+    parsed ones, so one handler can back several verbs (N/S/E/W, OPEN/CLOSE).
+    When a required argument is missing, ``prompt`` is shown instead; verbs
+    without a prompt receive an empty string. ``cost`` is the number of turns
+    the command takes. ``blocking`` verbs wait on disk or the save store, so
+    a server should run them off its event loop. A handler may be a
+    generator: each bare ``yield`` lets Game.play() send what it has output
+    so far, and its return value is used like a plain handler's.
+    """
+
+    def __init__(self, names, handler, grammar=NOARGS, prompt=None,
+                 separator=None, fixed=(), cost=1, blocking=False):
+        if isinstance(names, str):
+            names = (names,)
+        self.names = tuple(names)
+        self.handler = handler
+        self.grammar = grammar
+        self.prompt = prompt
+        self.separator = separator
+        self.fixed = tuple(fixed)
+        self.cost = cost
+        self.blocking = blocking
+
+    @property
+    def arity(self):
+        """Number of parsed arguments the handler receives"""
+        return {NOARGS: 0, TEXT: 1, WORD: 1, PAIR: 2}[self.grammar]
+
+    def parse(self, words):
+        """Turn the words after the verb into handler arguments, or None"""
+        if self.grammar == NOARGS:
+            return ()
+        if self.grammar == PAIR:
+            sep = self.separator
+            if sep in words:
+                idx = words.index(sep)
+                if 0 < idx < len(words) - 1:
+                    return (" ".join(words[:idx]), " ".join(words[idx + 1:]))
+            return None
+        if not words:
+            return None if self.prompt else ("",)
+        if self.grammar == WORD:
+            return (words[0],)
+        return (" ".join(words),)
+
+    def __call__(self, game, words):
+        """Parse the arguments and run the handler"""
+        args = self.parse(words)
+        if args is None:
+            game.output(self.prompt)
+            return None
+        handler = self.handler
+        if isinstance(handler, str):
+            return getattr(game, handler)(*self.fixed, *args)
+        return handler(game, *self.fixed, *args)
+
+    def __repr__(self):
+        return f"Verb({'/'.join(self.names)})"
+
+
+class VerbTable:
+    """Verbs and aliases keyed for constant-time dispatch.
+
+    Single-word verbs live in a plain dict. Multi-word verbs (ENTER CODE,
+    TUNE ANTENNA) are indexed by their first word, longest phrase first, so a
+    lookup only compares against the handful of phrases sharing that word.
+    """
+
+    def __init__(self):
+        self._words = {}
+        self._phrases = {}
+
+    def register(self, verb):
+        """Add a verb under all of its names; later registrations win"""
+        for name in verb.names:
+            parts = tuple(name.split())
+            if len(parts) == 1:
+                self._words[parts[0]] = verb
+                continue
+            phrases = [p for p in self._phrases.get(parts[0], [])
+                       if p[0] != parts]
+            phrases.append((parts, verb))
+            phrases.sort(key=lambda p: -len(p[0]))
+            self._phrases[parts[0]] = phrases
+        return verb
+
+    def unregister(self, name):
+        """Remove one name (word or phrase) from the table"""
+        parts = tuple(name.split())
+        if len(parts) == 1:
+            self._words.pop(parts[0], None)
+            return
+        phrases = [p for p in self._phrases.get(parts[0], [])
+                   if p[0] != parts]
+        if phrases:
+            self._phrases[parts[0]] = phrases
+        else:
+            self._phrases.pop(parts[0], None)
+
+    def lookup(self, words):
+        """Return (verb, remaining words) for a command, or (None, words)"""
+        if not words:
+            return None, words
+        first = words[0]
+        for parts, verb in self._phrases.get(first, ()):
+            n = len(parts)
+            if tuple(words[:n]) == parts:
+                return verb, words[n:]
+        verb = self._words.get(first)
+        if verb is not None:
+            return verb, words[1:]
+        return None, words
+
+    def copy(self):
+        """Independent table for a game that adds its own verbs"""
+        table = VerbTable()
+        table._words = dict(self._words)
+        table._phrases = {k: list(v) for k, v in self._phrases.items()}
+        return table
+
+    def verbs(self):
+        """Every distinct registered verb, in registration order"""
+        seen = {}
+        for verb in self._words.values():
+            seen.setdefault(id(verb), verb)
+        for phrases in self._phrases.values():
+            for _, verb in phrases:
+                seen.setdefault(id(verb), verb)
+        return list(seen.values())
+
+    def __contains__(self, name):
+        parts = tuple(name.split())
+        if len(parts) == 1:
+            return parts[0] in self._words
+        return any(p[0] == parts for p in self._phrases.get(parts[0], ()))
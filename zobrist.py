@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Circuit: A Night in Austin — Zobrist Keys
+Deterministic 64-bit keys for incremental state hashing. Keys are derived
+from the fact they describe, so every process computes the same hash for the
+same state.
+"""
+
+import hashlib
+
+_KEYS = {}
+
+
+def zkey(*parts):
+    """64-bit key for one fact, e.g. zkey("MUG", "loc", "inv")"""
+    key = _KEYS.get(parts)
+    if key is None:
+        digest = hashlib.blake2b(repr(parts).encode("utf-8"),
+                                 digest_size=8).digest()
+        key = _KEYS[parts] = int.from_bytes(digest, "little")
+    return key
+
+
+def zdelta(path, old, new, base):
+    """XOR moving a field from old to new; base values contribute nothing"""
+    if old == new:
+        return 0
+    delta = 0
+    if old != base:
+        delta ^= zkey(*path, old)
+    if new != base:
+        delta ^= zkey(*path, new)
+    return delta